@@ -0,0 +1,73 @@
+"""
+Benchmark of the selectable index types against exact (flat) search:
+recall@k, search latency per query and serialized index size.
+
+Clustered random vectors stand in for the embeddings of a repository.
+
+Run from the repository root:
+    poetry run python benchmarks/bench_index_types.py --vectors 200000 --dim 1536
+"""
+from argparse import ArgumentParser, Namespace
+import time
+
+import faiss
+import numpy as np
+
+from senior_swe_ai.ann_index import build_index, resolve_index_type
+from senior_swe_ai.consts import IndexType
+
+
+def make_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Create float32 vectors spread around a few hundred centroids"""
+    rng = np.random.default_rng(seed)
+    centroids: np.ndarray = rng.standard_normal((256, dim), dtype=np.float32)
+    labels: np.ndarray = rng.integers(0, len(centroids), count)
+    noise: np.ndarray = rng.standard_normal((count, dim), dtype=np.float32)
+    return centroids[labels] + 0.5 * noise
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    """Get the share of the exact top-k neighbours found"""
+    hits: int = sum(len(np.intersect1d(row, truth)) for row, truth in zip(found, expected))
+    return hits / expected.size
+
+
+def main() -> None:
+    """Print recall@k, latency and memory of every index type"""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    args: Namespace = parser.parse_args()
+
+    vectors: np.ndarray = make_vectors(args.vectors, args.dim)
+    queries: np.ndarray = make_vectors(args.queries, args.dim, seed=1)
+
+    print(f"{args.vectors} vectors of {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"{'index':<8}{'built as':<10}{'build (s)':>10}{'recall@k':>10}"
+          f"{'latency (ms)':>14}{'memory (MB)':>13}")
+    expected: np.ndarray = np.empty(0)
+    for index_type in IndexType:
+        start: float = time.perf_counter()
+        index: faiss.Index = build_index(vectors, index_type)
+        build: float = time.perf_counter() - start
+
+        # one query at a time on one thread, as in a chat session
+        threads: int = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(1)
+        start = time.perf_counter()
+        found: np.ndarray = np.vstack([
+            index.search(query[None, :], args.k)[1] for query in queries])
+        latency: float = (time.perf_counter() - start) / args.queries
+        faiss.omp_set_num_threads(threads)
+        if index_type is IndexType.FLAT:
+            expected = found
+        memory: float = faiss.serialize_index(index).nbytes / 2 ** 20
+        built_as: str = resolve_index_type(index_type, args.vectors).value
+        print(f"{index_type.value:<8}{built_as:<10}{build:>10.1f}"
+              f"{recall_at_k(found, expected):>10.3f}{latency * 1e3:>14.3f}{memory:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
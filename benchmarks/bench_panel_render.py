@@ -0,0 +1,60 @@
+"""
+Benchmark of the chat rendering against the length of the conversation:
+the time to show a new chatbox by redrawing the whole history (print_stdout
+after clearing the screen, the previous behaviour) and by printing it below
+the previous ones (print_new).
+
+Run from the repository root:
+    poetry run python benchmarks/bench_panel_render.py --history 10 100 1000
+"""
+from argparse import ArgumentParser, Namespace
+import io
+import time
+
+from rich.console import Console
+
+from senior_swe_ai.panel import PanelBase
+
+
+def make_panel(history: int, window: int) -> PanelBase:
+    """Create a panel holding a conversation of the given length, printing to memory"""
+    panel = PanelBase("BENCH", width=70, window=window)
+    panel.console = Console(file=io.StringIO(), width=120, force_terminal=True)
+    for turn in range(history):
+        panel.create_chatbox("user", f"question {turn} about the code", is_ai=turn % 2 == 0)
+    panel.print_stdout()
+    return panel
+
+
+def time_render(panel: PanelBase, full: bool, repeat: int) -> float:
+    """Get the mean time to add and show one chatbox, in milliseconds"""
+    start: float = time.perf_counter()
+    for turn in range(repeat):
+        panel.create_chatbox("Sen-AI", f"answer {turn}: " + "some words " * 30)
+        if full:
+            panel.console.clear()
+            panel.print_stdout()
+        else:
+            panel.print_new()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main() -> None:
+    """Print the render time of a new chatbox for every history length"""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--history", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args: Namespace = parser.parse_args()
+
+    print(f"{'history':>8}{'full, unbounded (ms)':>22}{'full, window (ms)':>19}"
+          f"{'incremental (ms)':>18}")
+    for history in args.history:
+        unbounded: float = time_render(make_panel(history, history + args.repeat), True,
+                                       args.repeat)
+        windowed: float = time_render(make_panel(history, 50), True, args.repeat)
+        incremental: float = time_render(make_panel(history, 50), False, args.repeat)
+        print(f"{history:>8}{unbounded:>22.2f}{windowed:>19.2f}{incremental:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
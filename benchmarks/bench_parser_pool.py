@@ -0,0 +1,47 @@
+"""
+Micro-benchmark of the per-file parser and splitter setup cost removed by
+the per-language instance pool.
+
+Run from the repository root:
+    poetry run python benchmarks/bench_parser_pool.py
+"""
+import timeit
+
+from senior_swe_ai.consts import Language
+from senior_swe_ai.file_handler import create_character_text_splitter
+from senior_swe_ai.tree_parser.base import BaseTreeParser
+
+LANGUAGES: list[Language] = [
+    Language.PYTHON, Language.JAVASCRIPT, Language.TYPESCRIPT, Language.JAVA,
+    Language.GO, Language.RUST, Language.C_SHARP, Language.RUBY,
+]
+NUMBER = 200
+
+
+def setup_fresh(language: Language) -> None:
+    """Per-file setup without the pool: a new parser and splitter"""
+    BaseTreeParser.create_treesitter(language)
+    create_character_text_splitter.__wrapped__(language)
+
+
+def setup_pooled(language: Language) -> None:
+    """Per-file setup with the pool: lookups of the cached instances"""
+    BaseTreeParser.get_treesitter(language)
+    create_character_text_splitter(language)
+
+
+def main() -> None:
+    """Print the per-file setup cost per language with and without the pool"""
+    print(f"{'language':<12}{'fresh (us)':>14}{'pooled (us)':>14}{'speedup':>10}")
+    for language in LANGUAGES:
+        setup_pooled(language)  # warm the pool
+        fresh: float = timeit.timeit(
+            lambda lang=language: setup_fresh(lang), number=NUMBER) / NUMBER
+        pooled: float = timeit.timeit(
+            lambda lang=language: setup_pooled(lang), number=NUMBER) / NUMBER
+        print(f"{language.value:<12}{fresh * 1e6:>14.1f}{pooled * 1e6:>14.2f}"
+              f"{fresh / pooled:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
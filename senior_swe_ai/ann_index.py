@@ -0,0 +1,117 @@
+"""
+Approximate nearest neighbour indexes built from the exact (flat) index,
+with their training and search parameters chosen from the number of vectors
+"""
+import math
+from typing import Any, Optional
+
+import numpy as np
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+
+from senior_swe_ai.consts import IndexType
+
+# IVF needs about 39 training vectors per list, below 16 lists it is not worth it
+MIN_IVF_LISTS = 16
+TRAIN_PER_LIST = 39
+# 8 bit product quantizers need 256 centroids trained on 39 vectors each
+MIN_PQ_VECTORS = 256 * TRAIN_PER_LIST
+MAX_TRAIN_VECTORS = 256 * 1024
+
+
+def resolve_index_type(index_type: IndexType, count: int) -> IndexType:
+    """
+    Get the index type actually built for the given number of vectors,
+    the trained types fall back to a simpler one when there are too few vectors
+
+    Args:
+        index_type: IndexType - The configured index type
+        count: int - The number of vectors
+
+    Returns:
+        IndexType - The index type to build
+    """
+    if index_type is IndexType.IVFPQ and count < MIN_PQ_VECTORS:
+        index_type = IndexType.IVF
+    if index_type is IndexType.IVF and ivf_lists(count) < MIN_IVF_LISTS:
+        index_type = IndexType.FLAT
+    return index_type
+
+
+def ivf_lists(count: int) -> int:
+    """Get the number of IVF lists (nlist), about 4 * sqrt(count)"""
+    return min(int(4 * math.sqrt(count)), count // TRAIN_PER_LIST)
+
+
+def ivf_probes(nlist: int) -> int:
+    """Get the number of IVF lists visited per query (nprobe)"""
+    return min(nlist, max(8, nlist // 16))
+
+
+def hnsw_neighbors(count: int) -> int:
+    """Get the number of HNSW neighbours per node (M)"""
+    return 16 if count < 100_000 else 32
+
+
+def hnsw_ef_search(count: int) -> int:
+    """Get the size of the HNSW candidate list searched per query (efSearch)"""
+    return 128 if count < 100_000 else 256
+
+
+def pq_subquantizers(dim: int) -> int:
+    """Get the number of PQ sub-quantizers, the largest divisor of dim up to dim / 8"""
+    return max(m for m in range(1, max(1, dim // 8) + 1) if dim % m == 0)
+
+
+def train_sample(vectors: np.ndarray) -> np.ndarray:
+    """Get an evenly strided sample of at most MAX_TRAIN_VECTORS vectors"""
+    step: int = max(1, len(vectors) // MAX_TRAIN_VECTORS)
+    return np.ascontiguousarray(vectors[::step][:MAX_TRAIN_VECTORS])
+
+
+def build_index(
+    vectors: np.ndarray, index_type: IndexType, metric: Optional[int] = None
+) -> Any:
+    """
+    Build an index of the given type over the vectors, in the same order,
+    so the positions still match the docstore ids of the flat index
+
+    Args:
+        vectors: np.ndarray - The float32 vectors, one per row
+        index_type: IndexType - The configured index type
+        metric: Optional[int] - The faiss metric of the vectors, L2 by default
+
+    Returns:
+        faiss.Index - The trained index holding the vectors
+    """
+    faiss = dependable_faiss_import()
+    if metric is None:
+        metric = faiss.METRIC_L2
+    count, dim = vectors.shape
+    index_type = resolve_index_type(index_type, count)
+
+    if index_type is IndexType.HNSW:
+        index = faiss.IndexHNSWFlat(dim, hnsw_neighbors(count), metric)
+        index.hnsw.efConstruction = 2 * hnsw_ef_search(count)
+        index.hnsw.efSearch = hnsw_ef_search(count)
+    elif index_type is IndexType.SQ:
+        index = faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_8bit, metric)
+    elif index_type in (IndexType.IVF, IndexType.IVFPQ):
+        nlist: int = ivf_lists(count)
+        quantizer = faiss.IndexFlat(dim, metric)
+        if index_type is IndexType.IVF:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, pq_subquantizers(dim), 8, metric)
+        index.nprobe = ivf_probes(nlist)
+    else:
+        index = faiss.IndexFlat(dim, metric)
+
+    if not index.is_trained:
+        index.train(train_sample(vectors))
+    index.add(vectors)
+    if isinstance(index, faiss.IndexIVF):
+        # the MMR retriever reconstructs the vectors it found
+        index.make_direct_map()
+    return index
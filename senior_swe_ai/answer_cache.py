@@ -0,0 +1,70 @@
+"""
+Persistent cache of the answers to standalone questions, shared by the sessions:
+an answer is reused for the same question asked to the same chat model over
+the same retrieved chunks of the same index generation
+"""
+import hashlib
+import json
+from typing import Callable, List, Optional
+
+from langchain.schema import Document
+
+from senior_swe_ai.cache import DiskCache
+from senior_swe_ai.embed_cache import normalize_query
+
+
+def chunk_id(doc: Document) -> str:
+    """Get the id of a retrieved chunk, the digest of its file and content"""
+    return hashlib.sha256(
+        f"{doc.metadata.get('file_path', '')}\0{doc.page_content}".encode()).hexdigest()
+
+
+class AnswerCache:
+    """
+    Answers of the questions asked without chat history, in a DiskCache
+
+    Attributes:
+    disk: DiskCache - The persistent cache, with its ttl and size limit
+    chat_model: str - The name of the chat model, part of the key
+    generation: Callable[[], int] - The current generation of the index, part of the key
+    hits: int - The number of questions answered from the cache
+    misses: int - The number of questions sent to the chat model
+
+    """
+
+    def __init__(
+        self, disk: DiskCache, chat_model: str, generation: Callable[[], int]
+    ) -> None:
+        self.disk = disk
+        self.chat_model = chat_model
+        self.generation = generation
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, question: str, docs: List[Document]) -> str:
+        """
+        Get the cache key of a question
+
+        Args:
+            question: str - The standalone question
+            docs: List[Document] - The chunks retrieved for it
+
+        Returns:
+            str - The key
+        """
+        parts: list = [normalize_query(question), self.chat_model,
+                       [chunk_id(doc) for doc in docs], self.generation()]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the answer of a key, None if it is not cached or expired"""
+        cached: Optional[bytes] = self.disk.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached.decode()
+
+    def set(self, key: str, answer: str) -> None:
+        """Store the answer of a key"""
+        self.disk.set(key, answer.encode())
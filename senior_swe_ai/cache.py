@@ -4,51 +4,53 @@ for the application.
 import json
 import os
 import platform
+import sqlite3
+import struct
+import threading
+import time
+from array import array
 from pathlib import Path
+from typing import Iterable, Optional, Union
 
-from altair import Self
+import numpy as np
+
+VEC_CACHE_MAGIC = b"SSVC"
+VEC_CACHE_VERSION = 1
+# magic, version, hash width, n_files, n_ids, size of the file names
+VEC_CACHE_HEADER = struct.Struct("<4sHHQQQ")
+# the order of use of a DiskCache entry, the previous caches stored timestamps
+# in the same column and their entries stay ordered before the new ones
+_NEXT_ACCESS = "(SELECT COALESCE(MAX(accessed), 0) + 1 FROM entries)"
 
 
 class VectorCache:
-    """ 
-    VectorCache class for storing vector data 
+    """
+    VectorCache class for storing vector data
 
     Attributes:
     filename: str - The name of the file
-    vector_ids: list[str] - The list of vector ids
-    commit_hash: str - The commit hash of the file
+    vector_ids: array | np.ndarray - The integer vector ids, a view of the mapped
+        cache file until the record changes
+    commit_hash: str - The hash (git blob id) of the file content
 
     """
 
-    def __init__(self, filename, vec_ids, commit_hash) -> None:
+    __slots__ = ("filename", "vector_ids", "commit_hash")
+
+    def __init__(
+        self, filename: str, vec_ids: Union[Iterable[int], np.ndarray], commit_hash: str
+    ) -> None:
         self.filename = filename
-        self.vector_ids = vec_ids
+        if not isinstance(vec_ids, (array, np.ndarray)):
+            vec_ids = array("q", vec_ids)
+        self.vector_ids: Union[array, np.ndarray] = vec_ids
         self.commit_hash = commit_hash
 
-    def to_json(self) -> str:
-        """Convert the object to json"""
-        return {
-            "filename": self.filename,
-            "commit_hash": self.commit_hash,
-            "vector_ids": self.vector_ids,
-        }
-
-    @classmethod
-    def from_json(cls, data: dict[str, str]) -> Self:
-        """
-        Create a VectorCache object from json
-
-        Args:
-            data: dict[str, str] - The data to create the object
-
-        Returns:
-            VectorCache - The created VectorCache object
-        """
-        return cls(
-            filename=data.get("filename"),
-            vec_ids=data.get("vector_ids"),
-            commit_hash=data.get("commit_hash"),
-        )
+    def add(self, vec_id: int) -> None:
+        """Record a vector of the file, copying the mapped ids first"""
+        if not isinstance(self.vector_ids, array):
+            self.vector_ids = array("q", self.vector_ids.tobytes())
+        self.vector_ids.append(vec_id)
 
 
 def get_cache_path() -> str:
@@ -85,27 +87,82 @@ def create_cache_dir() -> None:
         path.mkdir(parents=True, exist_ok=True)
 
 
-def load_vec_cache(filename: str) -> dict[str, VectorCache]:
+def diff_vec_cache(
+    vec_cache: dict[str, VectorCache], hashes: dict[str, str]
+) -> tuple[list[str], list[str]]:
     """
-    Load the vector cache from the given file.
+    Compare the vector cache with the current hash of every file.
+
+    Args:
+        vec_cache: dict[str, VectorCache] - The vector cache of the index
+        hashes: dict[str, str] - The current hash of every file to index
+
+    Returns:
+        tuple[list[str], list[str]] - The cached files whose vectors are stale
+        (changed or deleted) and the files that have to be embedded (changed or added)
+    """
+    stale_files: list[str] = [
+        filename for filename, cached in vec_cache.items()
+        if hashes.get(filename) != cached.commit_hash
+    ]
+    changed_files: list[str] = [
+        filename for filename, commit_hash in hashes.items()
+        if filename not in vec_cache or vec_cache[filename].commit_hash != commit_hash
+    ]
+    return stale_files, changed_files
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def load_vec_cache(filename: str, mmap: bool = True) -> dict[str, VectorCache]:
+    """
+    Load the vector cache from the given file, written by save_vec_cache.
+    The file is memory mapped by default: the vector ids stay views of it and
+    are only read when used.
 
     Args:
         filename: str - The name of the file
+        mmap: bool - Map the file, set it to False to read it in memory when the
+            cache is saved again by the same process: a mapped file cannot be
+            replaced on Windows
 
     Returns:
         dict[str, VectorCache] - The vector cache
     """
-    with open(get_cache_path() + f'/{filename}', 'r', encoding='utf-8') as f:
-        vec = json.load(f)
-    vec_cache = {}
-    for key, value in vec.items():
-        vec_cache[key] = VectorCache.from_json(value)
+    path: str = os.path.join(get_cache_path(), filename)
+    data: np.ndarray = (np.memmap(path, dtype=np.uint8, mode="r") if mmap
+                        else np.fromfile(path, dtype=np.uint8))
+    magic, version, hash_width, n_files, n_ids, names_size = \
+        VEC_CACHE_HEADER.unpack_from(data)
+    if magic != VEC_CACHE_MAGIC:
+        raise ValueError(f"{path} is not a vector cache")
+    if version != VEC_CACHE_VERSION:
+        raise ValueError(f"{path} has the unsupported version {version}")
+    offset: int = VEC_CACHE_HEADER.size
+    arrays: list[np.ndarray] = []
+    for dtype, count in ((np.int64, n_files + 1), (np.int64, n_ids), (np.int64, n_files + 1),
+                         (np.dtype(f"S{max(hash_width, 1)}"), n_files), (np.uint8, names_size)):
+        offset = _aligned(offset)
+        arrays.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+        offset += arrays[-1].nbytes
+    id_offsets, vector_ids, name_offsets, hashes, names = arrays
+    names_text: bytes = names.tobytes()
+    vec_cache: dict[str, VectorCache] = {}
+    for i in range(n_files):
+        name: str = names_text[name_offsets[i]:name_offsets[i + 1]].decode()
+        vec_cache[name] = VectorCache(
+            name, vector_ids[id_offsets[i]:id_offsets[i + 1]], hashes[i].decode())
     return vec_cache
 
 
-def save_vec_cache(vector_cache, filename) -> None:
+def save_vec_cache(vector_cache: dict[str, VectorCache], filename: str) -> None:
     """
-    Save the vector cache to the given file.
+    Save the vector cache to the given file: a versioned header followed by
+    the vector ids of all files in one array, with the offsets of each file,
+    the hashes and the file names. The file is written next to the previous
+    one and moved in place, sessions mapping the previous one keep reading it.
 
     Args:
         vector_cache: dict[str, VectorCache] - The vector cache
@@ -114,8 +171,161 @@ def save_vec_cache(vector_cache, filename) -> None:
     Returns:
         None
     """
-    with open(
-        get_cache_path() + "/" + filename, "w", encoding="utf-8"
-    ) as vector_cache_file:
-        json.dump(vector_cache, default=VectorCache.to_json,
-                  fp=vector_cache_file)
+    records: list[VectorCache] = list(vector_cache.values())
+    id_offsets: np.ndarray = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(cached.vector_ids) for cached in records], out=id_offsets[1:])
+    vector_ids: np.ndarray = np.concatenate(
+        [np.asarray(cached.vector_ids, dtype=np.int64) for cached in records]
+        or [np.zeros(0, dtype=np.int64)])
+    encoded: list[bytes] = [cached.filename.encode() for cached in records]
+    name_offsets: np.ndarray = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+    hashes: np.ndarray = np.array(
+        [(cached.commit_hash or "").encode() for cached in records], dtype=bytes)
+    names: bytes = b"".join(encoded)
+
+    path: str = os.path.join(get_cache_path(), filename)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(VEC_CACHE_HEADER.pack(
+            VEC_CACHE_MAGIC, VEC_CACHE_VERSION, hashes.dtype.itemsize if len(hashes) else 0,
+            len(records), len(vector_ids), len(names)))
+        for content in (id_offsets.tobytes(), vector_ids.tobytes(), name_offsets.tobytes(),
+                        hashes.tobytes(), names):
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            f.write(content)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_legacy_vec_cache(filename: str) -> dict[str, dict]:
+    """
+    Load a vector cache saved as json by the previous versions, whose vector
+    ids are the uuid strings of the docstore
+
+    Args:
+        filename: str - The name of the file
+
+    Returns:
+        dict[str, dict] - The filename, commit_hash and vector_ids of every file
+    """
+    with open(os.path.join(get_cache_path(), filename), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class DiskCache:
+    """
+    Persistent key-value cache stored in a SQLite file, evicting the least
+    recently used entries once it holds more than max_entries, and the entries
+    older than ttl seconds when a ttl is given. The order of use is a counter,
+    incremented by every access, so accesses within the clock resolution are
+    ordered too.
+
+    Attributes:
+    path: str - The path of the SQLite file
+    max_entries: int - The maximum number of entries kept
+    ttl: Optional[float] - The lifetime of an entry in seconds, None to keep it
+    hits: int - The number of keys found since the cache was opened
+    misses: int - The number of keys not found since the cache was opened
+
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 100_000, ttl: Optional[float] = None
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL, "
+                "created REAL NOT NULL DEFAULT 0)"
+            )
+            columns: list[str] = [
+                row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+            if "created" not in columns:
+                # caches written before the ttl, their entries count as expired
+                self._conn.execute(
+                    "ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        """
+        Get the values of the given keys
+
+        Args:
+            keys: Iterable[str] - The keys to look up
+
+        Returns:
+            dict[str, bytes] - The value of every key found
+        """
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, bytes] = {}
+        now: float = time.time()
+        oldest: float = now - self.ttl if self.ttl is not None else float("-inf")
+        with self._lock, self._conn:
+            # stay below the SQLite limit of host parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk: list[str] = keys[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT key, value, created FROM entries "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((key, value) for key, value, created in rows if created >= oldest)
+            self._conn.executemany(
+                f"UPDATE entries SET accessed = {_NEXT_ACCESS} WHERE key = ?",
+                [(key,) for key in found],
+            )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        """
+        Store the given values, then evict the expired and the least recently used entries
+
+        Args:
+            items: dict[str, bytes] - The values to store, by key
+        """
+        if not items:
+            return
+        now: float = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, accessed, created) "
+                f"VALUES (?, ?, {_NEXT_ACCESS}, ?)",
+                [(key, value, now) for key, value in items.items()],
+            )
+            if self.ttl is not None:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+            count: int = self._conn.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def get(self, key: str) -> bytes | None:
+        """Get the value of a key, None if it is not cached"""
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store the value of a key"""
+        self.set_many({key: value})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection"""
+        with self._lock:
+            self._conn.close()
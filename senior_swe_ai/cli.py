@@ -1,26 +1,188 @@
 #!/usr/bin/env python3
 """ SeniorSWE cli tool utilize AI to help you with your project """
 from argparse import ArgumentParser, Namespace
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import os
 import sys
-from typing import List
+from typing import Any, Tuple
 import warnings
-from langchain.memory import ConversationSummaryMemory
-from langchain.chains.conversational_retrieval.base import (
-    BaseConversationalRetrievalChain, ConversationalRetrievalChain
-)
 import inquirer
-from langchain_core.documents.base import Document
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from senior_swe_ai.file_handler import parse_code_files
+import openai
 from senior_swe_ai.git_process import (
-    is_git_repo, get_repo_name, get_repo_root, recursive_load_files
+    is_git_repo, get_repo_name, get_repo_root, recursive_load_files, iter_repo_files,
+    get_hashes, get_file_hashes
 )
 from senior_swe_ai.conf import config_init, load_conf, append_conf
-from senior_swe_ai.cache import create_cache_dir, get_cache_path, save_vec_cache
+from senior_swe_ai.context_packer import PackingRetriever
+from senior_swe_ai.answer_cache import AnswerCache
+from senior_swe_ai.cache import (
+    DiskCache, create_cache_dir, get_cache_path, diff_vec_cache
+)
+from senior_swe_ai.embed_cache import QueryEmbeddingCache
+from senior_swe_ai.embed_scheduler import EmbeddingScheduler
+from senior_swe_ai.ingest import index_files
+from senior_swe_ai.llm_handler import get_token_counter
 from senior_swe_ai.panel import PanelBase
+from senior_swe_ai.sharded_store import ShardedVectorStore
+from senior_swe_ai.streaming import TokenStream
 from senior_swe_ai.vec_store import VectorStore
-from senior_swe_ai.consts import FaissModel, faiss_installed
+from senior_swe_ai.consts import FaissModel, IndexType, ShardKey, faiss_installed
+
+
+def reindex(vec_store: VectorStore | ShardedVectorStore, workers: int = 1) -> None:
+    """
+    Re-embed only the files that changed since the index was built
+
+    Args:
+        vec_store: VectorStore | ShardedVectorStore - The vector store of the repository
+        workers: int - The number of processes parsing the files
+    """
+    vec_store.load_docs(mmap=False)
+    files: list[str] = recursive_load_files()
+    hashes: dict[str, str] = get_hashes(files)
+    stale_files, changed_files = diff_vec_cache(vec_store.vec_cache, hashes)
+    vec_store.remove_files(stale_files)
+    vec_store.compact()
+    index_files(vec_store, changed_files, hashes, workers=workers)
+    print(f'Re-indexed {len(changed_files)} changed file(s), '
+          f'dropped {len(stale_files)} stale file(s)')
+    print_embed_cache_stats(vec_store)
+
+
+def print_embed_cache_stats(vec_store: VectorStore | ShardedVectorStore) -> None:
+    """
+    Print how many chunk embeddings were served by the embedding cache
+
+    Args:
+        vec_store: VectorStore | ShardedVectorStore - The vector store of the repository
+    """
+    if vec_store.embed_cache is not None:
+        print(f'Embedding cache: {vec_store.embed_cache.hits} hit(s), '
+              f'{vec_store.embed_cache.misses} miss(es)')
+
+
+def print_query_cache_stats(embed_mdl: QueryEmbeddingCache) -> None:
+    """
+    Print how many questions were served by the query embedding cache
+
+    Args:
+        embed_mdl: QueryEmbeddingCache - The embeddings model of the session
+    """
+    print(f'Query embedding cache: {embed_mdl.hits} hit(s), {embed_mdl.misses} miss(es)')
+
+
+def load_chain(
+    vec_store: VectorStore | ShardedVectorStore, conf: dict[str, str]
+) -> Tuple[Any, Any]:
+    """
+    Load the index and build the question answering chain over it. It runs in
+    the background while the first question is typed, so the LangChain chain
+    modules, which take seconds to import, are imported here too.
+
+    The answers are streamed, the standalone question and the summary of the
+    chat history are generated by a model which does not stream, so their
+    tokens are not shown. The history is summarized in the background, unless
+    memory is set to summary in the configuration. The retrieved chunks are packed
+    into context_tokens tokens.
+
+    Args:
+        vec_store: VectorStore | ShardedVectorStore - The vector store of the repository
+        conf: dict[str, str] - The configuration
+
+    Returns:
+        Tuple[BaseConversationalRetrievalChain, ConversationSummaryMemory] - The chain
+        and its memory
+    """
+    # pylint: disable=import-outside-toplevel
+    from langchain.chains.conversational_retrieval.base import ConversationalRetrievalChain
+    from langchain.memory import ConversationSummaryMemory
+    from langchain_openai import ChatOpenAI
+    from senior_swe_ai.memory import BackgroundSummaryMemory
+
+    vec_store.load_docs()
+    chat_mdl = ChatOpenAI(model=conf['chat_model'], api_key=conf['api_key'], temperature=0.9,
+                          max_tokens=2048, streaming=True)
+    condense_mdl = ChatOpenAI(model=conf['chat_model'], api_key=conf['api_key'],
+                              temperature=0.9, max_tokens=2048)
+    if conf.get('memory', 'background') == 'summary':
+        mem = ConversationSummaryMemory(
+            llm=condense_mdl, memory_key='chat_history', return_messages=True
+        )
+    else:
+        mem = BackgroundSummaryMemory(
+            llm=condense_mdl, memory_key='chat_history', return_messages=True,
+            max_token_limit=conf.get('memory_tokens', 2000),
+            max_turns=conf.get('memory_turns', 8))
+    retriever = PackingRetriever(
+        retriever=vec_store.retrieval, max_tokens=conf.get('context_tokens', 3000),
+        token_counter=get_token_counter(conf['chat_model']))
+    qa = ConversationalRetrievalChain.from_llm(
+        chat_mdl, retriever=retriever, memory=mem,
+        condense_question_llm=condense_mdl)
+    return qa, mem
+
+
+def stream_answer(panel: PanelBase, title: str, qa: Any, question: str) -> str | None:
+    """
+    Ask the chain in the background and show the answer in a live chatbox as it
+    is streamed, with the time to its first token. Ctrl-C cancels the answer,
+    which stops the generation at its next token.
+
+    Args:
+        panel: PanelBase - The chat panel
+        title: str - The title of the answer chatbox
+        qa: BaseConversationalRetrievalChain - The chain
+        question: str - The question
+
+    Returns:
+        str | None - The answer, None when it was cancelled
+    """
+    stream = TokenStream()
+    pool = ThreadPoolExecutor(max_workers=1)
+    answering: Future = pool.submit(qa, question, callbacks=[stream])
+    pool.shutdown(wait=False)
+    try:
+        with panel.create_live() as live:
+            while not answering.done():
+                live.update(panel.render_chatbox(
+                    title, stream.text or '...', subtitle=stream.status()))
+                wait([answering], timeout=1 / 12)
+        answer: str = answering.result()['answer']
+    except KeyboardInterrupt:
+        stream.cancel()
+        panel.create_chatbox(title, stream.text + ' [cancelled]', subtitle=stream.status())
+        return None
+    panel.create_chatbox(title, answer, subtitle=stream.status())
+    return answer
+
+
+def answer_question(
+    panel: PanelBase, title: str, qa: Any, question: str, answers: AnswerCache | None
+) -> None:
+    """
+    Answer a question from the answer cache, or with the chain and cache the
+    answer. The cache is bypassed once the chat has a history, which the
+    question may refer to.
+
+    Args:
+        panel: PanelBase - The chat panel
+        title: str - The title of the answer chatbox
+        qa: BaseConversationalRetrievalChain - The chain
+        question: str - The question
+        answers: AnswerCache | None - The answer cache, None when it is disabled
+    """
+    key: str | None = None
+    if answers is not None and not qa.memory.chat_memory.messages:
+        key = answers.key(question, qa.retriever.get_relevant_documents(question))
+        cached: str | None = answers.get(key)
+        if cached is not None:
+            qa.memory.save_context({'question': question}, {'answer': cached})
+            panel.create_chatbox(title, cached, subtitle='cached answer')
+            return
+    answer: str | None = stream_answer(panel, title, qa, question)
+    if key is not None and answer is not None:
+        answers.set(key, answer)
 
 
 def main() -> None:
@@ -35,8 +197,9 @@ def main() -> None:
     )
 
     parser.add_argument(
-        'options', choices=['init', 'chat'],
-        help="'init': initialize the app. 'chat': chat with desired codebase."
+        'options', choices=['init', 'chat', 'reindex'],
+        help="'init': initialize the app. 'chat': chat with desired codebase. "
+        "'reindex': re-embed the files changed since the last index."
     )
 
     args: Namespace = parser.parse_args()
@@ -64,12 +227,47 @@ def main() -> None:
 
     create_cache_dir()
 
-    embed_mdl = OpenAIEmbeddings(
-        model=conf['embed_model'], api_key=conf['api_key'])
+    # retries are handled by the scheduler, which backs off on transient errors
+    scheduler = EmbeddingScheduler(
+        openai.AsyncOpenAI(api_key=conf['api_key'], max_retries=0),
+        conf['embed_model'],
+        max_in_flight=conf.get('embed_concurrency', 4),
+        tokens_per_minute=conf.get('embed_tokens_per_minute', 1_000_000),
+        requests_per_minute=conf.get('embed_requests_per_minute', 3_000),
+    )
+    atexit.register(scheduler.close)
+
+    query_disk_cache: DiskCache | None = None
+    if conf.get('query_cache_persist', True):
+        query_disk_cache = DiskCache(
+            os.path.join(get_cache_path(), 'queries.sqlite'),
+            max_entries=conf.get('query_cache_disk_size', 10_000))
+    embed_mdl = QueryEmbeddingCache(
+        scheduler, conf.get('query_cache_size', 1024), query_disk_cache)
 
-    vec_store = VectorStore(embed_mdl, repo_name)
+    embed_cache = DiskCache(
+        os.path.join(get_cache_path(), 'embeddings.sqlite'),
+        max_entries=conf.get('embed_cache_size', 200_000))
+    index_type = IndexType(conf.get('index_type', IndexType.FLAT.value))
+    vec_store: VectorStore | ShardedVectorStore
+    if 'shard_by' in conf:
+        vec_store = ShardedVectorStore(
+            embed_mdl, repo_name, ShardKey(conf['shard_by']), repo_root,
+            embed_cache, index_type)
+    else:
+        vec_store = VectorStore(embed_mdl, repo_name, embed_cache, index_type)
+    parse_workers: int = conf.get('parse_workers', os.cpu_count() or 1)
+
+    index_exists: bool = vec_store.exists()
+    if (args.options == 'chat' and index_exists and isinstance(vec_store, ShardedVectorStore)
+            and vec_store.shard_key_changed()):
+        print(f'The index is not sharded by {vec_store.shard_by.value}, rebuilding it')
+        reindex(vec_store, parse_workers)
+    if args.options == 'reindex' and index_exists:
+        reindex(vec_store, parse_workers)
+        sys.exit()
 
-    if not os.path.exists(get_cache_path() + f'/{repo_name}.faiss'):
+    if not index_exists:
         is_faiss_installed: bool = faiss_installed()
         if not is_faiss_installed:
             question = [
@@ -102,21 +300,28 @@ def main() -> None:
             else:
                 print('FAISS is required for this app to work')
                 sys.exit(1)
-        # all desired files in the git repository tree
-        files: list[str] = recursive_load_files()
-        docs: List[Document] = parse_code_files(files)
-        vec_store.idx_docs(docs)
-        save_vec_cache(vec_store.vec_cache, f'{repo_name}.json')
+        # all desired files in the git repository tree, streamed into the index
+        if not index_files(vec_store, iter_repo_files(), get_file_hashes(),
+                           workers=parse_workers):
+            print('No supported code files found in the repository')
+            sys.exit(1)
+        print_embed_cache_stats(vec_store)
+        if args.options == 'reindex':
+            sys.exit()
+
+    answers: AnswerCache | None = None
+    if conf.get('answer_cache', False):
+        answers = AnswerCache(
+            DiskCache(os.path.join(get_cache_path(), 'answers.sqlite'),
+                      max_entries=conf.get('answer_cache_size', 1000),
+                      ttl=conf.get('answer_cache_ttl', 7 * 24 * 3600)),
+            conf['chat_model'], lambda: vec_store.generation)
 
-    vec_store.load_docs()
     warnings.simplefilter(action='ignore')
-    chat_mdl = ChatOpenAI(model=conf['chat_model'], api_key=conf['api_key'], temperature=0.9,
-                          max_tokens=2048)
-    mem = ConversationSummaryMemory(
-        llm=chat_mdl, memory_key='chat_history', return_messages=True
-    )
-    qa: BaseConversationalRetrievalChain = ConversationalRetrievalChain.from_llm(
-        chat_mdl, retriever=vec_store.retrieval, memory=mem)
+    # the first question waits for the chain only if it is still loading
+    loader = ThreadPoolExecutor(max_workers=1)
+    chain: Future = loader.submit(load_chain, vec_store, conf)
+    loader.shutdown(wait=False)
 
     try:
         continue_chat = True
@@ -124,30 +329,29 @@ def main() -> None:
         panel.create_chatbox(
             repo_name, "Hello! I'm Sen-AI, Ask me anything about your codebase.")
         panel.console.clear()
-        panel.print_stdout()
+        panel.print_header()
+        panel.print_new()
         while continue_chat:
             question: str = panel.console.input(conf['username'] + ': ')
+            panel.erase_lines()
             panel.create_chatbox(conf['username'], question, is_ai=False)
-            panel.console.clear()
-            panel.print_stdout()
-            status = panel.create_status(f'{repo_name} is typing...', 'dots')
-            status.start()
-            answer = qa(question)
-            status.stop()
-            panel.print_stdout()
-            panel.create_chatbox(repo_name, answer['answer'])
-            panel.console.clear()
-            panel.print_stdout()
+            panel.print_new()
+            if not chain.done():
+                with panel.create_status('Loading the index...', 'dots'):
+                    wait([chain])
+            answer_question(panel, repo_name, chain.result()[0], question, answers)
+            panel.print_new()
 
             choice: str = (
                 input(
                     '[C]ontinue chatting, [R]eset chat history, or [Q]uit? '
                 ).strip().upper()
             )
+            panel.erase_lines()
             if choice == 'C':
                 continue
             if choice == 'R':
-                mem.clear()
+                chain.result()[1].clear()
                 continue
             if choice == 'Q':
                 continue_chat = False
@@ -155,6 +359,9 @@ def main() -> None:
         print('\n✌')
     except EOFError:
         print('\n✌')
+    print_query_cache_stats(embed_mdl)
+    if answers is not None:
+        print(f'Answer cache: {answers.hits} hit(s), {answers.misses} miss(es)')
 
 
 if __name__ == '__main__':
@@ -35,6 +35,21 @@ class FaissModel(Enum):
     FAISS_GPU = "faiss-gpu"
 
 
+class IndexType(Enum):
+    """ Enum for supported faiss index types."""
+    FLAT = "flat"
+    HNSW = "hnsw"
+    IVF = "ivf"
+    IVFPQ = "ivfpq"
+    SQ = "sq"
+
+
+class ShardKey(Enum):
+    """ Enum for the ways of splitting an index into shards."""
+    DIRECTORY = "directory"
+    LANGUAGE = "language"
+
+
 EXCLUDE_DIRS: list[str] = [
     "__pycache__",
     ".pytest_cache",
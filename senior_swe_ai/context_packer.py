@@ -0,0 +1,140 @@
+"""
+Packing of the retrieved chunks into the prompt: the overlapping chunks of a
+method are merged back into one piece, and the pieces fill a token budget in
+the order of their ranking
+"""
+from itertools import permutations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+# the shortest overlap merged, below it a shared prefix may be a coincidence
+MIN_OVERLAP = 16
+
+
+def join_overlap(first: str, second: str, min_overlap: int = MIN_OVERLAP) -> Optional[str]:
+    """
+    Join two chunks when the end of the first one is the start of the second one
+
+    Args:
+        first: str - The chunk coming first
+        second: str - The chunk coming next
+        min_overlap: int - The shortest overlap joined
+
+    Returns:
+        Optional[str] - The joined text, the overlap once, None when they do not overlap
+    """
+    if second in first:
+        return first
+    for size in range(min(len(first), len(second)), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+def merge_chunks(texts: List[str], min_overlap: int = MIN_OVERLAP) -> List[str]:
+    """
+    Merge the overlapping chunks of a method, in whichever order they overlap
+
+    Args:
+        texts: List[str] - The chunks, by rank
+        min_overlap: int - The shortest overlap joined
+
+    Returns:
+        List[str] - The merged pieces, by the rank of their best chunk
+    """
+    return [text for _, text in merge_ranked(list(enumerate(texts)), min_overlap)]
+
+
+def merge_ranked(
+    pieces: List[Tuple[int, str]], min_overlap: int = MIN_OVERLAP
+) -> List[Tuple[int, str]]:
+    """
+    Merge the overlapping chunks of a method, keeping the rank of each piece
+
+    Args:
+        pieces: List[Tuple[int, str]] - The rank and text of each chunk, by rank
+        min_overlap: int - The shortest overlap joined
+
+    Returns:
+        List[Tuple[int, str]] - The merged pieces, with the best rank of the
+            chunks merged into each of them, by rank
+    """
+    pieces = list(pieces)
+    merged: bool = True
+    while merged:
+        merged = False
+        for first, second in permutations(range(len(pieces)), 2):
+            joined: Optional[str] = join_overlap(
+                pieces[first][1], pieces[second][1], min_overlap)
+            if joined is not None:
+                pieces[min(first, second)] = (
+                    min(pieces[first][0], pieces[second][0]), joined)
+                del pieces[max(first, second)]
+                merged = True
+                break
+    return pieces
+
+
+def pack_documents(
+    docs: List[Document], max_tokens: int, token_counter: Callable[[str], int]
+) -> List[Document]:
+    """
+    Merge the chunks of the same method and keep the best pieces within a token budget
+
+    Every merged piece takes the best rank of the chunks merged into it, so the
+    chunks of a method which do not overlap keep their own rank. The pieces are
+    taken by rank while they fit, a piece too large for the rest of the budget
+    is skipped for the smaller ones after it, the first piece is always kept.
+
+    Args:
+        docs: List[Document] - The retrieved chunks, by rank
+        max_tokens: int - The token budget of the context
+        token_counter: Callable[[str], int] - Counts the tokens of a text
+
+    Returns:
+        List[Document] - The packed pieces, with the metadata of their best chunk
+    """
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, str]]] = {}
+    for rank, doc in enumerate(docs):
+        key: Tuple[Any, Any] = (doc.metadata.get("file_path", doc.metadata.get("filename")),
+                                doc.metadata.get("method_name"))
+        groups.setdefault(key, []).append((rank, doc.page_content))
+    pieces: List[Tuple[int, str]] = sorted(
+        (piece for group in groups.values() for piece in merge_ranked(group)),
+        key=lambda piece: piece[0])
+
+    packed: List[Document] = []
+    tokens: int = 0
+    for rank, text in pieces:
+        size: int = token_counter(text)
+        if packed and tokens + size > max_tokens:
+            continue
+        packed.append(Document(page_content=text, metadata=docs[rank].metadata))
+        tokens += size
+    return packed
+
+
+class PackingRetriever(BaseRetriever):
+    """
+    Retriever packing the chunks of another retriever into a token budget
+
+    Attributes:
+    retriever: BaseRetriever - The retriever ranking the chunks
+    max_tokens: int - The token budget of the context
+    token_counter: Callable[[str], int] - Counts the tokens of a text
+
+    """
+
+    retriever: BaseRetriever
+    max_tokens: int = 3000
+    token_counter: Any
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs: List[Document] = self.retriever.get_relevant_documents(
+            query, callbacks=run_manager.get_child())
+        return pack_documents(docs, self.max_tokens, self.token_counter)
@@ -0,0 +1,120 @@
+"""
+Chunk deduplication stage, run before the chunks are embedded: byte-identical
+chunks are found by hashing, so every unique chunk is embedded and stored
+once, listing all its locations. Chunks which are only similar are kept, the
+lines in which they differ stay retrievable.
+"""
+import hashlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+
+
+def chunk_key(text: str) -> str:
+    """Get the key of a chunk, the hex digest of its content"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def location(doc: Document) -> Dict[str, Optional[str]]:
+    """Get the source location of a chunk, recorded in the metadata of the stored chunk"""
+    return {"file_path": doc.metadata.get("file_path"),
+            "method_name": doc.metadata.get("method_name")}
+
+
+class ChunkDeduplicator:
+    """
+    Streaming deduplicator, keeping the first chunk of every group of identical chunks
+
+    The duplicates are held until the vector of their original chunk is known,
+    see indexed and resolved.
+
+    Attributes:
+    scope: Callable[[Document], str] - Chunks are only compared within a scope
+    indexed_chunks: Optional[Callable[[str], Iterable[Tuple[str, str]]]] - The key
+        and vector id of the chunks already indexed in a scope, seeded when the
+        first chunk of the scope arrives
+    duplicates: int - The number of duplicate chunks found
+
+    """
+
+    def __init__(
+        self, scope: Optional[Callable[[Document], str]] = None,
+        indexed_chunks: Optional[Callable[[str], Iterable[Tuple[str, str]]]] = None
+    ) -> None:
+        self.scope: Callable[[Document], str] = scope or (lambda doc: "")
+        self.indexed_chunks = indexed_chunks
+        self.duplicates = 0
+        self._seeded: set[str] = set()
+        self._exact: set[str] = set()
+        self._vector_ids: Dict[str, str] = {}
+        self._pending: List[Tuple[Document, str]] = []
+
+    def seed(self, chunks: Iterable[Tuple[str, str]]) -> None:
+        """
+        Register the chunks already in the index, exact duplicates of them
+        then reuse their vectors
+
+        Args:
+            chunks: Iterable[Tuple[str, str]] - The key and vector id of each indexed chunk
+        """
+        for key, vec_id in chunks:
+            self._exact.add(key)
+            self._vector_ids[key] = vec_id
+
+    def unique(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """
+        Filter out the duplicate chunks
+
+        Args:
+            docs: Iterable[Document] - The chunks, possibly a generator
+
+        Yields:
+            Document - The unique chunks, with their key and locations in metadata
+        """
+        for doc in docs:
+            scope: str = self.scope(doc)
+            if self.indexed_chunks is not None and scope not in self._seeded:
+                self._seeded.add(scope)
+                self.seed(self.indexed_chunks(scope))
+            key: str = chunk_key(scope + "\0" + doc.page_content)
+            if key in self._exact:
+                self.duplicates += 1
+                self._pending.append((doc, key))
+                continue
+
+            self._exact.add(key)
+            doc.metadata["chunk_key"] = key
+            doc.metadata["locations"] = [location(doc)]
+            yield doc
+
+    def indexed(self, docs: List[Document], vector_ids: List[str]) -> None:
+        """
+        Record the vectors of unique chunks added to the index
+
+        Args:
+            docs: List[Document] - The unique chunks
+            vector_ids: List[str] - The vector id of each chunk
+        """
+        for doc, vec_id in zip(docs, vector_ids):
+            self._vector_ids[doc.metadata["chunk_key"]] = vec_id
+
+    def pending_files(self) -> set[str]:
+        """Get the files of the duplicates still waiting for the vector of their original"""
+        return {doc.metadata.get("file_path") for doc, _ in self._pending}
+
+    def resolved(self) -> List[Tuple[Document, str]]:
+        """
+        Take the duplicates whose original chunk was indexed
+
+        Returns:
+            List[Tuple[Document, str]] - Each duplicate chunk with the vector id of its original
+        """
+        resolved: List[Tuple[Document, str]] = []
+        pending: List[Tuple[Document, str]] = []
+        for doc, original in self._pending:
+            if original in self._vector_ids:
+                resolved.append((doc, self._vector_ids[original]))
+            else:
+                pending.append((doc, original))
+        self._pending = pending
+        return resolved
@@ -0,0 +1,139 @@
+"""
+Docstore of an index saved in a SQLite file: the documents are pickled one per
+row, next to the docstore id of every index position. An index loaded for search
+reads its documents one at a time, so opening it does not read them all.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Tuple, Union
+
+from langchain.schema import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+
+def save_docstore(
+    path: str, docstore: Docstore, index_to_docstore_id: Mapping[int, str]
+) -> None:
+    """
+    Write the documents of an index to a new SQLite file
+
+    Args:
+        path: str - The path of the file, replaced when it exists
+        docstore: Docstore - The documents
+        index_to_docstore_id: Mapping[int, str] - The docstore id of every index position
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE ids (position INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+            conn.execute("CREATE TABLE docs (id TEXT PRIMARY KEY, doc BLOB NOT NULL)")
+            conn.executemany(
+                "INSERT INTO ids (position, id) VALUES (?, ?)",
+                ((int(position), doc_id) for position, doc_id in index_to_docstore_id.items()))
+            conn.executemany(
+                "INSERT INTO docs (id, doc) VALUES (?, ?)",
+                ((doc_id, pickle.dumps(docstore.search(doc_id)))
+                 for doc_id in index_to_docstore_id.values()))
+    finally:
+        conn.close()
+
+
+def load_docstore(path: str) -> Tuple[InMemoryDocstore, Dict[int, str]]:
+    """
+    Read all the documents of a SQLite docstore, to update the index
+
+    Args:
+        path: str - The path of the file, written by save_docstore
+
+    Returns:
+        Tuple[InMemoryDocstore, Dict[int, str]] - The documents and the docstore
+            id of every index position
+    """
+    conn = sqlite3.connect(path)
+    try:
+        index_to_docstore_id: Dict[int, str] = dict(
+            conn.execute("SELECT position, id FROM ids"))
+        docs: Dict[str, Document] = {
+            doc_id: pickle.loads(doc) for doc_id, doc in conn.execute("SELECT id, doc FROM docs")}
+    finally:
+        conn.close()
+    return InMemoryDocstore(docs), index_to_docstore_id
+
+
+class SqliteDocstore(Docstore):
+    """
+    Read only docstore reading the documents of a SQLite docstore on demand,
+    the documents read once are kept
+
+    Attributes:
+    path: str - The path of the file, written by save_docstore
+    index_to_docstore_id: Mapping[int, str] - The docstore id of every index
+        position, also read on demand
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            f"{Path(os.path.abspath(path)).as_uri()}?mode=ro", uri=True,
+            check_same_thread=False)
+        self._docs: Dict[str, Document] = {}
+        self.index_to_docstore_id: Mapping[int, str] = _IndexToDocstoreId(self)
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a query on the file, from any thread"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Get a document by its docstore id
+
+        Args:
+            search: str - The docstore id
+
+        Returns:
+            Union[str, Document] - The document, or an error message when it is
+                not found as the other docstores do
+        """
+        if search not in self._docs:
+            rows: List[tuple] = self.query("SELECT doc FROM docs WHERE id = ?", (search,))
+            if not rows:
+                return f"ID {search} not found."
+            self._docs[search] = pickle.loads(rows[0][0])
+        return self._docs[search]
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class _IndexToDocstoreId(Mapping[int, str]):
+    """Docstore id of every index position, looked up in a SQLite docstore"""
+
+    def __init__(self, docstore: SqliteDocstore) -> None:
+        self._docstore = docstore
+
+    def __getitem__(self, position: int) -> str:
+        # faiss returns the positions as numpy integers
+        rows: List[tuple] = self._docstore.query(
+            "SELECT id FROM ids WHERE position = ?", (int(position),))
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def __iter__(self) -> Iterator[int]:
+        rows: List[tuple] = self._docstore.query(
+            "SELECT position FROM ids ORDER BY position")
+        return (position for position, in rows)
+
+    def __len__(self) -> int:
+        return self._docstore.query("SELECT COUNT(*) FROM ids")[0][0]
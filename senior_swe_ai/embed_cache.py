@@ -0,0 +1,148 @@
+"""
+Content-addressed embedding cache, so identical chunks (across rebuilds,
+branches, forks or vendored copies) are only sent to the embeddings API once,
+and query embedding cache, so repeated questions are only embedded once
+"""
+from array import array
+from collections import OrderedDict
+import hashlib
+import threading
+import unicodedata
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from senior_swe_ai.cache import DiskCache
+
+
+def embedding_key(text: str, model: str) -> str:
+    """
+    Get the cache key of a text embedded by the given model
+
+    Args:
+        text: str - The embedded text
+        model: str - The name of the embeddings model
+
+    Returns:
+        str - The hex digest of the model name and text
+    """
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper looking documents up in a DiskCache before calling
+    the wrapped embeddings model
+
+    Attributes:
+    embed_mdl: Embeddings - The wrapped embeddings model
+    cache: DiskCache - The persistent cache of the document embeddings
+    model: str - The name of the embeddings model, part of the cache key
+
+    """
+
+    def __init__(self, embed_mdl: Embeddings, cache: DiskCache) -> None:
+        self.embed_mdl = embed_mdl
+        self.cache = cache
+        self.model: str = getattr(embed_mdl, "model", type(embed_mdl).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed the documents, only sending the uncached ones to the model"""
+        keys: List[str] = [embedding_key(text, self.model) for text in texts]
+        cached: dict[str, bytes] = self.cache.get_many(keys)
+
+        missing: dict[str, str] = {
+            key: text for key, text in zip(keys, texts) if key not in cached
+        }
+        if missing:
+            embedded: List[List[float]] = self.embed_mdl.embed_documents(
+                list(missing.values()))
+            new_entries: dict[str, bytes] = {
+                key: array("f", vector).tobytes()
+                for key, vector in zip(missing, embedded)
+            }
+            self.cache.set_many(new_entries)
+            cached.update(new_entries)
+
+        return [array("f", cached[key]).tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed the query with the wrapped model"""
+        return self.embed_mdl.embed_query(text)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query, so spacing and unicode variants share their embedding
+
+    Args:
+        query: str - The query
+
+    Returns:
+        str - The NFKC normalized query, with its whitespace collapsed
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Embeddings wrapper keeping the embeddings of the last queries in memory,
+    and optionally in a DiskCache shared by the sessions
+
+    Attributes:
+    embed_mdl: Embeddings - The wrapped embeddings model
+    model: str - The name of the embeddings model, part of the cache key
+    max_entries: int - The number of queries kept in memory
+    disk: Optional[DiskCache] - The persistent cache of the query embeddings
+    hits: int - The number of queries served from the cache
+    misses: int - The number of queries sent to the model
+
+    """
+
+    def __init__(
+        self, embed_mdl: Embeddings, max_entries: int = 1024,
+        disk: Optional[DiskCache] = None
+    ) -> None:
+        self.embed_mdl = embed_mdl
+        self.model: str = getattr(embed_mdl, "model", type(embed_mdl).__name__)
+        self.max_entries = max_entries
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, vector: List[float], hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed the documents with the wrapped model"""
+        return self.embed_mdl.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed the query, unless the same normalized query was embedded before"""
+        query: str = normalize_query(text)
+        key: str = embedding_key(query, self.model)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(self._entries[key])
+
+        cached: Optional[bytes] = self.disk.get(key) if self.disk is not None else None
+        if cached is not None:
+            vector: List[float] = array("f", cached).tolist()
+        else:
+            vector = self.embed_mdl.embed_query(query)
+            if self.disk is not None:
+                self.disk.set(key, array("f", vector).tobytes())
+        self._remember(key, vector, hit=cached is not None)
+        return list(vector)
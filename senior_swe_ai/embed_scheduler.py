@@ -0,0 +1,194 @@
+"""
+Asyncio embedding scheduler, sending several embedding batches concurrently
+while staying under the tokens-per-minute and requests-per-minute limits
+of the embeddings API
+"""
+import asyncio
+from concurrent.futures import Future
+from itertools import count
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+from senior_swe_ai.llm_handler import get_token_counter
+
+# the transient errors retried with backoff, timeouts are connection errors too
+RETRYABLE_ERRORS = (
+    openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate
+
+    Attributes:
+    rate: float - The number of tokens added per second
+    capacity: float - The maximum number of tokens held, one minute of budget
+    tokens: float - The number of tokens currently available
+
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate: float = per_minute / 60
+        self.capacity: float = per_minute
+        self.tokens: float = per_minute
+        self._updated: float = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> None:
+        """
+        Wait until the given amount of tokens is available and take it
+
+        Args:
+            amount: float - The number of tokens, clamped to the capacity
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        amount = min(amount, self.capacity)
+        # the lock keeps the waiters in order, so large requests are not starved
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class EmbeddingScheduler(Embeddings):
+    """
+    Embeddings model sending batches to the OpenAI embeddings API concurrently
+
+    At most max_in_flight batches are sent at once, each batch waits for its
+    tokens (counted with tiktoken) and for one request in the rate buckets, and
+    rate limited (429), failed (5xx), timed out and disconnected requests are
+    retried with exponential backoff. The scheduler runs its own event loop in
+    a thread, stopped by close.
+
+    Attributes:
+    client: openai.AsyncOpenAI - The OpenAI client, its own retries should be disabled
+    model: str - The embeddings model
+    batch_size: int - The maximum number of texts per request
+    max_in_flight: int - The maximum number of concurrent requests
+    max_retries: int - The number of retries of a failed request
+    retries: int - The number of retries done so far
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        client: openai.AsyncOpenAI,
+        model: str,
+        max_in_flight: int = 4,
+        tokens_per_minute: int = 1_000_000,
+        requests_per_minute: int = 3_000,
+        batch_size: int = 64,
+        max_retries: int = 6,
+        backoff: float = 1.0,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ) -> None:
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retries = 0
+        self._count_tokens: Callable[[str], int] = token_counter or get_token_counter(model)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._requests = TokenBucket(requests_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # the scheduler owns its event loop, so the client stays bound to one loop
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the event loop of the scheduler, once no embedding is pending"""
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _submit(self, texts: List[str]) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._embed(texts), self._loop)
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        batches: List[List[str]] = [
+            texts[start:start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        results: List[List[List[float]]] = await asyncio.gather(
+            *(self._embed_batch(batch) for batch in batches))
+        return [vector for batch in results for vector in batch]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        tokens: int = sum(self._count_tokens(text) for text in texts)
+        async with self._semaphore:
+            for attempt in count():
+                await self._requests.acquire(1)
+                await self._tokens.acquire(tokens)
+                try:
+                    response = await self.client.embeddings.create(
+                        input=texts, model=self.model)
+                    return [item.embedding for item in sorted(
+                        response.data, key=lambda item: item.index)]
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(self._retry_delay(e, attempt))
+
+    def _retry_delay(self, error: openai.APIError, attempt: int) -> float:
+        """
+        Get the delay before retrying a request, the one asked by the server if any
+
+        Args:
+            error: openai.APIError - The error of the request
+            attempt: int - The number of the failed attempt, from 0
+
+        Returns:
+            float - The delay in seconds
+        """
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else {}
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except (KeyError, TypeError, ValueError):
+            pass
+        try:
+            return float(headers["retry-after"])
+        except (KeyError, TypeError, ValueError):
+            return self.backoff * 2 ** attempt * (1 + random.random())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed the documents, sending their batches concurrently"""
+        if not texts:
+            return []
+        return self._submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed the query"""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed the documents from another event loop"""
+        if not texts:
+            return []
+        return await asyncio.wrap_future(self._submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed the query from another event loop"""
+        return (await self.aembed_documents([text]))[0]
@@ -1,12 +1,15 @@
 """Module for handling file I/O operations"""
-from typing import List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
 import os
 import chardet
 
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_text_splitters import Language
-from senior_swe_ai.git_process import get_hash
+from senior_swe_ai.git_process import get_hash, get_hashes
 from senior_swe_ai.llm_handler import get_langchain_language, get_langchain_text_splitters
 from senior_swe_ai.tree_parser.base import BaseTreeParser, TreeParserMethodNode
 
@@ -24,42 +27,141 @@ def get_extension(file_path: str) -> str:
     return '.' + file_path.split('.')[-1]
 
 
-def parse_code_files(code_files: list[str]) -> list[Document]:
+def parse_code_files(
+        code_files: list[str],
+        hashes: Optional[dict[str, str]] = None,
+        workers: int = 1,
+        chunk_size: int = 64
+) -> list[Document]:
     """
     Parse the given code files and return a list of Documents
 
     Args:
         code_files: list[str] - The list of code files
+        hashes: Optional[dict[str, str]] - The hash of each code file,
+            collected in bulk when not given
+        workers: int - The number of worker processes, 1 parses in this process
+        chunk_size: int - The number of files handed to a worker at once
+
+    Returns:
+        list[Document] - The list of Documents, in the order of the code files
+    """
+    if hashes is None:
+        hashes = get_hashes(code_files)
+    if len(code_files) <= chunk_size:
+        workers = 1
+    return list(iter_code_files(code_files, hashes, workers, chunk_size))
+
+
+def iter_code_files(
+        code_files: Iterable[str],
+        hashes: Optional[dict[str, str]] = None,
+        workers: int = 1,
+        chunk_size: int = 64
+) -> Iterator[Document]:
+    """
+    Lazily parse the given code files and yield their Documents, so only the
+    files in flight are held in memory
+
+    Args:
+        code_files: Iterable[str] - The code files, possibly a generator
+        hashes: Optional[dict[str, str]] - The hash of each code file
+        workers: int - The number of worker processes, 1 parses in this process
+        chunk_size: int - The number of files handed to a worker at once
+
+    Yields:
+        Document - The Documents, in the order of the code files
+    """
+    hashes = hashes or {}
+    if workers <= 1:
+        for code_file in code_files:
+            yield from parse_code_file(code_file, hashes)
+        return
+
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk: list[str] = []
+        for code_file in code_files:
+            chunk.append(code_file)
+            if len(chunk) < chunk_size:
+                continue
+            pending.append(executor.submit(
+                parse_code_files_chunk, chunk, _chunk_hashes(chunk, hashes)))
+            chunk = []
+            # backpressure: wait for the oldest chunk before submitting more
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        if chunk:
+            pending.append(executor.submit(
+                parse_code_files_chunk, chunk, _chunk_hashes(chunk, hashes)))
+        # chunks are consumed in submission order, so the result is deterministic
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _chunk_hashes(chunk: list[str], hashes: dict[str, str]) -> dict[str, str]:
+    """Select the hashes of a chunk, to only send those to the worker"""
+    return {code_file: hashes[code_file] for code_file in chunk if code_file in hashes}
+
+
+def parse_code_files_chunk(
+        code_files: list[str],
+        hashes: dict[str, str]
+) -> list[Document]:
+    """
+    Parse a chunk of code files in the current process
+
+    Args:
+        code_files: list[str] - The list of code files
+        hashes: dict[str, str] - The hash of each code file
 
     Returns:
         list[Document] - The list of Documents
     """
     documents: list = []
     for code_file in code_files:
-        file_bytes, commit_hash, programming_language, file_extension = read_file_and_get_metadata(
-            code_file)
-        if programming_language is None:
-            continue
+        documents.extend(parse_code_file(code_file, hashes))
 
-        code_splitter: RecursiveCharacterTextSplitter = create_character_text_splitter(
-            programming_language)
-        treesitter_nodes: List[TreeParserMethodNode] = parse_file_with_treesitter(
-            file_bytes, programming_language)
+    return documents
 
-        documents.extend(create_documents_from_nodes(
-            treesitter_nodes, code_file, commit_hash,
-            code_splitter, programming_language, file_extension
-        ))
 
-    return documents
+def parse_code_file(code_file: str, hashes: dict[str, str]) -> list[Document]:
+    """
+    Parse a single code file and return its Documents
 
+    Args:
+        code_file: str - The code file path
+        hashes: dict[str, str] - The hash of each code file
 
-def read_file_and_get_metadata(code_file: str) -> Tuple[bytes, str, Optional[Language]]:
+    Returns:
+        list[Document] - The list of Documents, empty for unsupported languages
+    """
+    file_bytes, commit_hash, programming_language, file_extension = read_file_and_get_metadata(
+        code_file, hashes)
+    if programming_language is None:
+        return []
+
+    code_splitter: RecursiveCharacterTextSplitter = create_character_text_splitter(
+        programming_language)
+    treesitter_nodes: List[TreeParserMethodNode] = parse_file_with_treesitter(
+        file_bytes, programming_language)
+
+    return create_documents_from_nodes(
+        treesitter_nodes, code_file, commit_hash,
+        code_splitter, programming_language, file_extension
+    )
+
+
+def read_file_and_get_metadata(
+        code_file: str,
+        hashes: Optional[dict[str, str]] = None
+) -> Tuple[bytes, str, Optional[Language]]:
     """
     Read the file and get the metadata
 
     Args:
         code_file: str - The code file path
+        hashes: Optional[dict[str, str]] - The hash of each code file
 
     Returns:
         Tuple[bytes, str, Optional[Language]] - The file bytes, commit hash, programming language
@@ -77,7 +179,10 @@ def read_file_and_get_metadata(code_file: str) -> Tuple[bytes, str, Optional[Lan
             with open(code_file, "r", encoding=encoding) as file:
                 file_bytes: bytes = file.read().encode()
 
-    commit_hash: str = get_hash(code_file)
+    if hashes and code_file in hashes:
+        commit_hash: str = hashes[code_file]
+    else:
+        commit_hash = get_hash(code_file)
     file_extension: str = get_extension(code_file)
     programming_language: Language | None = get_langchain_text_splitters(
         file_extension)
@@ -99,7 +204,7 @@ def parse_file_with_treesitter(
     Returns:
         list[TreeParserMethodNode] - The list of method nodes
     """
-    treesitter_parser = BaseTreeParser.create_treesitter(programming_language)
+    treesitter_parser = BaseTreeParser.get_treesitter(programming_language)
     treesitter_nodes: list[TreeParserMethodNode] = treesitter_parser.parse(
         file_bytes)
 
@@ -146,6 +251,7 @@ def create_documents_from_nodes(
                 page_content=splitted_document,
                 metadata={
                     "filename": filename,
+                    "file_path": code_file,
                     "method_name": node.name,
                     "commit_hash": commit_hash,
                     'language': programming_language,
@@ -157,9 +263,11 @@ def create_documents_from_nodes(
     return documents
 
 
+@lru_cache(maxsize=None)
 def create_character_text_splitter(language: Language) -> RecursiveCharacterTextSplitter:
     """
-    Create a RecursiveCharacterTextSplitter for the given language
+    Create a RecursiveCharacterTextSplitter for the given language, once per
+    language and process
     
     Args:
         language: Language - The programming language
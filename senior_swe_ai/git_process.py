@@ -1,8 +1,13 @@
 """     This module contains functions to interact with git repositories. """
 import os
 import subprocess
+from typing import Iterator
 from senior_swe_ai.consts import EXCLUDE_DIRS, EXCLUDE_FILES, INCLUDE_FILES
 
+_EXCLUDE_DIRS: frozenset[str] = frozenset(EXCLUDE_DIRS)
+_EXCLUDE_FILES: frozenset[str] = frozenset(EXCLUDE_FILES)
+_INCLUDE_FILES: frozenset[str] = frozenset(INCLUDE_FILES)
+
 
 def is_git_repo() -> bool:
     """
@@ -49,24 +54,91 @@ def recursive_load_files() -> list[str]:
     Returns:
         list[str]: The list of files in the git repository
     """
+    return list(iter_repo_files())
+
+
+def iter_repo_files() -> Iterator[str]:
+    """
+    Lazily enumerate the files of the git repository, from the git index when
+    possible (which respects .gitignore), from a pruned walk otherwise
+
+    Yields:
+        str: The path of each file to index
+    """
     git_root: str = get_repo_root()
-    file_list: list = []
+    try:
+        rel_paths: list[str] = _git_ls_files(git_root)
+    except (OSError, subprocess.CalledProcessError):
+        yield from _walk_files(git_root)
+        return
 
-    for root, _, files in os.walk(git_root):
-        if any(blacklist in root for blacklist in EXCLUDE_DIRS):
-            continue
-        for file in files:
-            file_ext: str = os.path.splitext(file)[1]
-            if any(whitelist == file_ext for whitelist in INCLUDE_FILES):
-                if file not in EXCLUDE_FILES:
-                    file_list.append(os.path.join(root, file))
+    for rel_path in rel_paths:
+        parts: list[str] = rel_path.split("/")
+        if _is_included(parts[-1]) and _EXCLUDE_DIRS.isdisjoint(parts[:-1]):
+            yield os.path.join(git_root, *parts)
+
+
+def _is_included(file: str) -> bool:
+    """Check the file name against the included extensions and excluded files"""
+    return os.path.splitext(file)[1] in _INCLUDE_FILES and file not in _EXCLUDE_FILES
+
+
+def _ls_files(git_root: str, *options: str) -> list[str]:
+    """
+    Run `git ls-files -z` with the given options
+
+    Args:
+        git_root (str): The root directory of the git repository
+        options (str): The options of git ls-files
+
+    Returns:
+        list[str]: The entries listed, relative to the root
+    """
+    return [
+        entry for entry in subprocess.run(
+            ["git", "ls-files", "-z", *options],
+            capture_output=True, check=True, text=True, cwd=git_root,
+        ).stdout.split("\0") if entry
+    ]
+
+
+def _git_ls_files(git_root: str) -> list[str]:
+    """
+    List the tracked and untracked (not ignored) files that exist in the working tree
+
+    Args:
+        git_root (str): The root directory of the git repository
+
+    Returns:
+        list[str]: The paths of the files relative to the root, with "/" separators
+    """
+    deleted: set[str] = set(_ls_files(git_root, "--deleted"))
+    return [
+        rel_path for rel_path in _ls_files(git_root, "--cached", "--others", "--exclude-standard")
+        if rel_path not in deleted
+    ]
+
+
+def _walk_files(git_root: str) -> Iterator[str]:
+    """
+    Walk the repository without descending into the excluded directories
+
+    Args:
+        git_root (str): The root directory of the git repository
 
-    return file_list
+    Yields:
+        str: The path of each file to index
+    """
+    for root, dirs, files in os.walk(git_root):
+        dirs[:] = [directory for directory in dirs if directory not in _EXCLUDE_DIRS]
+        for file in files:
+            if _is_included(file):
+                yield os.path.join(root, file)
 
 
 def get_hash(file_path: str) -> str:
     """
-    Get the hash of the file
+    Get the hash of the file, the blob id of its content like get_file_hashes
 
     Args:
         file_path (str): The path of the file
@@ -75,8 +147,100 @@ def get_hash(file_path: str) -> str:
         str: The hash of the file
     """
     return subprocess.run(
-        ["git", "log", "-1", "--pretty=format:%H", file_path],
+        ["git", "hash-object", file_path],
         capture_output=True,
         check=True,
         text=True,
     ).stdout.strip()
+
+
+def _hash_objects(git_root: str, rel_paths: list[str]) -> list[str]:
+    """
+    Hash the working tree content of the given files in a single git call
+
+    Args:
+        git_root (str): The root directory of the git repository
+        rel_paths (list[str]): The paths of the files relative to the root
+
+    Returns:
+        list[str]: The blob id of every file, in the same order
+    """
+    if not rel_paths:
+        return []
+    return subprocess.run(
+        ["git", "hash-object", "--stdin-paths"],
+        input="\n".join(rel_paths),
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=git_root,
+    ).stdout.split()
+
+
+def get_file_hashes() -> dict[str, str]:
+    """
+    Get the blob id of every tracked and untracked (not ignored) file of the
+    repository with a few git invocations instead of one per file, the files
+    deleted from the working tree are left out
+
+    Returns:
+        dict[str, str]: The blob id of each file, keyed by its absolute path
+    """
+    git_root: str = get_repo_root()
+
+    hashes: dict[str, str] = {}
+    conflicted: list[str] = []
+    # "<mode> <blob id> <stage>\t<path>" for every file of the index, the
+    # stages 1-3 of a path being merged are hashed from the working tree
+    for entry in _ls_files(git_root, "--stage"):
+        meta, rel_path = entry.split("\t", 1)
+        _, blob_id, stage = meta.split()
+        if stage == "0":
+            hashes[rel_path] = blob_id
+        else:
+            conflicted.append(rel_path)
+    for rel_path in _ls_files(git_root, "--deleted"):
+        hashes.pop(rel_path, None)
+
+    # files whose working tree content differs from the index, or that are untracked
+    dirty: list[str] = [
+        rel_path for rel_path in dict.fromkeys(conflicted + _ls_files(
+            git_root, "--modified", "--others", "--exclude-standard"))
+        if os.path.isfile(os.path.join(git_root, rel_path))
+    ]
+    hashes.update(zip(dirty, _hash_objects(git_root, dirty)))
+
+    return {
+        os.path.normpath(os.path.join(git_root, rel_path)): blob_id
+        for rel_path, blob_id in hashes.items()
+    }
+
+
+def get_hashes(files: list[str]) -> dict[str, str]:
+    """
+    Get the hash of each of the given files
+
+    Args:
+        files (list[str]): The paths of the files
+
+    Returns:
+        dict[str, str]: The hash of each file, keyed by its path, the files
+        that do not exist are left out
+    """
+    try:
+        repo_hashes: dict[str, str] = get_file_hashes()
+    except subprocess.CalledProcessError:
+        repo_hashes = {}
+    # the files git does not list (ignored ones) are hashed by content as well,
+    # a commit hash would change with every commit and re-embed them
+    # a path git cannot read would abort the whole batch
+    missing: list[str] = [
+        file for file in files
+        if os.path.normpath(os.path.abspath(file)) not in repo_hashes and os.path.isfile(file)]
+    hashes: dict[str, str] = dict(zip(missing, _hash_objects(
+        os.getcwd(), [os.path.abspath(file) for file in missing])))
+    for file in files:
+        repo_hash: str | None = repo_hashes.get(os.path.normpath(os.path.abspath(file)))
+        if repo_hash:
+            hashes[file] = repo_hash
+    return {file: hashes[file] for file in files if file in hashes}
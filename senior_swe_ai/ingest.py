@@ -0,0 +1,177 @@
+"""
+Streaming ingestion pipeline, indexing the code files stage by stage:
+enumerate the files, parse and chunk them, drop the duplicate chunks, embed
+the chunks in batches and add the batches to the index. Every stage is a
+generator pulling from the previous one, so only the batches in flight are
+held in memory.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+from rich.console import Console
+from rich.progress import BarColumn, Progress, TaskID, TextColumn, TimeElapsedColumn
+
+from senior_swe_ai.dedupe import ChunkDeduplicator
+from senior_swe_ai.file_handler import iter_code_files
+from senior_swe_ai.vec_store import VectorStore
+
+BATCH_SIZE = 256
+# batches embedded at once: 8 batches of 256 chunks are 32 requests of the
+# scheduler, which keeps its max_in_flight limit the effective one
+EMBED_AHEAD = 8
+# a checkpoint is saved once the chunks indexed since the previous one are at least
+# as many as before it (and CHECKPOINT_MIN_CHUNKS), so the checkpoints write at
+# most twice the final index in total
+CHECKPOINT_MIN_CHUNKS = 5_000
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Group the items of an iterable into lists of the given size
+
+    Args:
+        items: Iterable[Any] - The items
+        size: int - The size of each batch, the last one may be smaller
+
+    Yields:
+        List[Any] - The batches
+    """
+    iterator: Iterator[Any] = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def track(items: Iterable[Any], progress: Progress, task: TaskID) -> Iterator[Any]:
+    """
+    Advance a progress task for every item pulled through this stage
+
+    Args:
+        items: Iterable[Any] - The items of the stage
+        progress: Progress - The progress display
+        task: TaskID - The task of the stage
+
+    Yields:
+        Any - The items, unchanged
+    """
+    for item in items:
+        progress.advance(task)
+        yield item
+
+
+def embed_batches(
+        batches: Iterable[List[Document]], embed_mdl, ahead: int = EMBED_AHEAD
+) -> Iterator[Tuple[List[Document], List[List[float]]]]:
+    """
+    Embed the documents batch by batch, with up to `ahead` batches sent before
+    the oldest one is taken, so the requests run concurrently and the next
+    files are parsed meanwhile
+
+    Args:
+        batches: Iterable[List[Document]] - The batches of documents
+        embed_mdl: Embeddings - The embeddings model, called from several threads
+        ahead: int - The number of batches embedded at once
+
+    Yields:
+        Tuple[List[Document], List[List[float]]] - Each batch with its embeddings, in order
+    """
+    pending: deque[Tuple[List[Document], Future]] = deque()
+    with ThreadPoolExecutor(max_workers=ahead, thread_name_prefix="embed") as executor:
+        for batch in batches:
+            pending.append((batch, executor.submit(
+                embed_mdl.embed_documents, [doc.page_content for doc in batch])))
+            if len(pending) >= ahead:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+
+def index_files(
+        vec_store: VectorStore,
+        files: Iterable[str],
+        hashes: dict[str, str],
+        workers: int = 1,
+        batch_size: int = BATCH_SIZE,
+        console: Optional[Console] = None
+) -> int:
+    """
+    Stream the given files through the pipeline into the vector store, saving
+    checkpoints of the index at doubling intervals
+
+    The files are recorded in the vector cache as soon as all their chunks are
+    indexed, so only the files in flight are held.
+
+    Args:
+        vec_store: VectorStore - The vector store to add the chunks to
+        files: Iterable[str] - The code files, possibly a generator
+        hashes: dict[str, str] - The hash of each code file
+        workers: int - The number of processes parsing the files
+        batch_size: int - The number of chunks embedded at once
+        console: Optional[Console] - The console to report the progress on
+
+    Returns:
+        int - The number of unique chunks indexed
+    """
+    in_flight: deque[str] = deque()
+    waiting: List[str] = []
+    indexed = 0
+    checkpointed = 0
+    columns = (
+        TextColumn("{task.description:<12}"), BarColumn(),
+        TextColumn("{task.completed:>8}"), TimeElapsedColumn(),
+    )
+    with Progress(*columns, console=console) as progress:
+        files_task: TaskID = progress.add_task("files", total=None)
+        chunks_task: TaskID = progress.add_task("chunks", total=None)
+        embed_task: TaskID = progress.add_task("embedded", total=None)
+        index_task: TaskID = progress.add_task("indexed", total=None)
+        dup_task: TaskID = progress.add_task("duplicates", total=None)
+
+        def enumerate_files() -> Iterator[str]:
+            for file in track(files, progress, files_task):
+                in_flight.append(file)
+                yield file
+
+        def record_done(current: Optional[str]) -> None:
+            # the files before the current one have all their chunks indexed,
+            # unless one of their duplicates waits for its original
+            nonlocal waiting
+            while in_flight and in_flight[0] != current:
+                waiting.append(in_flight.popleft())
+            pending: set[str] = dedupe.pending_files()
+            vec_store.record_files({file: hashes[file] for file in waiting
+                                    if file in hashes and file not in pending})
+            waiting = [file for file in waiting if file in pending]
+
+        dedupe = ChunkDeduplicator(
+            scope=vec_store.dedupe_scope, indexed_chunks=vec_store.indexed_chunks)
+        docs: Iterator[Document] = dedupe.unique(track(
+            iter_code_files(enumerate_files(), hashes, workers), progress, chunks_task))
+        embedded = embed_batches(batched(docs, batch_size), vec_store.embed_mdl)
+        for batch, embeddings in embedded:
+            progress.advance(embed_task, len(batch))
+            dedupe.indexed(batch, vec_store.add_embeddings(batch, embeddings))
+            duplicates = dedupe.resolved()
+            vec_store.add_duplicates(duplicates)
+            progress.advance(dup_task, len(duplicates))
+            indexed += len(batch)
+            progress.advance(index_task, len(batch))
+            record_done(batch[-1].metadata["file_path"])
+            if indexed - checkpointed >= max(CHECKPOINT_MIN_CHUNKS, checkpointed):
+                vec_store.save(incomplete_file=batch[-1].metadata["file_path"])
+                checkpointed = indexed
+
+        duplicates = dedupe.resolved()
+        vec_store.add_duplicates(duplicates)
+        progress.advance(dup_task, len(duplicates))
+        record_done(None)
+        for task in (files_task, chunks_task, embed_task, index_task, dup_task):
+            progress.update(task, total=progress.tasks[task].completed)
+
+    if vec_store.db:
+        vec_store.save()
+    return indexed
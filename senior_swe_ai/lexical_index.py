@@ -0,0 +1,191 @@
+"""
+BM25 inverted index over the code chunks, stored as flat arrays in a single
+file which is memory mapped, so loading it does not depend on its size
+"""
+import hashlib
+import re
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"SSBM25\x00\x01"
+# n_docs, n_terms, n_postings, id_width, average document length
+HEADER = struct.Struct("<8sQQQQd")
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split code or a question into lower case terms, every identifier is kept
+    whole and also split into its snake_case and camelCase parts
+
+    Args:
+        text: str - The text
+
+    Returns:
+        List[str] - The terms, in order
+    """
+    terms: List[str] = []
+    for word in _WORD.findall(text):
+        terms.append(word.lower())
+        parts: List[str] = _SUBWORD.findall(word)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+def term_hash(term: str) -> int:
+    """Get the 64 bit hash identifying a term in the index"""
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index, sorted term hashes with the offsets of their postings
+
+    Attributes:
+    term_hashes: np.ndarray - The sorted hashes of the terms (uint64)
+    offsets: np.ndarray - The start of the postings of each term, and their end (int64)
+    postings: np.ndarray - The documents of each term (uint32)
+    frequencies: np.ndarray - The frequency of the term in each posting (uint32)
+    doc_lengths: np.ndarray - The number of terms of each document (uint32)
+    doc_ids: np.ndarray - The docstore id of each document (bytes)
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self, term_hashes: np.ndarray, offsets: np.ndarray, postings: np.ndarray,
+        frequencies: np.ndarray, doc_lengths: np.ndarray, doc_ids: np.ndarray,
+        avg_length: Optional[float] = None
+    ) -> None:
+        self.term_hashes = term_hashes
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        if avg_length is None:
+            avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        # empty documents only would divide the length normalization by zero
+        self.avg_length: float = max(avg_length, 1.0)
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]]) -> "LexicalIndex":
+        """
+        Build the index of the given documents
+
+        Args:
+            docs: Iterable[Tuple[str, str]] - The docstore id and text of each document
+
+        Returns:
+            LexicalIndex - The index
+        """
+        doc_ids: List[str] = []
+        doc_lengths: List[int] = []
+        postings: dict[int, List[Tuple[int, int]]] = {}
+        for doc, (doc_id, text) in enumerate(docs):
+            terms: List[str] = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(terms))
+            counts: dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings.setdefault(term_hash(term), []).append((doc, count))
+
+        term_hashes: np.ndarray = np.array(sorted(postings), dtype=np.uint64)
+        lists: List[List[Tuple[int, int]]] = [postings[int(h)] for h in term_hashes]
+        offsets: np.ndarray = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(entries) for entries in lists], out=offsets[1:])
+        flat: np.ndarray = np.array(
+            [entry for entries in lists for entry in entries], dtype=np.uint32).reshape(-1, 2)
+        return cls(
+            term_hashes, offsets, np.ascontiguousarray(flat[:, 0]),
+            np.ascontiguousarray(flat[:, 1]), np.array(doc_lengths, dtype=np.uint32),
+            np.array([doc_id.encode() for doc_id in doc_ids], dtype=bytes))
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a file, every array aligned to 8 bytes
+
+        Args:
+            path: str - The path of the file
+        """
+        id_width: int = self.doc_ids.dtype.itemsize if len(self.doc_ids) else 0
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.doc_lengths), len(self.term_hashes),
+                                len(self.postings), id_width, self.avg_length))
+            for array in (self.term_hashes, self.offsets, self.postings,
+                          self.frequencies, self.doc_lengths, self.doc_ids):
+                f.write(array.tobytes())
+                f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """
+        Memory map an index written by save
+
+        Args:
+            path: str - The path of the file
+
+        Returns:
+            LexicalIndex - The index, its arrays are views of the mapped file
+        """
+        data: np.memmap = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, n_docs, n_terms, n_postings, id_width, avg_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a lexical index")
+        offset: int = HEADER.size
+        arrays: List[np.ndarray] = []
+        for dtype, count in ((np.uint64, n_terms), (np.int64, n_terms + 1),
+                             (np.uint32, n_postings), (np.uint32, n_postings),
+                             (np.uint32, n_docs), (np.dtype(f"S{max(id_width, 1)}"), n_docs)):
+            offset = _aligned(offset)
+            array: np.ndarray = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            arrays.append(array)
+            offset += array.nbytes
+        return cls(*arrays, avg_length=avg_length)
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[str, float]]:
+        """
+        Rank the documents by their BM25 score for the query
+
+        Args:
+            query: str - The query
+            k: int - The number of documents returned
+
+        Returns:
+            List[Tuple[str, float]] - The docstore id and score of the best documents
+        """
+        n_docs: int = len(self.doc_lengths)
+        hashes: np.ndarray = np.array(
+            sorted({term_hash(term) for term in tokenize(query)}), dtype=np.uint64)
+        if not n_docs or not len(hashes):
+            return []
+        positions: np.ndarray = np.searchsorted(self.term_hashes, hashes)
+        scores: np.ndarray = np.zeros(n_docs, dtype=np.float32)
+        for hashed, position in zip(hashes, positions):
+            if position == len(self.term_hashes) or self.term_hashes[position] != hashed:
+                continue
+            start, end = self.offsets[position], self.offsets[position + 1]
+            docs: np.ndarray = self.postings[start:end]
+            freqs: np.ndarray = self.frequencies[start:end].astype(np.float32)
+            norms: np.ndarray = K1 * (1 - B + B * self.doc_lengths[docs] / self.avg_length)
+            idf: float = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * freqs * (K1 + 1) / (freqs + norms)
+
+        top: np.ndarray = np.arange(n_docs)
+        if n_docs > k:
+            top = np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.doc_ids[doc].decode(), float(scores[doc]))
+                for doc in top if scores[doc] > 0]
@@ -1,7 +1,10 @@
 """This module contains functions to interact with LLMs and their embeddings
     using Langchain
 """
+from functools import lru_cache
+from typing import Callable
 from langchain import text_splitter
+import tiktoken
 from senior_swe_ai.consts import Language
 
 
@@ -62,3 +65,21 @@ def get_langchain_language(language: Language) -> text_splitter.Language | None:
         Language.HASKELL: None,  # : Add Haskell support
     }
     return lang_map.get(language, None)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Get a function counting the tiktoken tokens of a text for the given model
+
+    Args:
+        model: str - The OpenAI model name
+
+    Returns:
+        Callable[[str], int] - The token counter
+    """
+    try:
+        encoding: tiktoken.Encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,146 @@
+"""
+Conversation memory keeping the recent turns verbatim within a token budget,
+the older turns are folded into a running summary in a background thread, so
+no answer waits for a summarization call
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.summary import SummarizerMixin
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from senior_swe_ai.llm_handler import get_token_counter
+
+# tokens added by the chat format around the content of every message
+MESSAGE_OVERHEAD = 4
+
+
+class BackgroundSummaryMemory(BaseChatMemory, SummarizerMixin):
+    """
+    Memory of the last turns verbatim, at most max_turns of them within
+    max_token_limit tokens, preceded by a summary of the older turns
+
+    The turns pushed out of the budget stay in the history verbatim until the
+    background summarization has folded them into the summary.
+
+    Attributes:
+    max_token_limit: int - The token budget of the verbatim messages
+    max_turns: int - The maximum number of verbatim turns (question and answer)
+    memory_key: str - The input variable of the memory in the chain
+    token_counter: Optional[Callable[[str], int]] - Counts the tokens of a text,
+        with the tiktoken encoding of the chat model by default
+    moving_summary_buffer: str - The summary of the older turns
+
+    """
+
+    max_token_limit: int = 2000
+    max_turns: int = 8
+    memory_key: str = "history"
+    token_counter: Optional[Callable[[str], int]] = None
+    moving_summary_buffer: str = ""
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _running: bool = PrivateAttr(default=False)
+    _epoch: int = PrivateAttr(default=0)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """The variables of the memory in the chain"""
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get the history, without waiting for the summarization
+
+        Args:
+            inputs: Dict[str, Any] - The inputs of the chain
+
+        Returns:
+            Dict[str, Any] - The summary message, the turns not summarized yet
+            and the recent turns
+        """
+        with self._lock:
+            buffer: List[BaseMessage] = self._pending + self.chat_memory.messages
+            if self.moving_summary_buffer:
+                buffer = [self.summary_message_cls(content=self.moving_summary_buffer)] + buffer
+        if self.return_messages:
+            return {self.memory_key: buffer}
+        return {self.memory_key: get_buffer_string(
+            buffer, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """
+        Save a turn, and summarize the turns pushed out of the budget in the background
+
+        Args:
+            inputs: Dict[str, Any] - The inputs of the chain
+            outputs: Dict[str, str] - The outputs of the chain
+        """
+        super().save_context(inputs, outputs)
+        with self._lock:
+            self._pending.extend(self._prune())
+            if not self._pending or self._running:
+                return
+            self._running = True
+            epoch: int = self._epoch
+        threading.Thread(target=self._summarize, args=(epoch,), daemon=True).start()
+
+    def _count_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens of a message, with the overhead of the chat format"""
+        if self.token_counter is None:
+            self.token_counter = get_token_counter(getattr(self.llm, "model_name", ""))
+        return self.token_counter(str(message.content)) + MESSAGE_OVERHEAD
+
+    def _prune(self) -> List[BaseMessage]:
+        """Take the oldest messages out of the buffer until it fits the budget"""
+        buffer: List[BaseMessage] = self.chat_memory.messages
+        tokens: int = sum(self._count_tokens(message) for message in buffer)
+        pruned: List[BaseMessage] = []
+        # the last turn is kept whatever its size
+        while len(buffer) > 2 and (len(buffer) > 2 * self.max_turns
+                                   or tokens > self.max_token_limit):
+            pruned.append(buffer.pop(0))
+            tokens -= self._count_tokens(pruned[-1])
+        return pruned
+
+    def _summarize(self, epoch: int) -> None:
+        """
+        Fold the pending messages into the summary, until none is left
+
+        Args:
+            epoch: int - The number of clears when it started, a cleared history
+                drops its result
+        """
+        while True:
+            with self._lock:
+                if epoch != self._epoch:
+                    return
+                pending: List[BaseMessage] = list(self._pending)
+                summary: str = self.moving_summary_buffer
+                if not pending:
+                    self._running = False
+                    return
+            try:
+                summary = self.predict_new_summary(pending, summary)
+            except Exception:  # pylint: disable=broad-except
+                # the messages stay verbatim, the next turn retries
+                summary = ""
+            with self._lock:
+                if epoch != self._epoch:
+                    return
+                if not summary:
+                    self._running = False
+                    return
+                self.moving_summary_buffer = summary
+                del self._pending[:len(pending)]
+
+    def clear(self) -> None:
+        """Clear the history, dropping a summary in progress"""
+        with self._lock:
+            super().clear()
+            self.moving_summary_buffer = ""
+            self._pending.clear()
+            self._epoch += 1
+            self._running = False
@@ -2,23 +2,37 @@
 This module is responsible for creating panels for the chatbox and other components. 
 It uses the rich library to create panels.
 """
-from typing import Any
+from collections import deque
+from typing import Any, Optional
 from rich.panel import Panel
 from rich.console import Console
 from rich.columns import Columns
 from rich.align import Align
+from rich.control import Control, ControlType
+from rich.live import Live
 from rich.text import Text
 from rich.status import Status
 
+# the number of recent chatboxes kept for a full redraw
+WINDOW = 50
+
 
 class PanelBase:
-    """This class is responsible for creating panels for the chatbox and other components."""
+    """
+    This class is responsible for creating panels for the chatbox and other components.
+
+    The chat is printed incrementally: print_new prints only the chatboxes added
+    since the last print, below the previous ones, so its cost does not grow with
+    the conversation. Only a window of the recent chatboxes is kept, for a full
+    redraw by print_stdout.
+    """
 
-    def __init__(self, title, width=50) -> None:
+    def __init__(self, title, width=50, window=WINDOW) -> None:
         self.title: str = title
         self.width: int = width
         self.console = Console()
-        self._queue = Queue()
+        self._queue = Queue(maxlen=window)
+        self._pending = Queue()
 
     def _create_base_panel(self) -> Panel:
         """Create a base panel for the chatbox."""
@@ -31,37 +45,65 @@ class PanelBase:
     def _cache_content(self, content: Panel) -> None:
         """Cache the content of the chatbox."""
         self._queue.enqueue(content)
+        self._pending.enqueue(content)
 
-    def create_chatbox(self, title: str, content: str, width=100, is_ai=True) -> Panel:
-        """Create a chatbox panel."""
+    def render_chatbox(
+        self, title: str, content: str, width=100, is_ai=True, subtitle: Optional[str] = None
+    ) -> Align:
+        """Render a chatbox panel, without adding it to the chat."""
         content = Text(content, overflow="fold")
         if not is_ai:
-            chatbox: Panel = Panel.fit(content, width=width,
-                                       title=title, border_style="blue", title_align="left")
-            aligned_chatbox: Align = Align.left(chatbox, width=50)
-        else:
-            chatbox = Panel.fit(content, width=width,
-                                title=title, border_style="green", title_align="right")
-            aligned_chatbox = Align.right(chatbox, width=50)
-
+            chatbox: Panel = Panel.fit(content, width=width, title=title, subtitle=subtitle,
+                                       border_style="blue", title_align="left")
+            return Align.left(chatbox, width=50)
+        chatbox = Panel.fit(content, width=width, title=title, subtitle=subtitle,
+                            border_style="green", title_align="right", subtitle_align="right")
+        return Align.right(chatbox, width=50)
+
+    def create_chatbox(
+        self, title: str, content: str, width=100, is_ai=True, subtitle: Optional[str] = None
+    ) -> Panel:
+        """Create a chatbox panel."""
+        aligned_chatbox: Align = self.render_chatbox(title, content, width, is_ai, subtitle)
         self._cache_content(aligned_chatbox)
-        return chatbox
+        return aligned_chatbox.renderable
+
+    def create_live(self) -> Live:
+        """Create a live region, redrawn while a streamed answer grows."""
+        return Live(console=self.console, refresh_per_second=12, transient=True)
 
     def print_stdout(self) -> None:
-        """Print the panel."""
+        """Print the panel of the recent chatboxes."""
+        self._pending = Queue()
         if self._queue.size() > 0:
             self.console.print(self._create_base_panel())
 
+    def print_header(self) -> None:
+        """Print the title of the chat, above the chatboxes printed by print_new."""
+        self.console.rule(self.title, style="cyan")
+
+    def print_new(self) -> None:
+        """Print the chatboxes added since the last print."""
+        while not self._pending.is_empty():
+            self.console.print(self._pending.dequeue())
+
+    def erase_lines(self, count: int = 1) -> None:
+        """Erase the last lines of the terminal, such as the echo of an input."""
+        if self.console.is_terminal:
+            for _ in range(count):
+                self.console.control(
+                    Control.move(0, -1), Control((ControlType.ERASE_IN_LINE, 2)))
+
     def create_status(self, text: str, spinner: str) -> Status:
         """Create a status panel."""
         return Status(text, spinner=spinner)
 
 
 class Queue:
-    """A simple Queue class."""
+    """A simple Queue class, dropping its oldest items beyond maxlen."""
 
-    def __init__(self) -> None:
-        self.queue = []
+    def __init__(self, maxlen: Optional[int] = None) -> None:
+        self.queue: deque = deque(maxlen=maxlen)
 
     def enqueue(self, item) -> None:
         """Add an item to the end of the queue."""
@@ -70,7 +112,7 @@ class Queue:
     def dequeue(self) -> Any | None:
         """Remove an item from the front of the queue."""
         if not self.is_empty():
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def is_empty(self) -> bool:
@@ -85,13 +127,13 @@ class Queue:
 if __name__ == "__main__":
     panel = PanelBase("Chat Panel", width=70)
 
+    panel.print_header()
     while True:
         user = panel.console.input("User: ")
+        panel.erase_lines()
         panel.create_chatbox("User", user, is_ai=False)
-        panel.console.clear()
-        panel.print_stdout()
+        panel.print_new()
         ai = panel.console.input("AI: ")
+        panel.erase_lines()
         panel.create_chatbox("AI", ai)
-        panel.console.clear()
-
-        panel.print_stdout()
+        panel.print_new()
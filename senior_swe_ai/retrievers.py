@@ -0,0 +1,188 @@
+"""
+Retrievers combining the lexical (BM25) and the vector search of the index
+"""
+from collections import OrderedDict
+import re
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from senior_swe_ai.embed_cache import normalize_query
+
+RRF_K = 60
+# a bare identifier, dotted path or error code, possibly quoted
+_LEXICAL_QUERY = re.compile(r"""^\s*[`'"]?[\w.:/()<>\[\]-]+[`'"]?\s*$""")
+
+
+def is_lexical_query(query: str) -> bool:
+    """
+    Check if a query is a single identifier or error string, which the lexical
+    index answers without embedding the query
+
+    Args:
+        query: str - The query
+
+    Returns:
+        bool - True if the query is a single identifier-like token
+    """
+    return bool(_LEXICAL_QUERY.match(query))
+
+
+def _doc_key(doc: Document) -> Tuple[str, str]:
+    return doc.metadata.get("file_path", ""), doc.page_content
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Document]], k: int, rrf_k: int = RRF_K
+) -> List[Document]:
+    """
+    Merge rankings of documents by the sum of 1 / (rrf_k + rank) over the rankings
+
+    Args:
+        rankings: Sequence[List[Document]] - The ranked documents of every search
+        k: int - The number of documents returned
+        rrf_k: int - The rank offset, damping the weight of the first ranks
+
+    Returns:
+        List[Document] - The k best documents
+    """
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key: Tuple[str, str] = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing the vector, lexical and symbol rankings with reciprocal
+    rank fusion: the chunks of the methods a question mentions rank high without
+    crowding out the semantic matches. Identifier-like queries are answered by
+    the lexical index and the symbol table alone, without embedding the query.
+
+    Attributes:
+    vector_retriever: BaseRetriever - The retriever of the vector index
+    lexical_search: Callable[[str, int], List[Document]] - The lexical search
+    symbol_search: Optional[Callable[[str, int], List[Document]]] - The chunks
+        of the methods mentioned in the query
+    k: int - The number of documents returned
+
+    """
+
+    vector_retriever: BaseRetriever
+    lexical_search: Any
+    symbol_search: Any = None
+    k: int = 8
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        symbols: List[Document] = self.symbol_search(query, self.k) if self.symbol_search else []
+        lexical: List[Document] = self.lexical_search(query, self.k)
+        if (symbols or lexical) and is_lexical_query(query):
+            return reciprocal_rank_fusion([symbols, lexical], self.k)
+        vector: List[Document] = self.vector_retriever.get_relevant_documents(
+            query, callbacks=run_manager.get_child())
+        return reciprocal_rank_fusion([symbols, vector, lexical], self.k)
+
+
+class RetrievalCache:
+    """
+    LRU cache of the ranked chunks of each query, for one index generation:
+    all the entries are dropped as soon as a newer generation is seen
+
+    Attributes:
+    max_entries: int - The number of rankings kept
+    generation: int - The index generation of the cached rankings
+    hits: int - The number of rankings served from the cache
+    misses: int - The number of rankings computed
+
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self.generation = -1
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, List[Document]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_generation(self, generation: int) -> None:
+        if generation != self.generation:
+            self._entries.clear()
+            self.generation = generation
+
+    def clear(self) -> None:
+        """Drop every cached ranking, when the index is loaded again"""
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, generation: int, key: Hashable) -> Optional[List[Document]]:
+        """
+        Get the cached ranking of a query
+
+        Args:
+            generation: int - The current generation of the index
+            key: Hashable - The query key
+
+        Returns:
+            Optional[List[Document]] - The ranked chunks, None if not cached
+        """
+        with self._lock:
+            self._check_generation(generation)
+            docs: Optional[List[Document]] = self._entries.get(key)
+            if docs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(docs)
+
+    def set(self, generation: int, key: Hashable, docs: List[Document]) -> None:
+        """
+        Store the ranking of a query
+
+        Args:
+            generation: int - The generation of the index the ranking was computed on
+            key: Hashable - The query key
+            docs: List[Document] - The ranked chunks
+        """
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = list(docs)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Retriever serving repeated queries from a RetrievalCache
+
+    Attributes:
+    retriever: BaseRetriever - The retriever ranking the chunks
+    cache: RetrievalCache - The cache of the rankings
+    generation: Callable[[], int] - The current generation of the index
+
+    """
+
+    retriever: BaseRetriever
+    cache: Any
+    generation: Any
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        generation: int = self.generation()
+        key: Tuple[str, str] = ("retrieval", normalize_query(query))
+        docs: Optional[List[Document]] = self.cache.get(generation, key)
+        if docs is None:
+            docs = self.retriever.get_relevant_documents(
+                query, callbacks=run_manager.get_child())
+            self.cache.set(generation, key, docs)
+        return docs
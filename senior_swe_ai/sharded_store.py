@@ -0,0 +1,436 @@
+"""
+Vector store split into shards, one per top-level directory or per language,
+each built, persisted and refreshed on its own and searched concurrently
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from senior_swe_ai.cache import (
+    DiskCache, VectorCache, get_cache_path, save_vec_cache
+)
+from senior_swe_ai.consts import IndexType, ShardKey
+from senior_swe_ai.embed_cache import CachedEmbeddings, normalize_query
+from senior_swe_ai.file_handler import get_extension
+from senior_swe_ai.llm_handler import get_langchain_text_splitters
+from senior_swe_ai.retrievers import CachedRetriever, HybridRetriever, RetrievalCache
+from senior_swe_ai.vec_store import VectorStore, add_docs, select_symbol_chunks
+
+ROOT_SHARD = "_root"
+OTHER_SHARD = "_other"
+
+
+def get_shard(file_path: str, shard_by: ShardKey, repo_root: str) -> str:
+    """
+    Get the shard of a file
+
+    Args:
+        file_path: str - The absolute path of the file
+        shard_by: ShardKey - How the repository is split
+        repo_root: str - The root directory of the repository
+
+    Returns:
+        str - The name of the shard, safe to use in a file name
+    """
+    if shard_by is ShardKey.LANGUAGE:
+        language = get_langchain_text_splitters(get_extension(file_path))
+        shard: str = language.value if language is not None else OTHER_SHARD
+    else:
+        parts: List[str] = os.path.relpath(file_path, repo_root).split(os.sep)
+        shard = parts[0] if len(parts) > 1 else ROOT_SHARD
+    return re.sub(r"[^\w.-]", "_", shard)
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Retriever embedding the query once, searching every shard in a thread pool
+    (faiss releases the GIL) and merging the k closest documents
+
+    Attributes:
+    store: ShardedVectorStore - The sharded vector store
+    k: int - The number of documents returned
+    fetch_k: int - The number of documents each shard diversifies (MMR) from
+
+    """
+
+    store: Any
+    k: int = 8
+    fetch_k: int = 20
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        embedding: List[float] = self.store.embed_mdl.embed_query(query)
+        return [doc for doc, _ in self.store.search_by_vector(
+            embedding, self.k, self.fetch_k)]
+
+
+class ShardedVectorStore:
+    """
+    Vector store keeping one VectorStore per shard, with the VectorStore interface,
+    the vector and lexical searches fan out to the shards
+
+    Only the shards whose files changed are written again, the list of shards is
+    kept in {name}.shards.json.
+
+    Attributes:
+    name: str - The name of the repository
+    shard_by: ShardKey - How the repository is split
+    repo_root: str - The root directory of the repository
+    shards: Dict[str, VectorStore] - The vector store of every shard
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self, embed_mdl, name: str, shard_by: ShardKey, repo_root: str,
+        embed_cache: Optional[DiskCache] = None, index_type: IndexType = IndexType.FLAT
+    ) -> None:
+        self.embed_cache = embed_cache
+        if embed_cache is not None:
+            embed_mdl = CachedEmbeddings(embed_mdl, embed_cache)
+        self.embed_mdl = embed_mdl
+        self.name = name
+        self.shard_by = shard_by
+        self.repo_root = repo_root
+        self.index_type = index_type
+        self.shards: Dict[str, VectorStore] = {}
+        self.result_cache = RetrievalCache()
+        self.retrieval: CachedRetriever = CachedRetriever(
+            retriever=HybridRetriever(
+                vector_retriever=ShardedRetriever(store=self),
+                lexical_search=self.lexical_search, symbol_search=self.symbol_search, k=8),
+            cache=self.result_cache, generation=lambda: self.generation)
+        self._dirty: set[str] = set()
+        self._lazy: set[str] = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def db(self) -> dict:
+        """The faiss store of every shard holding vectors, empty when none does"""
+        return {shard: store.db for shard, store in self.shards.items() if store.db}
+
+    @property
+    def generation(self) -> int:
+        """The generation of the shards, incremented by every change of one of them"""
+        return sum(store.generation for store in self.shards.values())
+
+    @property
+    def vec_cache(self) -> Dict[str, VectorCache]:
+        """The vector cache of all the shards"""
+        return {filename: cached for store in self.shards.values()
+                for filename, cached in store.vec_cache.items()}
+
+    def _shard_of(self, file_path: str) -> str:
+        """Get the shard of a file"""
+        return get_shard(file_path, self.shard_by, self.repo_root)
+
+    def _changed_shard(self, shard: str) -> VectorStore:
+        """Get the vector store of a shard about to change, creating it when needed"""
+        if shard not in self.shards:
+            self.shards[shard] = VectorStore(
+                self.embed_mdl, f"{self.name}.{shard}", index_type=self.index_type)
+        elif shard in self._lazy:
+            self.shards[shard].load_docs(mmap=False)
+        self._lazy.discard(shard)
+        self._dirty.add(shard)
+        return self.shards[shard]
+
+    def _manifest_path(self) -> str:
+        return os.path.join(get_cache_path(), f"{self.name}.shards.json")
+
+    def exists(self) -> bool:
+        """Check if the shards were saved"""
+        return os.path.exists(self._manifest_path())
+
+    def shard_key_changed(self) -> bool:
+        """Check if the saved shards were split by another key than shard_by"""
+        with open(self._manifest_path(), "r", encoding="utf-8") as f:
+            return json.load(f).get("shard_by") != self.shard_by.value
+
+    def add_embeddings(
+        self, docs: List[Document], embeddings: List[List[float]]
+    ) -> List[str]:
+        """
+        Add already embedded documents to the index of their shard
+
+        Args:
+            docs: List[Document] - The documents
+            embeddings: List[List[float]] - The embedding of each document
+
+        Returns:
+            List[str] - The vector ids of the documents
+        """
+        grouped: Dict[str, List[int]] = {}
+        for position, doc in enumerate(docs):
+            grouped.setdefault(self._shard_of(doc.metadata["file_path"]), []).append(position)
+
+        ids: List[str] = [""] * len(docs)
+        for shard, positions in grouped.items():
+            shard_ids: List[str] = self._changed_shard(shard).add_embeddings(
+                [docs[position] for position in positions],
+                [embeddings[position] for position in positions])
+            for position, vec_id in zip(positions, shard_ids):
+                ids[position] = vec_id
+        return ids
+
+    def add_duplicates(self, duplicates: List[Tuple[Document, str]]) -> None:
+        """
+        Record duplicate chunks as locations of the vector of their original chunk,
+        which is in the same shard
+
+        Args:
+            duplicates: List[Tuple[Document, str]] - Each duplicate with the vector id
+                of its original chunk
+        """
+        grouped: Dict[str, List[Tuple[Document, str]]] = {}
+        for doc, vec_id in duplicates:
+            grouped.setdefault(self.dedupe_scope(doc), []).append((doc, vec_id))
+        for shard, shard_duplicates in grouped.items():
+            self._changed_shard(shard).add_duplicates(shard_duplicates)
+
+    def indexed_chunks(self, scope: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Get the chunks in the index of a shard, the chunks are only deduplicated
+        within their shard
+
+        Args:
+            scope: Optional[str] - The shard, loaded for the update the chunks are
+                deduplicated for, every loaded shard when None
+
+        Yields:
+            Tuple[str, str] - The chunk key and vector id of every indexed chunk
+        """
+        if scope is None:
+            for store in self.shards.values():
+                yield from store.indexed_chunks()
+        elif scope in self.shards:
+            yield from self._changed_shard(scope).indexed_chunks()
+
+    def dedupe_scope(self, doc: Document) -> str:
+        """Get the scope a chunk is deduplicated in, its shard"""
+        return self._shard_of(doc.metadata["file_path"])
+
+    def remove_files(self, filenames: List[str]) -> None:
+        """
+        Drop the vectors of the given files from the index of their shard
+
+        Args:
+            filenames: List[str] - The cached files to drop
+        """
+        grouped: Dict[str, List[str]] = {}
+        for filename in filenames:
+            grouped.setdefault(self._shard_of(filename), []).append(filename)
+        for shard, shard_files in grouped.items():
+            self._changed_shard(shard).remove_files(shard_files)
+
+    def remove_file(self, filename: str) -> None:
+        """
+        Drop the vectors of a file from the index of its shard
+
+        Args:
+            filename: str - The cached file to drop
+        """
+        self.remove_files([filename])
+
+    def upsert_files(self, docs: List[Document], hashes: Dict[str, str]) -> None:
+        """
+        Replace the vectors of the given files by the vectors of their new chunks,
+        in the shard of each file, the shards are saved by the caller
+
+        Args:
+            docs: List[Document] - The new chunks of the files
+            hashes: Dict[str, str] - The new hash of every replaced file, the files
+                without chunks are cached without vectors
+        """
+        cached: Dict[str, VectorCache] = self.vec_cache
+        self.remove_files([filename for filename in hashes if filename in cached])
+        add_docs(self, docs)
+        cached = self.vec_cache
+        for filename, commit_hash in hashes.items():
+            if filename in cached:
+                cached[filename].commit_hash = commit_hash
+        self.record_files(hashes)
+
+    def upsert_file(self, filename: str, docs: List[Document], commit_hash: str) -> None:
+        """
+        Replace the vectors of a file by the vectors of its new chunks
+
+        Args:
+            filename: str - The file
+            docs: List[Document] - The new chunks of the file
+            commit_hash: str - The new hash of the file
+        """
+        self.upsert_files(docs, {filename: commit_hash})
+
+    def compact(self, force: bool = False) -> bool:
+        """
+        Compact the shards most of whose vector ids were freed by removals
+
+        Args:
+            force: bool - Compact every shard holding vectors
+
+        Returns:
+            bool - Whether a shard was compacted
+        """
+        compacted: bool = False
+        for shard, store in list(self.shards.items()):
+            if store.db and (force or store.needs_compaction()):
+                compacted = self._changed_shard(shard).compact(force=True) or compacted
+        return compacted
+
+    def record_files(self, hashes: Dict[str, str]) -> None:
+        """
+        Cache the files that were parsed without producing any vector
+
+        Args:
+            hashes: Dict[str, str] - The hash of every parsed file
+        """
+        for filename, commit_hash in hashes.items():
+            shard: str = self._shard_of(filename)
+            if shard not in self.shards or filename not in self.shards[shard].vec_cache:
+                self._changed_shard(shard).vec_cache[filename] = VectorCache(
+                    filename, [], commit_hash)
+
+    def save(self, incomplete_file: Optional[str] = None) -> None:
+        """
+        Write the shards changed since the last full save to the cache directory
+
+        Args:
+            incomplete_file: Optional[str] - A file whose vectors may not all be
+                indexed yet, its hash is left out so the next reindex embeds it again
+        """
+        for shard in sorted(self._dirty):
+            store: VectorStore = self.shards[shard]
+            if store.db:
+                store.save(incomplete_file)
+            else:
+                save_vec_cache(store.vec_cache, f"{store.name}.vcache")
+        # checkpointed shards stay dirty, their search index is rebuilt by the final save
+        if incomplete_file is None:
+            self._dirty.clear()
+        with open(self._manifest_path(), "w", encoding="utf-8") as f:
+            json.dump({"shard_by": self.shard_by.value, "shards": sorted(self.shards)}, f)
+
+    def load_docs(self, mmap: bool = True) -> None:
+        """
+        Load every shard from the cache
+
+        Args:
+            mmap: bool - Map the search indexes read only, set it to False to update
+                them: only the vector cache of every shard is read, the shards are
+                loaded for an update when they first change, so a reindex only
+                reads the shards it touches. An index sharded by
+                another key is then dropped, to be rebuilt from scratch, and refused
+                with a ValueError when mmap is set.
+        """
+        with open(self._manifest_path(), "r", encoding="utf-8") as f:
+            shards: List[str] = json.load(f)["shards"]
+        if self.shard_key_changed():
+            if mmap:
+                raise ValueError(
+                    f"The index of {self.name} was sharded by another key than "
+                    f"{self.shard_by.value}, run reindex to rebuild it")
+            # the files would be looked up in shards not holding them, start over
+            for shard in shards:
+                VectorStore(self.embed_mdl, f"{self.name}.{shard}").delete()
+            shards = []
+        self.shards = {}
+        self._lazy = set()
+        for shard in shards:
+            store = VectorStore(
+                self.embed_mdl, f"{self.name}.{shard}", index_type=self.index_type)
+            if store.exists() and (mmap or store.needs_migration()):
+                store.load_docs(mmap=mmap)
+            else:
+                # the file list is enough until the shard changes, see _changed_shard
+                store.load_file_cache(mmap=mmap)
+                if store.exists():
+                    self._lazy.add(shard)
+            self.shards[shard] = store
+        self._dirty.clear()
+        self.result_cache.clear()
+
+    def search_by_vector(
+        self, embedding: List[float], k: int = 8, fetch_k: int = 20
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search every shard concurrently and diversify (MMR) the union of their
+        closest documents in one pass
+
+        Args:
+            embedding: List[float] - The embedding of the query
+            k: int - The number of documents returned
+            fetch_k: int - The number of candidates taken from each shard
+
+        Returns:
+            List[Tuple[Document, float]] - The k documents with their distance, in
+                the order MMR selected them
+        """
+        candidates: List[Tuple[Document, float, np.ndarray]] = self._fan_out(
+            lambda store: store.candidates_by_vector(embedding, fetch_k))
+        if not candidates:
+            return []
+        selected: List[int] = maximal_marginal_relevance(
+            np.array(embedding, dtype=np.float32),
+            [vector for _, _, vector in candidates], k=min(k, len(candidates)))
+        return [(candidates[i][0], candidates[i][1]) for i in selected]
+
+    def lexical_search(self, query: str, k: int = 8) -> List[Document]:
+        """
+        Search the BM25 index of every shard concurrently and merge their results
+
+        Args:
+            query: str - The query
+            k: int - The number of documents returned
+
+        Returns:
+            List[Document] - The k documents with the best BM25 score
+        """
+        results: List[Tuple[Document, float]] = sorted(self._fan_out(
+            lambda store: store.lexical_search_with_score(query, k)),
+            key=lambda result: result[1], reverse=True)
+        return [doc for doc, _ in results[:k]]
+
+    def symbol_search(self, query: str, k: int = 8) -> List[Document]:
+        """
+        Get the chunks of the methods mentioned in the query from every shard
+
+        Args:
+            query: str - The query
+            k: int - The maximum number of documents returned
+
+        Returns:
+            List[Document] - The chunks, none when no known method is mentioned, a
+                qualified mention falls back to every shard's chunks when no file
+                of any shard is named after its qualifier
+        """
+        return select_symbol_chunks(
+            self._fan_out(lambda store: store.symbol_candidates(query)), k)
+
+    def _fan_out(self, search: Callable[[VectorStore], List[tuple]]) -> List[tuple]:
+        """Run a search on every shard holding vectors in the thread pool"""
+        stores: List[VectorStore] = [store for store in self.shards.values() if store.db]
+        if not stores:
+            return []
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=min(32, os.cpu_count() or 1), thread_name_prefix="shard")
+        return [result for results in self._pool.map(search, stores) for result in results]
+
+    def similarity_search(self, query: str) -> List[Document]:
+        """Search for similar documents to the given query"""
+        key: Tuple[str, str] = ("similarity", normalize_query(query))
+        docs: Optional[List[Document]] = self.result_cache.get(self.generation, key)
+        if docs is None:
+            docs = [doc for doc, _ in self.search_by_vector(
+                self.embed_mdl.embed_query(query), k=4)]
+            self.result_cache.set(self.generation, key, docs)
+        return docs
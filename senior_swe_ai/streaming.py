@@ -0,0 +1,65 @@
+"""
+Streaming of the answers: the tokens generated by the chat model are collected
+by a callback handler while the chain runs in the background, and shown as
+they arrive
+"""
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class AnswerCancelled(Exception):
+    """Raised in the running chain once the user cancels the answer"""
+
+
+class TokenStream(BaseCallbackHandler):
+    """
+    Callback handler collecting the streamed tokens of an answer
+
+    Raising in a handler stops the generation only when raise_error is set, which
+    is how a cancelled answer stops consuming tokens.
+
+    Attributes:
+    started: float - The time the question was asked (perf_counter)
+    first_token: Optional[float] - The seconds until the first token, None before it
+    cancelled: threading.Event - Set when the user cancels the answer
+
+    """
+
+    raise_error: bool = True
+
+    def __init__(self) -> None:
+        self.started: float = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.cancelled = threading.Event()
+        self._tokens: List[str] = []
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Collect a token, or stop the generation when the answer was cancelled"""
+        if self.cancelled.is_set():
+            raise AnswerCancelled()
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        self._tokens.append(token)
+
+    @property
+    def text(self) -> str:
+        """The answer received so far"""
+        return "".join(self._tokens)
+
+    def cancel(self) -> None:
+        """Stop the generation at the next token"""
+        self.cancelled.set()
+
+    def status(self) -> str:
+        """
+        Describe the progress of the answer
+
+        Returns:
+            str - The time to the first token once it arrived, the waiting time before
+        """
+        if self.first_token is None:
+            return f"waiting {time.perf_counter() - self.started:.1f}s"
+        return f"first token {self.first_token:.2f}s"
@@ -0,0 +1,162 @@
+"""
+Symbol table of the indexed methods, mapping each method name (from the
+tree-sitter parsers) to the ids of its chunks, with prefix lookups
+"""
+from bisect import bisect_left
+import json
+import os
+import re
+from typing import Iterable, List, Tuple
+
+# identifiers mentioned in a question, and the call or code span marking them
+_MENTION = re.compile(r"`([\w.]+)(?:\(\))?`|([A-Za-z_][\w.]*)\(|([A-Za-z_][\w.]*)")
+# a lower case letter followed by an upper case one, as in camelCase or PascalCase
+_CASE_CHANGE = re.compile(r"[a-z][A-Z]")
+MIN_PREFIX = 4
+
+
+def looks_like_symbol(word: str) -> bool:
+    """
+    Check if a bare word is written like code: snake_case, camelCase or
+    PascalCase, where plain words such as FAISS or main are not taken for methods
+    """
+    return "_" in word.strip("_") or bool(_CASE_CHANGE.search(word))
+
+
+def split_qualifier(mention: str) -> Tuple[str, str]:
+    """
+    Split a mentioned method into its qualifier and its name
+
+    Args:
+        mention: str - The mention, Foo.bar or bar
+
+    Returns:
+        Tuple[str, str] - The qualifier (empty when there is none) and the name
+    """
+    qualifier, _, name = mention.rpartition(".")
+    return qualifier, name
+
+
+def matches_qualifier(qualifier: str, file_path: str) -> bool:
+    """
+    Check if a chunk can belong to the qualifier of a mention: the chunks hold
+    no class name, the last part of the qualifier must name the file
+    (module.method, or the class of a file named after it)
+
+    Args:
+        qualifier: str - The qualifier of the mention, matching any file when empty
+        file_path: str - The file of the chunk
+
+    Returns:
+        bool - True if the file is named after the qualifier
+    """
+    if not qualifier:
+        return True
+    stem: str = os.path.splitext(os.path.basename(file_path))[0]
+    owner: str = qualifier.rsplit(".", 1)[-1]
+    return stem.replace("_", "").lower() == owner.replace("_", "").lower()
+
+
+class SymbolTable:
+    """
+    Sorted method names with the chunk ids of each name
+
+    Attributes:
+    names: List[str] - The sorted method names
+    ids: List[List[str]] - The docstore ids of the chunks of each name
+
+    """
+
+    def __init__(self, names: List[str], ids: List[List[str]]) -> None:
+        self.names = names
+        self.ids = ids
+
+    @classmethod
+    def build(cls, symbols: Iterable[Tuple[str, str]]) -> "SymbolTable":
+        """
+        Build the table of the given chunks
+
+        Args:
+            symbols: Iterable[Tuple[str, str]] - The method name and docstore id of each chunk
+
+        Returns:
+            SymbolTable - The table
+        """
+        table: dict[str, List[str]] = {}
+        for name, doc_id in symbols:
+            if name:
+                table.setdefault(name, []).append(doc_id)
+        names: List[str] = sorted(table)
+        return cls(names, [table[name] for name in names])
+
+    def lookup(self, name: str) -> List[str]:
+        """
+        Get the chunk ids of a method
+
+        Args:
+            name: str - The exact method name
+
+        Returns:
+            List[str] - The docstore ids of its chunks, empty when it is unknown
+        """
+        position: int = bisect_left(self.names, name)
+        if position < len(self.names) and self.names[position] == name:
+            return self.ids[position]
+        return []
+
+    def prefix(self, prefix: str, limit: int = 8) -> List[str]:
+        """
+        Get the method names starting with a prefix
+
+        Args:
+            prefix: str - The start of the names
+            limit: int - The maximum number of names returned
+
+        Returns:
+            List[str] - The matching names, sorted
+        """
+        position: int = bisect_left(self.names, prefix)
+        matches: List[str] = []
+        while (position < len(self.names) and len(matches) < limit
+               and self.names[position].startswith(prefix)):
+            matches.append(self.names[position])
+            position += 1
+        return matches
+
+    def find_mentions(self, text: str) -> List[str]:
+        """
+        Get the known methods a question refers to: code spans, calls and
+        words written like code, completed by prefix when not exact
+
+        Args:
+            text: str - The question
+
+        Returns:
+            List[str] - The mentioned methods with the qualifier they were written
+                with (Foo.bar), in order of appearance
+        """
+        mentions: List[str] = []
+        for quoted, called, word in _MENTION.findall(text):
+            qualifier, candidate = split_qualifier((quoted or called or word).strip("."))
+            if word and not looks_like_symbol(candidate):
+                continue
+            found: List[str] = [candidate] if self.lookup(candidate) else []
+            if not found and len(candidate) >= MIN_PREFIX:
+                found = self.prefix(candidate, limit=1)
+            for name in found:
+                mention: str = f"{qualifier}.{name}" if qualifier else name
+                if mention not in mentions:
+                    mentions.append(mention)
+        return mentions
+
+    def save(self, path: str) -> None:
+        """Write the table to a json file"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"names": self.names, "ids": self.ids}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "SymbolTable":
+        """Read a table written by save"""
+        with open(path, "r", encoding="utf-8") as f:
+            data: dict = json.load(f)
+        return cls(data["names"], data["ids"])
@@ -40,27 +40,27 @@ class BaseTreeParser(ABC):
     """
     Base class for tree-sitter parsers.
 
+    Every language declares a single tree-sitter query, `method_query`, that is
+    compiled once and captures in one native pass per file:
+        @method: the method declaration node (required in every pattern),
+        @name: the node holding the method name,
+        @doc: the documentation comment node(s) of the method.
+    Captures of the same method coming from different patterns are merged, and
+    methods nested inside another captured method are skipped.
+
     Attributes:
         parser (tree_sitter.Parser): The tree-sitter parser.
         language (tree_sitter.Language): The tree-sitter language.
-        method_declaration_identifier (str): The tree-sitter node type for method declarations.
-        method_name_identifier (str): The tree-sitter node type for method names.
-        doc_comment_identifier (str): The tree-sitter node type for documentation comments.
+        query (tree_sitter.Query): The compiled method query.
         tree (tree_sitter.Tree | None): The tree-sitter parse tree.
     """
 
-    def __init__(
-        self,
-        language: Language,
-        method_declaration_identifier: str,
-        name_identifier: str,
-        doc_comment_identifier: str,
-    ) -> None:
+    method_query: str = ""
+
+    def __init__(self, language: Language) -> None:
         self.parser: tree_sitter.Parser = get_parser(language.value)
         self.language: tree_sitter.Language = get_language(language.value)
-        self.method_declaration_identifier: str = method_declaration_identifier
-        self.method_name_identifier: str = name_identifier
-        self.doc_comment_identifier: str = doc_comment_identifier
+        self.query: tree_sitter.Query = self.language.query(self.method_query)
         self.tree: tree_sitter.Tree | None = None
 
     @staticmethod
@@ -76,6 +76,19 @@ class BaseTreeParser(ABC):
         """
         return TreeParserRegistry.create_treesitter(lang)
 
+    @staticmethod
+    def get_treesitter(lang: Language) -> Any:
+        """
+        Get the pooled tree-sitter parser for the given language.
+
+        Args:
+            lang (Language): The language to get the parser for.
+
+        Returns:
+            Any: The tree-sitter parser, shared within the current process.
+        """
+        return TreeParserRegistry.get_treesitter(lang)
+
     def parse(self, file_bytes: bytes) -> list[TreeParserMethodNode]:
         """
         Parse the given file and return a list of method nodes.
@@ -88,58 +101,47 @@ class BaseTreeParser(ABC):
         """
         self.tree = self.parser.parse(file_bytes)
         result = []
-        methods = self._query_all_methods(self.tree.root_node)
-        for method in methods:
-            method_name: str | None = self._query_method_name(method["method"])
-            doc_comment = method["doc_comment"]
+        end_byte = -1
+        for method in self._query_all_methods(self.tree.root_node):
+            node: tree_sitter.Node = method["method"]
+            # a method nested in the previous one belongs to its source code
+            if node.start_byte < end_byte:
+                continue
+            end_byte = node.end_byte
             result.append(
                 TreeParserMethodNode(
-                    method_name, doc_comment, None, method["method"])
+                    method["name"], method["doc_comment"], None, node)
             )
         return result
 
-    def _query_all_methods(
-        self,
-        node: tree_sitter.Node,
-    ) -> list:
+    def _query_all_methods(self, node: tree_sitter.Node) -> list:
         """
-        Recursively query all methods in the tree-sitter parse tree.
+        Run the method query and group its captures by method node.
 
         Args:
             node (tree_sitter.Node): The tree-sitter node.
 
         Returns:
-            list: A list of method nodes.
-
-
+            list: The methods, ordered by position, each with its name and doc comment.
         """
-        methods = []
-        if node.type == self.method_declaration_identifier:
-            doc_comment_node = None
-            if (
-                node.prev_named_sibling
-                and node.prev_named_sibling.type == self.doc_comment_identifier
-            ):
-                doc_comment_node: str = node.prev_named_sibling.text.decode()
-            methods.append({"method": node, "doc_comment": doc_comment_node})
-        else:
-            for child in node.children:
-                methods.extend(self._query_all_methods(child))
-        return methods
-
-    def _query_method_name(self, node: tree_sitter.Node) -> str | None:
-        """
-        Query the name of the method from the tree-sitter node.
+        methods: dict[int, dict[str, Any]] = {}
+        for _, captures in self.query.matches(node):
+            method_node: tree_sitter.Node = captures["method"]
+            method: dict[str, Any] = methods.setdefault(
+                method_node.id, {"method": method_node, "names": {}, "docs": {}})
+            for capture, key in (("name", "names"), ("doc", "docs")):
+                nodes = captures.get(capture, [])
+                for capture_node in nodes if isinstance(nodes, list) else [nodes]:
+                    method[key][capture_node.id] = capture_node
 
-        Args:
-            node (tree_sitter.Node): The tree-sitter node.
-
-        Returns:
-            str | None: The name of the method if found, None otherwise.
-
-        """
-        if node.type == self.method_declaration_identifier:
-            for child in node.children:
-                if child.type == self.method_name_identifier:
-                    return child.text.decode()
-        return None
+        result = []
+        for method in sorted(methods.values(), key=lambda m: m["method"].start_byte):
+            names = sorted(method["names"].values(), key=lambda n: n.start_byte)
+            docs = sorted(method["docs"].values(), key=lambda n: n.start_byte)
+            result.append({
+                "method": method["method"],
+                "name": names[0].text.decode() if names else None,
+                "doc_comment": "\n".join(
+                    doc.text.decode() for doc in docs) if docs else None,
+            })
+        return result
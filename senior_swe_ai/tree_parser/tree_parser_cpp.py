@@ -1,6 +1,5 @@
 """Module to parse C++ code using the tree-sitter library."""
 import warnings
-import tree_sitter
 from senior_swe_ai.consts import Language
 from senior_swe_ai.tree_parser.base import BaseTreeParser
 from senior_swe_ai.tree_parser.tree_parser_registry import TreeParserRegistry
@@ -9,32 +8,20 @@ from senior_swe_ai.tree_parser.tree_parser_registry import TreeParserRegistry
 class TreeParserCpp(BaseTreeParser):
     """Class to parse C++ code using the tree-sitter library."""
 
+    method_query = """
+        ((comment) @doc . (function_definition) @method)
+        (function_definition) @method
+        (function_definition
+            declarator: (function_declarator declarator: (identifier) @name)) @method
+        (function_definition
+            declarator: (pointer_declarator
+                declarator: (function_declarator declarator: (identifier) @name))) @method
+    """
+
     def __init__(self) -> None:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            super().__init__(Language.CPP, "function_definition", "identifier", "comment")
-
-    def _query_method_name(self, node: tree_sitter.Node) -> str | None:
-        """
-        Query the method name from the tree-sitter node.
-
-        Args:
-            node (tree_sitter.Node): The tree-sitter node.
-
-        Returns:
-            str | None: The method name if found, None otherwise.
-
-        """
-        if node.type == self.method_declaration_identifier:
-            for child in node.children:
-                # if method returns pointer, skip pointer declarator
-                if child.type == "pointer_declarator":
-                    child: tree_sitter.Node = child.children[1]
-                if child.type == "function_declarator":
-                    for child in child.children:
-                        if child.type == self.method_name_identifier:
-                            return child.text.decode()
-        return None
+            super().__init__(Language.CPP)
 
 
 TreeParserRegistry.register_treesitter(Language.CPP, TreeParserCpp)
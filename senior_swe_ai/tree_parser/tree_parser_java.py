@@ -8,12 +8,15 @@ from senior_swe_ai.tree_parser.tree_parser_registry import TreeParserRegistry
 class TreeParserJava(BaseTreeParser):
     """Class to parse Java code using the tree-sitter library."""
 
+    method_query = """
+        ((block_comment) @doc . (method_declaration) @method)
+        (method_declaration name: (identifier) @name) @method
+    """
+
     def __init__(self) -> None:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            super().__init__(
-                Language.JAVA, "method_declaration", "identifier", "block_comment"
-            )
+            super().__init__(Language.JAVA)
 
 
 TreeParserRegistry.register_treesitter(Language.JAVA, TreeParserJava)
@@ -8,12 +8,15 @@ from senior_swe_ai.tree_parser.tree_parser_registry import TreeParserRegistry
 class TreeParserJs(BaseTreeParser):
     """Class to parse JavaScript code using the tree-sitter library."""
 
+    method_query = """
+        ((comment) @doc . (function_declaration) @method)
+        (function_declaration name: (identifier) @name) @method
+    """
+
     def __init__(self) -> None:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            super().__init__(
-                Language.JAVASCRIPT, "function_declaration", "identifier", "comment"
-            )
+            super().__init__(Language.JAVASCRIPT)
 
 
 TreeParserRegistry.register_treesitter(
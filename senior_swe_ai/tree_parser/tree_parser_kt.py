@@ -8,12 +8,15 @@ from senior_swe_ai.tree_parser.tree_parser_registry import TreeParserRegistry
 class TreeParserKotlin(BaseTreeParser):
     """Class to parse Kotlin code using the tree-sitter library."""
 
+    method_query = """
+        ([(line_comment) (multiline_comment)] @doc . (function_declaration) @method)
+        (function_declaration name: (simple_identifier) @name) @method
+    """
+
     def __init__(self) -> None:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            super().__init__(
-                Language.KOTLIN, "function_declaration", "simple_identifier", "comment"
-            )
+            super().__init__(Language.KOTLIN)
 
 
 TreeParserRegistry.register_treesitter(Language.KOTLIN, TreeParserKotlin)
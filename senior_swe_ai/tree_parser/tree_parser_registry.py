@@ -6,6 +6,7 @@ from senior_swe_ai.consts import Language
 class TreeParserRegistry:
     """Registry for tree-sitter parsers."""
     _registry = {}
+    _instances = {}
 
     @classmethod
     def register_treesitter(cls, name, treesitter_class) -> None:
@@ -33,3 +34,19 @@ class TreeParserRegistry:
             return treesitter_class()
 
         raise ValueError("Invalid tree type")
+
+    @classmethod
+    def get_treesitter(cls, name: Language) -> Any:
+        """
+        Get the tree-sitter parser for the given language, creating it once
+        per process and reusing it for every following file.
+
+        Args:
+            name (Language): The language of the tree-sitter parser.
+
+        """
+        treesitter = cls._instances.get(name)
+        if treesitter is None:
+            treesitter = cls.create_treesitter(name)
+            cls._instances[name] = treesitter
+        return treesitter
@@ -1,67 +1,687 @@
 """
-vector store for storing embeddings and their 
+vector store for storing embeddings and their
 metadata, to enable fast search and retrieval
 """
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 import os
+import pickle
+import numpy as np
 from langchain.schema import Document
-from langchain_community.vectorstores.faiss import FAISS as faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.faiss import FAISS as faiss, dependable_faiss_import
 from langchain_core.vectorstores import VectorStoreRetriever
 
-from senior_swe_ai.cache import VectorCache, get_cache_path, load_vec_cache
+from senior_swe_ai.ann_index import build_index
+from senior_swe_ai.cache import (
+    DiskCache, VectorCache, get_cache_path, load_legacy_vec_cache, load_vec_cache,
+    save_vec_cache
+)
+from senior_swe_ai.consts import IndexType
+from senior_swe_ai.dedupe import ChunkDeduplicator, location
+from senior_swe_ai.docstore import SqliteDocstore, load_docstore, save_docstore
+from senior_swe_ai.embed_cache import CachedEmbeddings, normalize_query
+from senior_swe_ai.lexical_index import LexicalIndex
+from senior_swe_ai.retrievers import CachedRetriever, HybridRetriever, RetrievalCache
+from senior_swe_ai.symbol_table import SymbolTable, matches_qualifier, split_qualifier
+
+# pickled files start with the PROTO opcode, native faiss files with a fourcc
+PICKLE_HEADER: bytes = b"\x80"
+# compact the index once the vector ids outnumber the vectors by this factor
+COMPACT_RATIO = 2
+
+
+def _mmap_flags(faiss_lib) -> int:
+    """Get the flags mapping the stored vectors instead of reading them, when faiss supports it"""
+    return getattr(
+        faiss_lib, "IO_FLAG_MMAP_IFC", faiss_lib.IO_FLAG_MMAP) | faiss_lib.IO_FLAG_READ_ONLY
+
+
+def _replace_file(path: str, write) -> None:
+    """
+    Write a file next to the given path and move it in place, so sessions
+    which have the old file mapped keep reading a consistent copy
+
+    Args:
+        path: str - The destination path
+        write: Callable[[str], None] - Writes the content to the given temporary path
+    """
+    tmp_path: str = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def add_docs(vec_store, docs: List[Document]) -> None:
+    """
+    Embed chunks and add them to a vector store, embedding the duplicate chunks once
+
+    Args:
+        vec_store: VectorStore | ShardedVectorStore - The vector store
+        docs: List[Document] - The chunks
+    """
+    dedupe = ChunkDeduplicator(
+        scope=vec_store.dedupe_scope, indexed_chunks=vec_store.indexed_chunks)
+    unique: List[Document] = list(dedupe.unique(docs))
+    if unique:
+        dedupe.indexed(unique, vec_store.add_embeddings(
+            unique, vec_store.embed_mdl.embed_documents([doc.page_content for doc in unique])))
+    vec_store.add_duplicates(dedupe.resolved())
+
+
+def select_symbol_chunks(
+    candidates: List[Tuple[str, Document, bool]], k: int = 8
+) -> List[Document]:
+    """
+    Pick the chunks of the mentioned methods: for a qualified mention (Foo.bar),
+    the chunks of the files named after the qualifier, or all the chunks of the
+    method when no file is, as the qualifier may be a class of another file
+
+    Args:
+        candidates: List[Tuple[str, Document, bool]] - The chunks of the mentioned
+            methods, see VectorStore.symbol_candidates
+        k: int - The maximum number of documents returned
+
+    Returns:
+        List[Document] - The chunks, by mention
+    """
+    mentions: Dict[str, List[Tuple[Document, bool]]] = {}
+    for mention, doc, matched in candidates:
+        mentions.setdefault(mention, []).append((doc, matched))
+    docs: List[Document] = []
+    for chunks in mentions.values():
+        if any(matched for _, matched in chunks):
+            chunks = [(doc, matched) for doc, matched in chunks if matched]
+        docs.extend(doc for doc, _ in chunks)
+    return docs[:k]
 
 
 class VectorStore:
     """
     VectorStore for storing embeddings and their metadata
+
+    When an embedding cache is given, documents are looked up in it before
+    being sent to the embeddings model.
+
+    The index is persisted as a native faiss file ({name}.faiss), memory mapped
+    when loaded for search, next to a SQLite docstore ({name}.docstore) whose
+    documents are then read on demand.
+    The flat index keeps the exact vectors and is the one updated, with another
+    index type the search index is rebuilt from it ({name}.{index_type}.faiss).
+    A BM25 index of the same chunks ({name}.bm25) is searched alongside it, and
+    the chunks of each method name are listed in a symbol table ({name}.symbols.json).
+    The vector ids are consecutive integers, the docstore ids are their decimal
+    strings, and the vector ids of each file are listed in a binary vector
+    cache ({name}.vcache), read when first used.
+
+    Every change of the index increments its generation ({name}.generation), the
+    rankings of repeated queries are cached for the current generation only.
     """
 
-    def __init__(self, embed_mdl, name):
+    def __init__(
+        self, embed_mdl, name, embed_cache: Optional[DiskCache] = None,
+        index_type: IndexType = IndexType.FLAT
+    ):
+        self.embed_cache = embed_cache
+        if embed_cache is not None:
+            embed_mdl = CachedEmbeddings(embed_mdl, embed_cache)
         self.embed_mdl = embed_mdl
         self.name = name
-        self.vec_cache = {}
+        self.index_type = index_type
+        self._vec_cache: Optional[Dict[str, VectorCache]] = {}
         self.db = {}
         self.retrieval = {}
+        self.lexical: Optional[LexicalIndex] = None
+        self.symbols: Optional[SymbolTable] = None
+        self.generation = 0
+        self.next_id = 0
+        self.result_cache = RetrievalCache()
 
-    def _create_vec_cache(self, docs: List[Document]):
-        """Create a cache for the vectors"""
-        idx_docstore: Dict[int, str] = self.db.index_to_docstore_id
-        for idx, doc in enumerate(docs):
-            find_doc: str | Document = self.db.docstore.search(
-                idx_docstore[idx])
-            if find_doc:
-                if self.vec_cache.get(find_doc.metadata["filename"]):
-                    self.vec_cache[find_doc.metadata["filename"]
-                                   ].vector_ids.append(idx_docstore[idx])
-                else:
-                    self.vec_cache[find_doc.metadata["filename"]] = VectorCache(
-                        doc.metadata["filename"], [
-                            idx_docstore[idx]], doc.metadata["commit_hash"]
-                    )
+    @property
+    def vec_cache(self) -> Dict[str, VectorCache]:
+        """The vector cache, the saved one is mapped on first access after a load for search"""
+        if self._vec_cache is None:
+            self._vec_cache = load_vec_cache(f'{self.name}.vcache')
+        return self._vec_cache
 
-    def idx_docs(self, docs: List[Document]) -> None:
-        """Index the given documents"""
-        self.db: faiss = faiss.from_documents(docs, self.embed_mdl)
-        idx: bytes = self.db.serialize_to_bytes()
-        with open(get_cache_path() + f'/{self.name}.faiss', 'wb') as f:
-            f.write(idx)
+    @vec_cache.setter
+    def vec_cache(self, vec_cache: Dict[str, VectorCache]) -> None:
+        self._vec_cache = vec_cache
 
-        self._create_vec_cache(docs)
+    def _create_vec_cache(self, docs: List[Document], ids: List[str]) -> None:
+        """Record the vector ids of the given documents per file"""
+        for doc, vec_id in zip(docs, ids):
+            filename: str = doc.metadata.get(
+                "file_path", doc.metadata["filename"])
+            if filename in self.vec_cache:
+                self.vec_cache[filename].add(int(vec_id))
+            else:
+                self.vec_cache[filename] = VectorCache(
+                    filename, [int(vec_id)], doc.metadata["commit_hash"]
+                )
 
-        self.retrieval: VectorStoreRetriever = self.db.as_retriever(
+    def _create_retrieval(self) -> None:
+        """Create the retriever over the vector and lexical indexes"""
+        vector_retrieval: VectorStoreRetriever = self.db.as_retriever(
             search_type="mmr", search_kwargs={"k": 8})
+        self.retrieval: CachedRetriever = CachedRetriever(
+            retriever=HybridRetriever(
+                vector_retriever=vector_retrieval, lexical_search=self.lexical_search,
+                symbol_search=self.symbol_search, k=8),
+            cache=self.result_cache, generation=lambda: self.generation)
+
+    def symbol_search(self, query: str, k: int = 8) -> List[Document]:
+        """
+        Get the chunks of the methods mentioned in the query from the symbol table
+
+        Args:
+            query: str - The query
+            k: int - The maximum number of documents returned
+
+        Returns:
+            List[Document] - The chunks, none when no known method is mentioned, see
+                select_symbol_chunks for the qualified mentions (Foo.bar)
+        """
+        return select_symbol_chunks(self.symbol_candidates(query), k)
+
+    def symbol_candidates(self, query: str) -> List[Tuple[str, Document, bool]]:
+        """
+        Get the chunks of every method mentioned in the query
+
+        Args:
+            query: str - The query
+
+        Returns:
+            List[Tuple[str, Document, bool]] - Each chunk with the mention it was
+                found for, and whether one of its files is named after the qualifier
+                of the mention
+        """
+        if self.symbols is None:
+            return []
+        candidates: List[Tuple[str, Document, bool]] = []
+        for mention in self.symbols.find_mentions(query):
+            qualifier, name = split_qualifier(mention)
+            for doc in map(self.db.docstore.search, self.symbols.lookup(name)):
+                # the docstore returns a message for an id it does not hold
+                if isinstance(doc, Document):
+                    candidates.append((mention, doc, any(
+                        matches_qualifier(qualifier, loc.get("file_path") or "")
+                        for loc in [doc.metadata] + doc.metadata.get("locations", []))))
+        return candidates
+
+    def lexical_search(self, query: str, k: int = 8) -> List[Document]:
+        """
+        Search the BM25 index
+
+        Args:
+            query: str - The query
+            k: int - The number of documents returned
+
+        Returns:
+            List[Document] - The best documents, none when the index was not built
+        """
+        return [doc for doc, _ in self.lexical_search_with_score(query, k)]
+
+    def lexical_search_with_score(
+        self, query: str, k: int = 8
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search the BM25 index
+
+        Args:
+            query: str - The query
+            k: int - The number of documents returned
+
+        Returns:
+            List[Tuple[Document, float]] - The best documents with their BM25 score
+        """
+        if self.lexical is None:
+            return []
+        return [(self.db.docstore.search(doc_id), score)
+                for doc_id, score in self.lexical.search(query, k)]
+
+    def save(self, incomplete_file: Optional[str] = None) -> None:
+        """
+        Write the index and the vector cache to the cache directory
+
+        Args:
+            incomplete_file: Optional[str] - A file whose vectors may not all be
+                indexed yet, its hash is left out so the next reindex embeds it again
+        """
+        faiss_lib = dependable_faiss_import()
+        _replace_file(self._path("faiss"),
+                      lambda path: faiss_lib.write_index(self.db.index, path))
+        _replace_file(self._path("docstore"), lambda path: save_docstore(
+            path, self.db.docstore, self.db.index_to_docstore_id))
+        _replace_file(self._path("generation"), self._write_generation)
+        if self.index_type is not IndexType.FLAT:
+            self._save_search_index(stale=incomplete_file is not None)
+        self._save_lexical_index(stale=incomplete_file is not None)
+        self._save_symbol_table(stale=incomplete_file is not None)
+
+        vec_cache: Dict[str, VectorCache] = self.vec_cache
+        if incomplete_file in vec_cache:
+            vec_cache = dict(vec_cache)
+            vec_cache[incomplete_file] = VectorCache(
+                incomplete_file, vec_cache[incomplete_file].vector_ids, "")
+        save_vec_cache(vec_cache, f'{self.name}.vcache')
+
+    def add_embeddings(
+        self, docs: List[Document], embeddings: List[List[float]]
+    ) -> List[str]:
+        """
+        Add already embedded documents to the index
+
+        Args:
+            docs: List[Document] - The documents
+            embeddings: List[List[float]] - The embedding of each document
+
+        Returns:
+            List[str] - The vector ids of the documents
+        """
+        ids: List[str] = [str(vec_id)
+                          for vec_id in range(self.next_id, self.next_id + len(docs))]
+        self.next_id += len(docs)
+        text_embeddings = zip([doc.page_content for doc in docs], embeddings)
+        metadatas: List[dict] = [doc.metadata for doc in docs]
+        if not self.db:
+            self.db: faiss = faiss.from_embeddings(
+                text_embeddings, self.embed_mdl, metadatas=metadatas, ids=ids)
+        else:
+            self.db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self._create_vec_cache(docs, ids)
+        self.generation += 1
+        return ids
+
+    def add_duplicates(self, duplicates: List[Tuple[Document, str]]) -> None:
+        """
+        Record duplicate chunks as locations of the vector of their original chunk
+
+        Args:
+            duplicates: List[Tuple[Document, str]] - Each duplicate with the vector id
+                of its original chunk
+        """
+        if not duplicates:
+            return
+        docs, ids = zip(*duplicates)
+        self._create_vec_cache(list(docs), list(ids))
+        for doc, vec_id in duplicates:
+            self.db.docstore.search(vec_id).metadata.setdefault(
+                "locations", []).append(location(doc))
+
+    def indexed_chunks(  # pylint: disable=unused-argument
+        self, scope: Optional[str] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Get the chunks in the index, to deduplicate the chunks added next against them
+
+        Args:
+            scope: Optional[str] - The deduplication scope, the whole index
+
+        Yields:
+            Tuple[str, str] - The chunk key and vector id of every indexed chunk
+        """
+        if not self.db:
+            return
+        for vec_id in self.db.index_to_docstore_id.values():
+            key: Optional[str] = self.db.docstore.search(vec_id).metadata.get("chunk_key")
+            if key:
+                yield key, vec_id
+
+    def dedupe_scope(self, doc: Document) -> str:  # pylint: disable=unused-argument
+        """Get the scope a chunk is deduplicated in, the whole index"""
+        return ""
+
+    def remove_files(self, filenames: List[str]) -> None:
+        """
+        Drop the vectors of the given files from the index, the vectors shared
+        with other files (deduplicated chunks) are kept for them
+
+        Args:
+            filenames: List[str] - The cached files to drop
+        """
+        removed: set[int] = set()
+        for filename in filenames:
+            if filename in self.vec_cache:
+                removed.update(map(int, self.vec_cache.pop(filename).vector_ids))
+        if not removed:
+            return
+        shared: set[int] = {int(vec_id) for cached in self.vec_cache.values()
+                            for vec_id in cached.vector_ids if vec_id in removed}
+        for vec_id in shared:
+            self._drop_locations(str(vec_id), set(filenames))
+        if removed - shared:
+            self.db.delete([str(vec_id) for vec_id in removed - shared])
+        self.generation += 1
+
+    def remove_file(self, filename: str) -> None:
+        """
+        Drop the vectors of a file from the index
+
+        Args:
+            filename: str - The cached file to drop
+        """
+        self.remove_files([filename])
+
+    def upsert_files(self, docs: List[Document], hashes: Dict[str, str]) -> None:
+        """
+        Replace the vectors of the given files by the vectors of their new chunks,
+        the index is saved by the caller
+
+        Args:
+            docs: List[Document] - The new chunks of the files
+            hashes: Dict[str, str] - The new hash of every replaced file, the files
+                without chunks are cached without vectors
+        """
+        self.remove_files([filename for filename in hashes if filename in self.vec_cache])
+        add_docs(self, docs)
+        for filename, commit_hash in hashes.items():
+            if filename in self.vec_cache:
+                self.vec_cache[filename].commit_hash = commit_hash
+        self.record_files(hashes)
+
+    def upsert_file(self, filename: str, docs: List[Document], commit_hash: str) -> None:
+        """
+        Replace the vectors of a file by the vectors of its new chunks
+
+        Args:
+            filename: str - The file
+            docs: List[Document] - The new chunks of the file
+            commit_hash: str - The new hash of the file
+        """
+        self.upsert_files(docs, {filename: commit_hash})
+
+    def needs_compaction(self) -> bool:
+        """Check if most of the vector ids were freed by removals"""
+        return bool(self.db) and self.next_id > COMPACT_RATIO * self.db.index.ntotal
+
+    def compact(self, force: bool = False) -> bool:
+        """
+        Reclaim the space freed by the removed vectors: the vectors are renumbered
+        to consecutive ids and copied into an index of their exact size. The index
+        must be loaded for an update (mmap=False).
+
+        Args:
+            force: bool - Compact even when few vectors were removed
+
+        Returns:
+            bool - Whether the index was compacted
+        """
+        if not self.db or not (force or self.needs_compaction()):
+            return False
+        ids: Dict[str, int] = self._renumber()
+        self.db.index = dependable_faiss_import().clone_index(self.db.index)
+        self.vec_cache = {
+            filename: VectorCache(filename, [ids[str(vec_id)] for vec_id in cached.vector_ids],
+                                  cached.commit_hash)
+            for filename, cached in self.vec_cache.items()}
+        self.generation += 1
+        return True
+
+    def _renumber(self) -> Dict[str, int]:
+        """
+        Give every vector its position in the index as id
+
+        Returns:
+            Dict[str, int] - The new id of every docstore id
+        """
+        ids: Dict[str, int] = {
+            doc_id: position for position, doc_id in self.db.index_to_docstore_id.items()}
+        self.db.docstore = InMemoryDocstore(
+            {str(ids[doc_id]): self.db.docstore.search(doc_id) for doc_id in ids})
+        self.db.index_to_docstore_id = {position: str(position) for position in ids.values()}
+        self.next_id = len(ids)
+        return ids
+
+    def _drop_locations(self, vec_id: str, filenames: set[str]) -> None:
+        """Drop the locations of removed files from a shared chunk"""
+        metadata: dict = self.db.docstore.search(vec_id).metadata
+        locations: List[dict] = [
+            loc for loc in metadata.get("locations", []) if loc["file_path"] not in filenames]
+        metadata["locations"] = locations
+        if locations and metadata.get("file_path") in filenames:
+            metadata.update(locations[0])
+            metadata["filename"] = os.path.basename(locations[0]["file_path"])
+
+    def record_files(self, hashes: Dict[str, str]) -> None:
+        """
+        Cache the files that were parsed without producing any vector,
+        so they are not parsed again by the next reindex
+
+        Args:
+            hashes: Dict[str, str] - The hash of every parsed file
+        """
+        for filename, commit_hash in hashes.items():
+            if filename not in self.vec_cache:
+                self.vec_cache[filename] = VectorCache(
+                    filename, [], commit_hash)
+
+    def idx_docs(self, docs: List[Document]) -> None:
+        """Index the given documents, embedding the duplicate chunks once"""
+        add_docs(self, docs)
+        self.save()
+
+        self._create_retrieval()
+
+    def candidates_by_vector(
+        self, embedding: List[float], fetch_k: int = 20
+    ) -> List[Tuple[Document, float, np.ndarray]]:
+        """
+        Get the closest documents with their vector, for a diversification (MMR)
+        run over the candidates of several indexes
+
+        Args:
+            embedding: List[float] - The embedding of the query
+            fetch_k: int - The number of candidates
+
+        Returns:
+            List[Tuple[Document, float, np.ndarray]] - The candidates with their
+                distance and vector, closest first
+        """
+        distances, positions = self.db.index.search(
+            np.array([embedding], dtype=np.float32), fetch_k)
+        return [(self.db.docstore.search(self.db.index_to_docstore_id[int(position)]),
+                 float(distance), self.db.index.reconstruct(int(position)))
+                for distance, position in zip(distances[0], positions[0]) if position != -1]
 
     def similarity_search(self, query: str) -> List[Document]:
         """Search for similar documents to the given query"""
-        return self.db.similarity_search(query, k=4)
-
-    def load_docs(self):
-        """ Load the documents from the cache """
-        with open(os.path.join(get_cache_path(), f"{self.name}.faiss"), "rb") as f:
-            idx: bytes = f.read()
-        self.db = faiss.deserialize_from_bytes(idx, self.embed_mdl)
-        self.vec_cache: Dict[str, VectorCache] = load_vec_cache(
-            f'{self.name}.json')
-        self.retrieval = self.db.as_retriever(
-            search_type="mmr", search_kwargs={"k": 8}
-        )
+        key: Tuple[str, str] = ("similarity", normalize_query(query))
+        docs: Optional[List[Document]] = self.result_cache.get(self.generation, key)
+        if docs is None:
+            docs = self.db.similarity_search(query, k=4)
+            self.result_cache.set(self.generation, key, docs)
+        return docs
+
+    def _save_search_index(self, stale: bool = False) -> None:
+        """
+        Rebuild the search index of the configured type from the flat index
+
+        Args:
+            stale: bool - Only drop the previous search index, which no longer
+                matches the saved docstore, the flat index is searched until
+                the next rebuild
+        """
+        path: str = self._path(f"{self.index_type.value}.faiss")
+        if stale:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        faiss_lib = dependable_faiss_import()
+        flat = self.db.index
+        vectors = faiss_lib.rev_swig_ptr(
+            flat.get_xb(), flat.ntotal * flat.d).reshape(flat.ntotal, flat.d)
+        search_index = build_index(vectors, self.index_type, flat.metric_type)
+        _replace_file(path, lambda tmp_path: faiss_lib.write_index(search_index, tmp_path))
+
+    def _save_lexical_index(self, stale: bool = False) -> None:
+        """
+        Rebuild the BM25 index from the docstore
+
+        Args:
+            stale: bool - Only drop the previous index, it is rebuilt by the next full save
+        """
+        path: str = self._path("bm25")
+        if stale:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        lexical: LexicalIndex = LexicalIndex.build(
+            (doc_id, self.db.docstore.search(doc_id).page_content)
+            for doc_id in self.db.index_to_docstore_id.values())
+        _replace_file(path, lexical.save)
+
+    def _save_symbol_table(self, stale: bool = False) -> None:
+        """
+        Rebuild the symbol table from the docstore
+
+        Args:
+            stale: bool - Only drop the previous table, it is rebuilt by the next full save
+        """
+        path: str = self._path("symbols.json")
+        if stale:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        symbols: SymbolTable = SymbolTable.build(
+            (name, doc_id) for doc_id in self.db.index_to_docstore_id.values()
+            for name in self._method_names(self.db.docstore.search(doc_id)))
+        _replace_file(path, symbols.save)
+
+    @staticmethod
+    def _method_names(doc: Document) -> List[str]:
+        """Get the methods of a chunk, its own and those of the duplicates folded into it"""
+        names: List[str] = [doc.metadata.get("method_name")]
+        names.extend(loc["method_name"] for loc in doc.metadata.get("locations", []))
+        return list(dict.fromkeys(name for name in names if name))
+
+    def _search_index_path(self) -> str:
+        """Get the path of the search index, the flat one when it was not built"""
+        path: str = self._path(f"{self.index_type.value}.faiss")
+        if self.index_type is IndexType.FLAT or not os.path.exists(path):
+            return self._path("faiss")
+        return path
+
+    def _write_generation(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(str(self.generation))
+
+    def _path(self, extension: str) -> str:
+        """Get the path of one of the index files in the cache directory"""
+        return os.path.join(get_cache_path(), f"{self.name}.{extension}")
+
+    def exists(self) -> bool:
+        """Check if the index was saved"""
+        return os.path.exists(self._path("faiss"))
+
+    def delete(self) -> None:
+        """Delete the saved index files, of any index type"""
+        extensions: List[str] = ["faiss", "docstore", "pkl", "generation", "bm25", "symbols.json",
+                                 "vcache", "json"]
+        extensions.extend(f"{index_type.value}.faiss" for index_type in IndexType)
+        for extension in extensions:
+            if os.path.exists(self._path(extension)):
+                os.remove(self._path(extension))
+
+    def load_docs(self, mmap: bool = True):
+        """
+        Load the documents from the cache
+
+        Args:
+            mmap: bool - Map the search index read only, pages are then loaded on
+                demand and shared with the other sessions, and read the documents
+                and the vector cache when first used. Set it to False to load the
+                flat index and the documents for an update.
+        """
+        if self.needs_migration():
+            self._migrate_legacy_index()
+        faiss_lib = dependable_faiss_import()
+        if mmap:
+            self._vec_cache = None
+            docstore = SqliteDocstore(self._path("docstore"))
+            self.db = faiss(
+                self.embed_mdl,
+                faiss_lib.read_index(self._search_index_path(), _mmap_flags(faiss_lib)),
+                docstore, docstore.index_to_docstore_id)
+            # the mapped index is read only, the next id only matters for an update
+            self.next_id = 0
+        else:
+            self.vec_cache = load_vec_cache(f'{self.name}.vcache', mmap=False)
+            docstore, index_to_docstore_id = load_docstore(self._path("docstore"))
+            self.db = faiss(self.embed_mdl, faiss_lib.read_index(self._path("faiss")),
+                            docstore, index_to_docstore_id)
+            self.next_id = max(map(int, index_to_docstore_id.values()), default=-1) + 1
+        self.result_cache.clear()
+        self.generation = 0
+        if os.path.exists(self._path("generation")):
+            with open(self._path("generation"), "r", encoding="utf-8") as f:
+                self.generation = int(f.read())
+        self.lexical = None
+        if os.path.exists(self._path("bm25")):
+            self.lexical = LexicalIndex.load(self._path("bm25"))
+        self.symbols = None
+        if os.path.exists(self._path("symbols.json")):
+            self.symbols = SymbolTable.load(self._path("symbols.json"))
+        self._create_retrieval()
+
+    def needs_migration(self) -> bool:
+        """Check if the saved index was written by a previous version, see _migrate_legacy_index"""
+        with open(self._path("faiss"), "rb") as f:
+            legacy: bool = f.read(len(PICKLE_HEADER)) == PICKLE_HEADER
+        return legacy or os.path.exists(self._path("pkl")) or \
+            not os.path.exists(self._path("vcache"))
+
+    def load_file_cache(self, mmap: bool = True) -> None:
+        """
+        Load the vector cache alone, of a store without any vector
+
+        Args:
+            mmap: bool - Map the vector cache when first used, set it to False to update it
+        """
+        if not os.path.exists(self._path("vcache")):
+            self.vec_cache = self._migrate_vector_ids(
+                load_legacy_vec_cache(f'{self.name}.json'), {})
+            save_vec_cache(self.vec_cache, f'{self.name}.vcache')
+            os.remove(self._path("json"))
+        self._vec_cache = None
+        if not mmap:
+            self.vec_cache = load_vec_cache(f'{self.name}.vcache', mmap=False)
+
+    def _migrate_legacy_index(self) -> None:
+        """
+        Rewrite an index saved by the previous versions: an index saved as pickled
+        bytes, a docstore pickled with its id map ({name}.pkl), or uuid vector ids
+        listed in a json vector cache
+        """
+        with open(self._path("faiss"), "rb") as f:
+            content: bytes = f.read()
+        if content.startswith(PICKLE_HEADER):
+            self.db = faiss.deserialize_from_bytes(content, self.embed_mdl)
+        else:
+            if os.path.exists(self._path("pkl")):
+                with open(self._path("pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+            else:
+                docstore, index_to_docstore_id = load_docstore(self._path("docstore"))
+            self.db = faiss(self.embed_mdl,
+                            dependable_faiss_import().read_index(self._path("faiss")),
+                            docstore, index_to_docstore_id)
+
+        if os.path.exists(self._path("vcache")):
+            self.vec_cache = load_vec_cache(f'{self.name}.vcache', mmap=False)
+            self.next_id = max(map(int, self.db.index_to_docstore_id.values()), default=-1) + 1
+        else:
+            ids: Dict[str, int] = self._renumber()
+            self.vec_cache = self._migrate_vector_ids(
+                load_legacy_vec_cache(f'{self.name}.json'), ids)
+        self.save()
+        for extension in ("pkl", "json"):
+            if os.path.exists(self._path(extension)):
+                os.remove(self._path(extension))
+
+    @staticmethod
+    def _migrate_vector_ids(
+        legacy: Dict[str, dict], ids: Dict[str, int]
+    ) -> Dict[str, VectorCache]:
+        """Convert a json vector cache, replacing its uuid vector ids by the given integers"""
+        return {filename: VectorCache(filename, [ids[vec_id] for vec_id in cached["vector_ids"]
+                                                 if vec_id in ids], cached["commit_hash"])
+                for filename, cached in legacy.items()}
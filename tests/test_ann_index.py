@@ -0,0 +1,33 @@
+""" Test the ann_index module """
+import numpy as np
+import pytest
+from senior_swe_ai.ann_index import build_index, pq_subquantizers, resolve_index_type
+from senior_swe_ai.consts import IndexType
+
+
+class TestAnnIndex:
+    """Testing the approximate index builder"""
+
+    def test_resolve_index_type(self) -> None:
+        """Test trained index types fall back when there are too few vectors"""
+        assert resolve_index_type(IndexType.IVFPQ, 100) is IndexType.FLAT
+        assert resolve_index_type(IndexType.IVFPQ, 2_000) is IndexType.IVF
+        assert resolve_index_type(IndexType.IVFPQ, 20_000) is IndexType.IVFPQ
+        assert resolve_index_type(IndexType.HNSW, 10) is IndexType.HNSW
+
+    def test_pq_subquantizers(self) -> None:
+        """Test the number of sub-quantizers divides the dimension"""
+        assert pq_subquantizers(1536) == 192
+        assert pq_subquantizers(100) == 10
+
+    @pytest.mark.parametrize("index_type", list(IndexType))
+    def test_build_index(self, index_type: IndexType) -> None:
+        """Test every index type finds the vectors at their original position"""
+        vectors: np.ndarray = np.random.default_rng(0).random((1_000, 16), dtype=np.float32)
+
+        index = build_index(vectors, index_type)
+        _, found = index.search(vectors[:20], 1)
+
+        assert index.ntotal == 1_000
+        assert (found[:, 0] == np.arange(20)).mean() >= 0.9
+        index.reconstruct(int(found[0, 0]))
@@ -0,0 +1,37 @@
+""" Test the answer_cache module """
+from langchain.schema import Document
+from senior_swe_ai.answer_cache import AnswerCache
+from senior_swe_ai.cache import DiskCache
+
+DOCS: list[Document] = [Document(page_content="def main(): pass",
+                                 metadata={"file_path": "/repo/main.py"})]
+
+
+class TestAnswerCache:
+    """Testing the cache of the answers"""
+
+    def test_key(self, tmp_path) -> None:
+        """Test the key depends on the question, model, chunks and index generation"""
+        generation: list[int] = [1]
+        answers = AnswerCache(DiskCache(str(tmp_path / "answers.sqlite")), "gpt-4",
+                              lambda: generation[0])
+        key: str = answers.key("What does  main do?", DOCS)
+
+        assert answers.key("What does main do?", DOCS) == key
+        assert answers.key("What does main do?", []) != key
+        assert AnswerCache(answers.disk, "gpt-3.5-turbo", lambda: 1).key(
+            "What does main do?", DOCS) != key
+        generation[0] = 2
+        assert answers.key("What does main do?", DOCS) != key
+
+    def test_get_and_set(self, tmp_path) -> None:
+        """Test an answer is stored persistently and counted"""
+        path: str = str(tmp_path / "answers.sqlite")
+        answers = AnswerCache(DiskCache(path), "gpt-4", lambda: 1)
+        key: str = answers.key("What does main do?", DOCS)
+        assert answers.get(key) is None
+
+        answers.set(key, "It does nothing.")
+
+        assert AnswerCache(DiskCache(path), "gpt-4", lambda: 1).get(key) == "It does nothing."
+        assert (answers.hits, answers.misses) == (0, 1)
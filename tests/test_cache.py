@@ -0,0 +1,95 @@
+""" Test the cache module """
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+from senior_swe_ai.cache import (
+    DiskCache, VectorCache, diff_vec_cache, load_vec_cache, save_vec_cache
+)
+
+
+class TestCache:
+    """Testing cache functions"""
+
+    def test_diff_vec_cache(self) -> None:
+        """Test diff_vec_cache detects changed, added and deleted files"""
+        vec_cache: dict[str, VectorCache] = {
+            "same.py": VectorCache("same.py", [1], "aaa"),
+            "changed.py": VectorCache("changed.py", [2, 3], "bbb"),
+            "deleted.py": VectorCache("deleted.py", [4], "ccc"),
+        }
+        hashes: dict[str, str] = {
+            "same.py": "aaa",
+            "changed.py": "ddd",
+            "added.py": "eee",
+        }
+
+        stale_files, changed_files = diff_vec_cache(vec_cache, hashes)
+
+        assert sorted(stale_files) == ["changed.py", "deleted.py"]
+        assert sorted(changed_files) == ["added.py", "changed.py"]
+
+    def test_diff_vec_cache_unchanged(self) -> None:
+        """Test diff_vec_cache with an up to date cache"""
+        vec_cache: dict[str, VectorCache] = {
+            "same.py": VectorCache("same.py", [1], "aaa"),
+        }
+
+        assert diff_vec_cache(vec_cache, {"same.py": "aaa"}) == ([], [])
+
+    def test_save_and_load_vec_cache(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test the binary vector cache keeps every file, hash and vector id"""
+        mocker.patch('senior_swe_ai.cache.get_cache_path', return_value=str(tmp_path))
+        vec_cache: dict[str, VectorCache] = {
+            "/repo/ünïcode.py": VectorCache("/repo/ünïcode.py", [3, 1, 2], "a" * 40),
+            "/repo/empty.py": VectorCache("/repo/empty.py", [], "b" * 40),
+            "/repo/partial.py": VectorCache("/repo/partial.py", [7], ""),
+        }
+        save_vec_cache(vec_cache, "TEST.vcache")
+
+        loaded: dict[str, VectorCache] = load_vec_cache("TEST.vcache")
+
+        assert list(loaded) == list(vec_cache)
+        for filename, cached in vec_cache.items():
+            assert list(loaded[filename].vector_ids) == list(cached.vector_ids)
+            assert loaded[filename].commit_hash == cached.commit_hash
+        loaded["/repo/partial.py"].add(8)
+        assert list(loaded["/repo/partial.py"].vector_ids) == [7, 8]
+
+    def test_load_vec_cache_in_memory(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test a vector cache read without mmap holds no mapping of the file"""
+        mocker.patch('senior_swe_ai.cache.get_cache_path', return_value=str(tmp_path))
+        save_vec_cache({"/repo/a.py": VectorCache("/repo/a.py", [1, 2], "a")}, "TEST.vcache")
+
+        loaded: dict[str, VectorCache] = load_vec_cache("TEST.vcache", mmap=False)
+
+        array = loaded["/repo/a.py"].vector_ids
+        while isinstance(array, np.ndarray):
+            assert not isinstance(array, np.memmap)
+            array = array.base
+        save_vec_cache(loaded, "TEST.vcache")
+        assert list(load_vec_cache("TEST.vcache")["/repo/a.py"].vector_ids) == [1, 2]
+
+    def test_load_vec_cache_version(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test a vector cache of another format version is rejected"""
+        mocker.patch('senior_swe_ai.cache.get_cache_path', return_value=str(tmp_path))
+        save_vec_cache({}, "TEST.vcache")
+        content: bytearray = bytearray((tmp_path / "TEST.vcache").read_bytes())
+        content[4] = 99
+        (tmp_path / "TEST.vcache").write_bytes(bytes(content))
+
+        with pytest.raises(ValueError):
+            load_vec_cache("TEST.vcache")
+
+    def test_disk_cache_ttl(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test the entries of a cache with a ttl expire"""
+        clock = mocker.patch('senior_swe_ai.cache.time.time', return_value=1000.0)
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        cache.set("old", b"1")
+        clock.return_value = 1050.0
+        cache.set("new", b"2")
+
+        clock.return_value = 1070.0
+
+        assert cache.get_many(["old", "new"]) == {"new": b"2"}
+        cache.set("newest", b"3")
+        assert len(cache) == 2
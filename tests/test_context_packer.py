@@ -0,0 +1,77 @@
+""" Test the context_packer module """
+from typing import List
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from senior_swe_ai.context_packer import (
+    PackingRetriever, join_overlap, merge_chunks, pack_documents
+)
+
+METHOD = "def handler(request):\n    user = load_user(request)\n    return render(user)\n"
+
+
+def create_doc(text: str, method: str, path: str = "/repo/views.py") -> Document:
+    """Create a chunk of a method"""
+    return Document(page_content=text, metadata={"file_path": path, "method_name": method})
+
+
+class StubRetriever(BaseRetriever):
+    """Retriever returning fixed documents"""
+
+    docs: List[Document]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.docs
+
+
+class TestContextPacker:
+    """Testing the packing of the retrieved chunks"""
+
+    def test_join_overlap(self) -> None:
+        """Test chunks are joined on their overlap, and only on a long enough one"""
+        assert join_overlap(METHOD[:50], METHOD[20:]) == METHOD
+        assert join_overlap(METHOD[:50], METHOD[10:30]) == METHOD[:50]
+        assert join_overlap("return x", "x = 1", min_overlap=4) is None
+
+    def test_merge_chunks(self) -> None:
+        """Test the chunks of a method are merged whatever their rank"""
+        assert merge_chunks([METHOD[30:], "unrelated text", METHOD[:50]]) == \
+            [METHOD, "unrelated text"]
+
+    def test_pack_documents(self) -> None:
+        """Test the methods keep their rank and the pieces fit the budget"""
+        docs: List[Document] = [
+            create_doc(METHOD[30:], "handler"),
+            create_doc("x" * 40, "large"),
+            create_doc(METHOD[:50], "handler"),
+            create_doc("y" * 10, "small"),
+        ]
+
+        packed: List[Document] = pack_documents(
+            docs, max_tokens=len(METHOD) + 20, token_counter=len)
+
+        assert [doc.page_content for doc in packed] == [METHOD, "y" * 10]
+        assert packed[0].metadata["method_name"] == "handler"
+
+    def test_pack_keeps_rank_of_separate_chunks(self) -> None:
+        """Test a chunk of a method which overlaps no other one keeps its own rank"""
+        docs: List[Document] = [
+            create_doc(METHOD[:30], "handler"),
+            create_doc("z" * 20, "other"),
+            create_doc(METHOD[-20:], "handler"),
+        ]
+
+        packed: List[Document] = pack_documents(docs, max_tokens=50, token_counter=len)
+
+        assert [doc.page_content for doc in packed] == [METHOD[:30], "z" * 20]
+
+    def test_packing_retriever(self) -> None:
+        """Test the retriever packs the documents of the wrapped retriever"""
+        retriever = PackingRetriever(
+            retriever=StubRetriever(docs=[create_doc(METHOD[:50], "handler"),
+                                          create_doc(METHOD[30:], "handler")]),
+            max_tokens=10, token_counter=len)
+
+        assert [doc.page_content for doc in retriever.get_relevant_documents("q")] == [METHOD]
@@ -0,0 +1,57 @@
+""" Test the dedupe module """
+from langchain.schema import Document
+from senior_swe_ai.dedupe import ChunkDeduplicator
+
+BODY = (
+    "def helper(items):\n    total = 0\n    for item in items:\n"
+    "        total += item.value * 2\n        if total > LIMIT:\n"
+    "            raise ValueError('too large')\n    return total\n"
+)
+
+
+def create_doc(content: str, path: str) -> Document:
+    """Create a chunk of the given file"""
+    return Document(page_content=content, metadata={"file_path": path, "method_name": "helper"})
+
+
+class TestDedupe:
+    """Testing the chunk deduplication stage"""
+
+    def test_exact_duplicates(self) -> None:
+        """Test identical chunks are held back as duplicates and similar ones are kept"""
+        dedupe = ChunkDeduplicator()
+        docs: list[Document] = [
+            create_doc(BODY, "/repo/a.py"),
+            create_doc(BODY, "/repo/vendor/a.py"),
+            create_doc(BODY.replace("'too large'", "'too  large'"), "/repo/b.py"),
+            create_doc("def other():\n    return compute(1, 2, 3)\n", "/repo/c.py"),
+        ]
+
+        unique: list[Document] = list(dedupe.unique(docs))
+        dedupe.indexed(unique, ["id-a", "id-b", "id-c"])
+
+        assert unique == [docs[0], docs[2], docs[3]]
+        assert docs[0].metadata["locations"] == [
+            {"file_path": "/repo/a.py", "method_name": "helper"}]
+        assert [(doc.metadata["file_path"], vec_id) for doc, vec_id in dedupe.resolved()] == [
+            ("/repo/vendor/a.py", "id-a")]
+        assert dedupe.duplicates == 1
+
+    def test_scope(self) -> None:
+        """Test chunks of different scopes are never duplicates"""
+        dedupe = ChunkDeduplicator(scope=lambda doc: doc.metadata["file_path"].split("/")[2])
+        docs: list[Document] = [
+            create_doc(BODY, "/repo/api/a.py"), create_doc(BODY, "/repo/web/a.py")]
+
+        assert list(dedupe.unique(docs)) == docs
+
+    def test_seed(self) -> None:
+        """Test chunks already in the index reuse their vector"""
+        dedupe = ChunkDeduplicator()
+        first: Document = create_doc(BODY, "/repo/a.py")
+        list(dedupe.unique([first]))
+        reindex = ChunkDeduplicator()
+        reindex.seed([(first.metadata["chunk_key"], "id-a")])
+
+        assert not list(reindex.unique([create_doc(BODY, "/repo/b.py")]))
+        assert reindex.resolved()[0][1] == "id-a"
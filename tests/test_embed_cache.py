@@ -0,0 +1,79 @@
+""" Test the embed_cache module """
+from typing import List
+from langchain_core.embeddings import Embeddings
+from pytest_mock import MockerFixture
+from senior_swe_ai.cache import DiskCache
+from senior_swe_ai.embed_cache import CachedEmbeddings, QueryEmbeddingCache
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeddings recording every text sent to the model"""
+
+    def __init__(self) -> None:
+        self.model = "counting"
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.embedded.append(text)
+        return [float(len(text)), 1.0]
+
+
+class TestEmbedCache:
+    """Testing the persistent embedding cache"""
+
+    def test_cached_embeddings(self, tmp_path) -> None:
+        """Test identical texts are only embedded once, across cache instances"""
+        path = str(tmp_path / "embeddings.sqlite")
+        model = CountingEmbeddings()
+        cache = DiskCache(path)
+
+        first = CachedEmbeddings(model, cache).embed_documents(["a", "bb", "a"])
+        second = CachedEmbeddings(model, DiskCache(path)).embed_documents(["bb", "ccc"])
+
+        assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert second == [[2.0, 1.0], [3.0, 1.0]]
+        assert model.embedded == ["a", "bb", "ccc"]
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_disk_cache_eviction(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test the least recently used entries are evicted, within the same clock tick too"""
+        mocker.patch("senior_swe_ai.cache.time.time", return_value=1000.0)
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+        cache.set("used", b"2")
+        cache.set("old", b"1")
+        cache.get("used")
+        cache.set("new", b"3")
+
+        assert len(cache) == 2
+        assert cache.get("old") is None
+        assert cache.get("used") == b"2"
+
+    def test_query_embedding_cache(self, tmp_path) -> None:
+        """Test repeated normalized queries are embedded once, in memory then on disk"""
+        path = str(tmp_path / "queries.sqlite")
+        model = CountingEmbeddings()
+        cache = QueryEmbeddingCache(model, max_entries=1, disk=DiskCache(path))
+
+        cache.embed_query("what does  main do?")
+        cache.embed_query(" what does main do? ")
+        cache.embed_query("other")
+        reopened = QueryEmbeddingCache(model, disk=DiskCache(path))
+
+        assert reopened.embed_query("what does main do?") == [18.0, 1.0]
+        assert model.embedded == ["what does main do?", "other"]
+        assert (cache.hits, cache.misses) == (1, 2)
+        assert (reopened.hits, reopened.misses) == (1, 0)
+
+    def test_query_embedding_cache_lru(self) -> None:
+        """Test the least recently used query is evicted from memory"""
+        model = CountingEmbeddings()
+        cache = QueryEmbeddingCache(model, max_entries=2)
+
+        for query in ("a", "b", "a", "c", "a", "b"):
+            cache.embed_query(query)
+
+        assert model.embedded == ["a", "b", "c", "b"]
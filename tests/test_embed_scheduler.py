@@ -0,0 +1,151 @@
+""" Test the embed_scheduler module against a local stub embeddings server """
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Generator
+import openai
+import pytest
+from senior_swe_ai.embed_scheduler import EmbeddingScheduler, TokenBucket
+
+
+class StubEmbeddingsHandler(BaseHTTPRequestHandler):
+    """OpenAI compatible /embeddings endpoint, rate limiting the first requests"""
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Answer an embeddings request"""
+        server: Any = self.server
+        body: dict = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failed: bool = server.requests <= server.rate_limited
+        time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+
+        if failed:
+            payload: dict = {"error": {"message": "Request failed", "type": "requests"}}
+            self._reply(server.error_status, payload, {"retry-after-ms": "10"})
+            return
+        data: list[dict] = [
+            {"object": "embedding", "index": index, "embedding": [float(len(text)), 0.5]}
+            for index, text in enumerate(body["input"])
+        ]
+        # answer in reverse order, the client has to sort by index
+        self._reply(200, {
+            "object": "list", "data": data[::-1], "model": body["model"],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        })
+
+    def _reply(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        content: bytes = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """Keep the test output quiet"""
+
+
+@pytest.fixture
+def stub_server() -> Generator[Any, None, None]:
+    """Run the stub embeddings server on a free local port"""
+    server: Any = ThreadingHTTPServer(("127.0.0.1", 0), StubEmbeddingsHandler)
+    server.lock = threading.Lock()
+    server.requests = server.in_flight = server.max_in_flight = 0
+    server.rate_limited = 0
+    server.error_status = 429
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def create_scheduler(server: Any, **kwargs: Any) -> EmbeddingScheduler:
+    """Create a scheduler talking to the stub server"""
+    client = openai.AsyncOpenAI(
+        api_key="test_key", base_url=f"http://127.0.0.1:{server.server_port}/v1",
+        max_retries=0)
+    kwargs.setdefault("backoff", 0.01)
+    return EmbeddingScheduler(client, "text-embedding-3-small", token_counter=len, **kwargs)
+
+
+class TestEmbedScheduler:
+    """Testing the concurrent embedding scheduler"""
+
+    def test_embed_documents_in_order(self, stub_server: Any) -> None:
+        """Test batches are sent concurrently and the vectors keep the input order"""
+        scheduler: EmbeddingScheduler = create_scheduler(
+            stub_server, batch_size=2, max_in_flight=3)
+        texts: list[str] = ["a" * length for length in range(1, 12)]
+
+        vectors: list[list[float]] = scheduler.embed_documents(texts)
+
+        assert vectors == [[float(len(text)), 0.5] for text in texts]
+        assert stub_server.requests == 6
+        assert 1 < stub_server.max_in_flight <= 3
+
+    def test_retry_on_rate_limit(self, stub_server: Any) -> None:
+        """Test 429 responses are retried until the request succeeds"""
+        stub_server.rate_limited = 2
+        scheduler: EmbeddingScheduler = create_scheduler(stub_server, max_in_flight=1)
+
+        assert scheduler.embed_query("abc") == [3.0, 0.5]
+        assert scheduler.retries == 2
+
+    def test_retry_on_server_error(self, stub_server: Any) -> None:
+        """Test 5xx responses are retried, after the delay asked by the server"""
+        stub_server.rate_limited = 2
+        stub_server.error_status = 503
+        scheduler: EmbeddingScheduler = create_scheduler(stub_server, backoff=10)
+
+        assert scheduler.embed_query("abc") == [3.0, 0.5]
+        assert scheduler.retries == 2
+        scheduler.close()
+
+    def test_retry_on_connection_error(self) -> None:
+        """Test a refused connection is retried, then raised"""
+        client = openai.AsyncOpenAI(
+            api_key="test_key", base_url="http://127.0.0.1:1/v1", max_retries=0)
+        scheduler = EmbeddingScheduler(
+            client, "text-embedding-3-small", token_counter=len, backoff=0.01, max_retries=2)
+
+        with pytest.raises(openai.APIConnectionError):
+            scheduler.embed_query("abc")
+        assert scheduler.retries == 2
+
+    def test_close(self, stub_server: Any) -> None:
+        """Test close stops the event loop thread"""
+        scheduler: EmbeddingScheduler = create_scheduler(stub_server)
+        scheduler.embed_query("abc")
+
+        scheduler.close()
+        scheduler.close()
+
+        assert not scheduler._thread.is_alive()  # pylint: disable=protected-access
+
+    def test_retry_exhausted(self, stub_server: Any) -> None:
+        """Test the rate limit error is raised once the retries are exhausted"""
+        stub_server.rate_limited = 10
+        scheduler: EmbeddingScheduler = create_scheduler(stub_server, max_retries=1)
+
+        with pytest.raises(openai.RateLimitError):
+            scheduler.embed_query("abc")
+
+    def test_token_bucket_waits_for_refill(self) -> None:
+        """Test a request above the available tokens waits for the refill"""
+        async def acquire() -> float:
+            bucket = TokenBucket(per_minute=60_000)
+            await bucket.acquire(60_000)
+            start: float = time.monotonic()
+            await bucket.acquire(100)
+            return time.monotonic() - start
+
+        assert asyncio.run(acquire()) >= 0.09
@@ -0,0 +1,25 @@
+""" Test the file_handler module """
+from langchain.schema import Document
+from senior_swe_ai.file_handler import iter_code_files
+
+
+class TestFileHandler:
+    """Testing the parsing of the code files"""
+
+    def test_iter_code_files_workers(self, tmp_path) -> None:
+        """Test the worker processes yield the same chunks in the same order as one process"""
+        files: list[str] = []
+        for index in range(5):
+            code_file = tmp_path / f"code_{index}.py"
+            code_file.write_text(
+                f"def first_{index}():\n    pass\n\n\ndef second_{index}():\n    pass\n",
+                encoding="utf-8")
+            files.append(str(code_file))
+        hashes: dict[str, str] = {file: f"hash_{index}" for index, file in enumerate(files)}
+
+        serial: list[Document] = list(iter_code_files(iter(files), hashes))
+        parallel: list[Document] = list(
+            iter_code_files(iter(files), hashes, workers=2, chunk_size=2))
+
+        assert len(serial) == 10
+        assert parallel == serial
@@ -0,0 +1,121 @@
+""" Test the git_process module """
+import os
+import subprocess
+import pytest
+from pytest_mock import MockerFixture
+from senior_swe_ai.git_process import get_file_hashes, get_hashes, iter_repo_files
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch) -> str:
+    """Create a git repository with a committed, a modified and an untracked file"""
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    (tmp_path / "committed.py").write_text("def a():\n    pass\n", encoding="utf-8")
+    (tmp_path / "modified.py").write_text("def b():\n    pass\n", encoding="utf-8")
+    git("add", ".")
+    git("-c", "user.name=test", "-c", "user.email=test@test", "commit", "-qm", "init")
+    (tmp_path / "modified.py").write_text("def c():\n    pass\n", encoding="utf-8")
+    (tmp_path / "untracked.py").write_text("def d():\n    pass\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path)
+
+
+class TestGitProcess:
+    """Testing git_process functions"""
+
+    def test_get_file_hashes(self, git_repo: str) -> None:
+        """Test get_file_hashes returns the blob id of the working tree content"""
+        hashes: dict[str, str] = get_file_hashes()
+
+        for name in ("committed.py", "modified.py", "untracked.py"):
+            path: str = os.path.join(os.path.realpath(git_repo), name)
+            expected: str = subprocess.run(
+                ["git", "hash-object", path], capture_output=True, check=True, text=True
+            ).stdout.strip()
+            assert hashes[path] == expected
+
+    def test_get_hashes_subset(self, git_repo: str) -> None:
+        """Test get_hashes only returns the requested files"""
+        path: str = os.path.join(os.path.realpath(git_repo), "committed.py")
+
+        assert list(get_hashes([path])) == [path]
+
+    def test_get_hashes_of_ignored_file(self, git_repo: str) -> None:
+        """Test a file git does not list is hashed by content, not by the last commit"""
+        with open(os.path.join(git_repo, ".gitignore"), "w", encoding="utf-8") as f:
+            f.write("ignored.py\n")
+        path: str = os.path.join(os.path.realpath(git_repo), "ignored.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("def e():\n    pass\n")
+
+        expected: str = subprocess.run(
+            ["git", "hash-object", path], capture_output=True, check=True, text=True
+        ).stdout.strip()
+        assert get_hashes([path]) == {path: expected}
+
+    def test_get_file_hashes_conflict(self, git_repo: str) -> None:
+        """Test a path being merged is hashed from the working tree, not from a stage"""
+        def git(*args: str) -> None:
+            subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@test", *args],
+                           cwd=git_repo, check=True, capture_output=True)
+
+        git("checkout", "-q", "modified.py")
+        git("checkout", "-qb", "other")
+        with open(os.path.join(git_repo, "committed.py"), "w", encoding="utf-8") as f:
+            f.write("def other():\n    pass\n")
+        git("commit", "-qam", "other")
+        git("checkout", "-q", "-")
+        with open(os.path.join(git_repo, "committed.py"), "w", encoding="utf-8") as f:
+            f.write("def ours():\n    pass\n")
+        git("commit", "-qam", "ours")
+        assert subprocess.run(["git", "merge", "-q", "other"], cwd=git_repo,
+                              capture_output=True, check=False).returncode != 0
+
+        path: str = os.path.join(os.path.realpath(git_repo), "committed.py")
+        expected: str = subprocess.run(
+            ["git", "hash-object", path], capture_output=True, check=True, text=True
+        ).stdout.strip()
+        assert get_file_hashes()[path] == expected
+
+    def test_hashes_skip_deleted_file(self, git_repo: str) -> None:
+        """Test a file deleted from the working tree does not abort the hashing"""
+        root: str = os.path.realpath(git_repo)
+        os.remove(os.path.join(root, "committed.py"))
+
+        assert os.path.join(root, "committed.py") not in get_file_hashes()
+        hashes: dict[str, str] = get_hashes(
+            [os.path.join(root, "committed.py"), os.path.join(root, "untracked.py")])
+        assert list(hashes) == [os.path.join(root, "untracked.py")]
+
+    def test_iter_repo_files(self, git_repo: str, tmp_path) -> None:
+        """Test the git enumeration skips ignored, excluded and deleted files"""
+        (tmp_path / ".gitignore").write_text("ignored/\n", encoding="utf-8")
+        for directory in ("ignored", "node_modules", "src"):
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / "code.py").write_text("", encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("", encoding="utf-8")
+        (tmp_path / "committed.py").unlink()
+
+        root: str = os.path.realpath(git_repo)
+        assert sorted(iter_repo_files()) == [
+            os.path.join(root, "modified.py"),
+            os.path.join(root, "src", "code.py"),
+            os.path.join(root, "untracked.py"),
+        ]
+
+    def test_iter_repo_files_walk(
+        self, git_repo: str, tmp_path, mocker: MockerFixture
+    ) -> None:
+        """Test the fallback walk prunes the excluded directories"""
+        mocker.patch('senior_swe_ai.git_process._git_ls_files', side_effect=OSError)
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "code.js").write_text("", encoding="utf-8")
+
+        files: list[str] = list(iter_repo_files())
+
+        root: str = os.path.realpath(git_repo)
+        assert os.path.join(root, "committed.py") in files
+        assert not any("node_modules" in file for file in files)
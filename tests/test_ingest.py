@@ -0,0 +1,117 @@
+""" Test the ingest module """
+import threading
+import time
+from langchain.schema import Document
+from langchain_community.embeddings import FakeEmbeddings
+from pytest_mock import MockerFixture
+from senior_swe_ai.ingest import batched, embed_batches, index_files
+from senior_swe_ai.vec_store import VectorStore
+
+
+class TestIngest:
+    """Testing the streaming ingestion pipeline"""
+
+    def test_batched(self) -> None:
+        """Test batched groups a generator into fixed size lists"""
+        assert list(batched((i for i in range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_embed_batches_ahead(self) -> None:
+        """Test several batches are embedded at once and come back in order"""
+        class SlowEmbeddings(FakeEmbeddings):
+            """Embeddings recording how many calls run at once"""
+            running: int = 0
+            max_running: int = 0
+
+            def embed_documents(self, texts: list[str]) -> list[list[float]]:
+                with lock:
+                    self.running += 1
+                    self.max_running = max(self.max_running, self.running)
+                time.sleep(0.05)
+                with lock:
+                    self.running -= 1
+                return [[float(len(text))] * self.size for text in texts]
+
+        lock = threading.Lock()
+        embed_mdl = SlowEmbeddings(size=2)
+        batches: list[list[Document]] = [
+            [Document(page_content="x" * (index + 1))] for index in range(6)]
+
+        results = list(embed_batches(iter(batches), embed_mdl, ahead=3))
+
+        assert [batch for batch, _ in results] == batches
+        assert [vectors[0][0] for _, vectors in results] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+        assert embed_mdl.max_running == 3
+
+    def test_index_files(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test files are parsed, embedded in batches and saved with their cache"""
+        mocker.patch('senior_swe_ai.vec_store.get_cache_path',
+                     return_value=str(tmp_path))
+        mocker.patch('senior_swe_ai.cache.get_cache_path',
+                     return_value=str(tmp_path))
+        code_file = tmp_path / "code.py"
+        code_file.write_text(
+            "def first():\n    pass\n\n\ndef second():\n    pass\n", encoding="utf-8")
+        empty_file = tmp_path / "empty.py"
+        empty_file.write_text("VALUE = 1\n", encoding="utf-8")
+        files: list[str] = [str(code_file), str(empty_file)]
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+
+        indexed: int = index_files(
+            vec_store, iter(files), {file: "hash" for file in files}, batch_size=1)
+
+        assert indexed == 2
+        assert vec_store.db.index.ntotal == 2
+        assert len(vec_store.vec_cache[str(code_file)].vector_ids) == 2
+        assert not vec_store.vec_cache[str(empty_file)].vector_ids
+        assert (tmp_path / "TEST.faiss").exists()
+        assert (tmp_path / "TEST.vcache").exists()
+
+    def test_checkpoints_double(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test checkpoints are spaced by the chunks indexed so far, not every few batches"""
+        mocker.patch('senior_swe_ai.vec_store.get_cache_path',
+                     return_value=str(tmp_path))
+        mocker.patch('senior_swe_ai.cache.get_cache_path',
+                     return_value=str(tmp_path))
+        mocker.patch('senior_swe_ai.ingest.CHECKPOINT_MIN_CHUNKS', 1)
+        files: list[str] = []
+        for index in range(5):
+            code_file = tmp_path / f"code_{index}.py"
+            code_file.write_text(f"def method_{index}():\n    return {index}\n",
+                                 encoding="utf-8")
+            files.append(str(code_file))
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        save = mocker.spy(vec_store, "save")
+
+        index_files(vec_store, iter(files), {file: "hash" for file in files}, batch_size=1)
+
+        # after 1, 2 and 4 chunks, then the final save
+        assert [call.kwargs.get("incomplete_file") for call in save.call_args_list] == [
+            files[0], files[1], files[3], None]
+        assert all(vec_store.vec_cache[file].commit_hash == "hash" for file in files)
+
+    def test_index_files_workers(self, tmp_path, mocker: MockerFixture) -> None:
+        """Test parsing in worker processes indexes the same chunks in the same order"""
+        mocker.patch('senior_swe_ai.vec_store.get_cache_path',
+                     return_value=str(tmp_path))
+        mocker.patch('senior_swe_ai.cache.get_cache_path',
+                     return_value=str(tmp_path))
+        files: list[str] = []
+        for index in range(3):
+            code_file = tmp_path / f"code_{index}.py"
+            code_file.write_text(f"def method_{index}():\n    return {index}\n",
+                                 encoding="utf-8")
+            files.append(str(code_file))
+        hashes: dict[str, str] = {file: "hash" for file in files}
+        stores: list[VectorStore] = [VectorStore(FakeEmbeddings(size=8), name)
+                                     for name in ("SERIAL", "PARALLEL")]
+
+        for workers, vec_store in zip((1, 2), stores):
+            index_files(vec_store, iter(files), hashes, workers=workers, batch_size=2)
+
+        serial, parallel = (
+            [vec_store.db.docstore.search(doc_id).page_content
+             for doc_id in vec_store.db.index_to_docstore_id.values()] for vec_store in stores)
+        assert len(serial) == 3
+        assert parallel == serial
+        assert {file: list(cached.vector_ids) for file, cached in stores[1].vec_cache.items()} \
+            == {file: list(cached.vector_ids) for file, cached in stores[0].vec_cache.items()}
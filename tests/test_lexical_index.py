@@ -0,0 +1,40 @@
+""" Test the lexical_index module """
+from senior_swe_ai.lexical_index import LexicalIndex, tokenize
+
+DOCS: list[tuple[str, str]] = [
+    ("parse", "def parse_code_files(code_files):\n    return parse(code_files)"),
+    ("server", "class HTTPServer:\n    def serve(self): pass"),
+    ("other", "VALUE = 1"),
+]
+
+
+class TestLexicalIndex:
+    """Testing the BM25 inverted index"""
+
+    def test_tokenize(self) -> None:
+        """Test identifiers are kept whole and split into their parts"""
+        assert tokenize("parseCodeFiles(HTTP_server)") == [
+            "parsecodefiles", "parse", "code", "files", "http_server", "http", "server"]
+
+    def test_search(self) -> None:
+        """Test the documents are ranked by their BM25 score"""
+        index: LexicalIndex = LexicalIndex.build(DOCS)
+
+        assert [doc_id for doc_id, _ in index.search("parse_code_files")] == ["parse"]
+        assert [doc_id for doc_id, _ in index.search("http server")] == ["server"]
+        assert not index.search("missing")
+
+    def test_save_and_load(self, tmp_path) -> None:
+        """Test a memory mapped index gives the same results"""
+        index: LexicalIndex = LexicalIndex.build(DOCS)
+        index.save(str(tmp_path / "index.bm25"))
+
+        loaded: LexicalIndex = LexicalIndex.load(str(tmp_path / "index.bm25"))
+
+        assert loaded.search("code files serve", k=3) == index.search("code files serve", k=3)
+
+    def test_empty_documents(self) -> None:
+        """Test an index of empty documents has a usable average length"""
+        for index in (LexicalIndex.build([("a", ""), ("b", "")]), LexicalIndex.build([])):
+            assert index.avg_length == 1.0
+            assert not index.search("parse")
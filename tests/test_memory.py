@@ -0,0 +1,77 @@
+""" Test the memory module """
+import threading
+import time
+from typing import Any, List
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.messages import BaseMessage
+from senior_swe_ai.memory import BackgroundSummaryMemory
+
+
+class BlockingChatModel(FakeListChatModel):
+    """Fake chat model whose answers wait for an event"""
+
+    release: Any = None
+
+    def _call(self, messages: List[BaseMessage], stop=None, run_manager=None,
+              **kwargs: Any) -> str:
+        self.release.wait(timeout=5)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+def create_memory(release: threading.Event, **kwargs: Any) -> BackgroundSummaryMemory:
+    """Create a memory counting one token per character"""
+    return BackgroundSummaryMemory(
+        llm=BlockingChatModel(responses=["summary"], release=release),
+        memory_key="chat_history", return_messages=True, token_counter=len, **kwargs)
+
+
+def wait_for(condition, timeout: float = 5) -> None:
+    """Wait until the background summarization reached a state"""
+    deadline: float = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestBackgroundSummaryMemory:
+    """Testing the token budgeted memory"""
+
+    def test_summarizes_in_background(self) -> None:
+        """Test the turns out of the budget are summarized without blocking the turn"""
+        release = threading.Event()
+        memory = create_memory(release, max_turns=1)
+        memory.save_context({"question": "first"}, {"answer": "one"})
+
+        memory.save_context({"question": "second"}, {"answer": "two"})
+
+        history: list = memory.load_memory_variables({})["chat_history"]
+        assert [message.content for message in history] == ["first", "one", "second", "two"]
+        release.set()
+        wait_for(lambda: memory.moving_summary_buffer)
+        history = memory.load_memory_variables({})["chat_history"]
+        assert [message.content for message in history] == ["summary", "second", "two"]
+
+    def test_token_budget(self) -> None:
+        """Test the verbatim turns fit the token budget, keeping the last turn"""
+        release = threading.Event()
+        release.set()
+        memory = create_memory(release, max_token_limit=40)
+        for turn in range(3):
+            memory.save_context({"question": f"question {turn}"}, {"answer": "x" * 20})
+        wait_for(lambda: len(memory.load_memory_variables({})["chat_history"]) == 3)
+
+        history: list = memory.load_memory_variables({})["chat_history"]
+
+        assert [message.content for message in history] == ["summary", "question 2", "x" * 20]
+
+    def test_clear(self) -> None:
+        """Test a summary in progress is dropped by a clear"""
+        release = threading.Event()
+        memory = create_memory(release, max_turns=1)
+        memory.save_context({"question": "first"}, {"answer": "one"})
+        memory.save_context({"question": "second"}, {"answer": "two"})
+
+        memory.clear()
+        release.set()
+        time.sleep(0.1)
+
+        assert memory.load_memory_variables({})["chat_history"] == []
@@ -0,0 +1,35 @@
+""" Test the panel module """
+import io
+from rich.console import Console
+from senior_swe_ai.panel import PanelBase, Queue
+
+
+class TestPanel:
+    """Testing the chat rendering"""
+
+    def test_queue(self) -> None:
+        """Test the queue is first in first out and drops its oldest items beyond maxlen"""
+        queue = Queue(maxlen=2)
+        for item in range(3):
+            queue.enqueue(item)
+
+        assert queue.dequeue() == 1
+        assert queue.dequeue() == 2
+        assert queue.dequeue() is None
+
+    def test_print_new(self) -> None:
+        """Test only the new chatboxes are printed and a window of them is kept"""
+        panel = PanelBase("TEST", width=70, window=2)
+        output = io.StringIO()
+        panel.console = Console(file=output, width=120)
+        panel.create_chatbox("user", "first question", is_ai=False)
+        panel.print_new()
+        panel.create_chatbox("ai", "first answer")
+        panel.create_chatbox("user", "second question", is_ai=False)
+        output.truncate(0)
+
+        panel.print_new()
+
+        assert "first question" not in output.getvalue()
+        assert "second question" in output.getvalue()
+        assert panel._queue.size() == 2  # pylint: disable=protected-access
@@ -0,0 +1,84 @@
+""" Test the retrievers module """
+from typing import List
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from senior_swe_ai.retrievers import (
+    CachedRetriever, HybridRetriever, RetrievalCache, is_lexical_query, reciprocal_rank_fusion
+)
+
+
+def create_doc(content: str) -> Document:
+    """Create a document of a single file"""
+    return Document(page_content=content, metadata={"file_path": "/repo/code.py"})
+
+
+class StubRetriever(BaseRetriever):
+    """Retriever returning fixed documents and counting its calls"""
+
+    docs: List[Document] = []
+    calls: int = 0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self.calls += 1
+        return self.docs
+
+
+class TestRetrievers:
+    """Testing the hybrid retrieval"""
+
+    def test_is_lexical_query(self) -> None:
+        """Test identifiers and error codes are lexical queries, questions are not"""
+        assert is_lexical_query("parse_code_files")
+        assert is_lexical_query("`VectorStore.load_docs()`")
+        assert is_lexical_query("ERR_CONNECTION_REFUSED")
+        assert not is_lexical_query("what does parse_code_files do?")
+
+    def test_reciprocal_rank_fusion(self) -> None:
+        """Test documents ranked well by both searches come first"""
+        first, second, third = create_doc("a"), create_doc("b"), create_doc("c")
+
+        fused = reciprocal_rank_fusion([[first, second], [second, third]], k=2)
+
+        assert fused == [second, first]
+
+    def test_lexical_query_skips_vector_search(self) -> None:
+        """Test an identifier answered by the lexical index is not embedded"""
+        doc: Document = create_doc("def parse(): pass")
+        retriever = HybridRetriever(
+            vector_retriever=StubRetriever(), lexical_search=lambda query, k: [doc])
+
+        assert retriever.get_relevant_documents("parse") == [doc]
+        assert retriever.get_relevant_documents("how to parse") == [doc]
+        assert retriever.vector_retriever.calls == 1
+
+    def test_symbol_search_fused(self) -> None:
+        """Test the chunks of a mentioned method rank first, fused with the vector search"""
+        method, other = create_doc("def parse(): pass"), create_doc("parse()")
+        semantic: Document = create_doc("def tokenize(): pass")
+        retriever = HybridRetriever(
+            vector_retriever=StubRetriever(docs=[semantic]),
+            lexical_search=lambda query, k: [other, method],
+            symbol_search=lambda query, k: [method])
+
+        assert retriever.get_relevant_documents("what does parse() do") == \
+            [method, semantic, other]
+        assert retriever.vector_retriever.calls == 1
+
+    def test_cached_retriever(self) -> None:
+        """Test repeated queries are served from the cache until the generation changes"""
+        generation: list[int] = [1]
+        cache = RetrievalCache()
+        retriever = CachedRetriever(
+            retriever=StubRetriever(docs=[create_doc("a")]), cache=cache,
+            generation=lambda: generation[0])
+
+        retriever.get_relevant_documents("what is  a")
+        retriever.get_relevant_documents("what is a")
+        generation[0] += 1
+        retriever.get_relevant_documents("what is a")
+
+        assert retriever.retriever.calls == 2
+        assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,172 @@
+""" Test the sharded_store module """
+import os
+import pytest
+from langchain.schema import Document
+from langchain_community.embeddings import FakeEmbeddings
+from pytest_mock import MockerFixture
+from senior_swe_ai import vec_store
+from senior_swe_ai.consts import ShardKey
+from senior_swe_ai.sharded_store import ShardedVectorStore, get_shard
+
+ROOT = os.path.join(os.sep, "repo")
+
+
+@pytest.fixture
+def cache_path(tmp_path, mocker: MockerFixture) -> str:
+    """Point the cache directory to a temporary directory"""
+    for module in ('vec_store', 'cache', 'sharded_store'):
+        mocker.patch(f'senior_swe_ai.{module}.get_cache_path', return_value=str(tmp_path))
+    return str(tmp_path)
+
+
+def create_doc(path: str, name: str) -> Document:
+    """Create the document of a method in the given file"""
+    return Document(page_content=f"def {name}(): pass",
+                    metadata={"filename": os.path.basename(path), "file_path": path,
+                              "commit_hash": "hash"})
+
+
+class TestShardedStore:
+    """Testing the sharded vector store"""
+
+    def test_get_shard(self) -> None:
+        """Test files are assigned to their top-level directory or language"""
+        app: str = os.path.join(ROOT, "app", "models", "user.py")
+        assert get_shard(app, ShardKey.DIRECTORY, ROOT) == "app"
+        assert get_shard(os.path.join(ROOT, "setup.py"), ShardKey.DIRECTORY, ROOT) == "_root"
+        assert get_shard(app, ShardKey.LANGUAGE, ROOT) == "python"
+        assert get_shard(os.path.join(ROOT, "notes.txt"), ShardKey.LANGUAGE, ROOT) == "_other"
+
+    def test_index_and_search(self, cache_path: str) -> None:
+        """Test documents go to their shard and the search merges every shard"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        docs: list[Document] = [
+            create_doc(os.path.join(ROOT, "api", "views.py"), "index"),
+            create_doc(os.path.join(ROOT, "web", "app.js"), "render"),
+            create_doc(os.path.join(ROOT, "api", "urls.py"), "route"),
+        ]
+        ids: list[str] = store.add_embeddings(docs, FakeEmbeddings(size=8).embed_documents(
+            [doc.page_content for doc in docs]))
+        store.save()
+
+        loaded = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        loaded.load_docs()
+
+        assert sorted(loaded.shards) == ["api", "web"]
+        assert loaded.vec_cache[os.path.join(ROOT, "api", "urls.py")].vector_ids[0] == int(ids[2])
+        assert len(loaded.retrieval.get_relevant_documents("where is the route")) == 3
+        assert loaded.retrieval.get_relevant_documents("route") == [docs[2]]
+        assert os.path.exists(os.path.join(cache_path, "TEST.api.faiss"))
+
+    def test_reindex_touches_one_shard(self, cache_path: str, mocker: MockerFixture) -> None:
+        """Test only the shard of a changed file is reloaded and saved again"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        docs: list[Document] = [
+            create_doc(os.path.join(ROOT, "api", "views.py"), "index"),
+            create_doc(os.path.join(ROOT, "web", "app.js"), "render"),
+        ]
+        store.add_embeddings(docs, [[0.0] * 8, [1.0] * 8])
+        store.save()
+
+        read_docs = mocker.spy(vec_store, "load_docstore")
+        store.load_docs(mmap=False)
+        save = mocker.spy(store.shards["api"], "save")
+        web_save = mocker.spy(store.shards["web"], "save")
+        store.remove_files([os.path.join(ROOT, "api", "views.py")])
+        store.upsert_file(os.path.join(ROOT, "api", "urls.py"),
+                          [create_doc(os.path.join(ROOT, "api", "urls.py"), "route")], "hash")
+        store.save()
+
+        assert read_docs.call_count == 1
+        assert save.call_count == 1
+        assert web_save.call_count == 0
+        assert not store.shards["web"].db
+        assert store.shards["api"].db.index.ntotal == 1
+
+    def test_search_diversifies_across_shards(self, cache_path: str) -> None:
+        """Test MMR runs over the candidates of every shard, not one shard at a time"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        docs: list[Document] = [
+            create_doc(os.path.join(ROOT, "api", "views.py"), "index"),
+            create_doc(os.path.join(ROOT, "api", "urls.py"), "index_copy"),
+            create_doc(os.path.join(ROOT, "web", "app.js"), "render"),
+        ]
+        store.add_embeddings(docs, [[1.0] + [0.0] * 7, [1.0] + [0.0] * 7,
+                                    [0.5, 1.0] + [0.0] * 6])
+
+        results = store.search_by_vector([1.0, 0.2] + [0.0] * 6, k=2, fetch_k=4)
+
+        # the second api chunk is the closest one left, but a copy of the first
+        assert [doc.metadata["file_path"] for doc, _ in results] == [
+            docs[0].metadata["file_path"], docs[2].metadata["file_path"]]
+
+    def test_symbol_qualifier_across_shards(self, cache_path: str) -> None:
+        """Test a qualifier naming a file of one shard drops the chunks of the others"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        docs: list[Document] = [
+            create_doc(os.path.join(ROOT, "api", "views.py"), "index"),
+            create_doc(os.path.join(ROOT, "web", "app.js"), "index_page"),
+        ]
+        for doc in docs:
+            doc.metadata["method_name"] = "index"
+        store.add_embeddings(docs, [[0.0] * 8, [1.0] * 8])
+        store.save()
+        store.load_docs()
+
+        assert store.symbol_search("what does `views.index` do") == [docs[0]]
+        assert len(store.symbol_search("what does `Router.index` do")) == 2
+
+    def test_upsert_and_compact(self, cache_path: str) -> None:
+        """Test a file is replaced in its shard and only that shard is compacted"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        views: str = os.path.join(ROOT, "api", "views.py")
+        store.upsert_files(
+            [create_doc(views, name) for name in ("index", "detail", "update")]
+            + [create_doc(os.path.join(ROOT, "web", "app.js"), "render")],
+            {views: "hash", os.path.join(ROOT, "web", "app.js"): "hash"})
+
+        store.upsert_file(views, [create_doc(views, "delete")], "new")
+
+        assert store.shards["api"].db.index.ntotal == 1
+        assert store.vec_cache[views].commit_hash == "new"
+        assert store.compact()
+        assert list(store.vec_cache[views].vector_ids) == [0]
+        assert store.shards["web"].next_id == 1
+
+    def test_shard_key_changed(self, cache_path: str) -> None:
+        """Test an index sharded by another key is refused for search and dropped for an update"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        store.add_embeddings([create_doc(os.path.join(ROOT, "api", "views.py"), "index")],
+                             [[0.0] * 8])
+        store.save()
+
+        loaded = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.LANGUAGE, ROOT)
+
+        assert loaded.shard_key_changed()
+        with pytest.raises(ValueError):
+            loaded.load_docs()
+        loaded.load_docs(mmap=False)
+        assert not loaded.vec_cache
+        assert not os.path.exists(os.path.join(cache_path, "TEST.api.faiss"))
+        loaded.add_embeddings([create_doc(os.path.join(ROOT, "api", "views.py"), "index")],
+                              [[0.0] * 8])
+        loaded.save()
+        assert not loaded.shard_key_changed()
+        assert sorted(loaded.shards) == ["python"]
+
+    def test_reindex_dedupes_in_lazy_shard(self, cache_path: str) -> None:
+        """Test a chunk added to a shard loaded on demand reuses the identical indexed one"""
+        store = ShardedVectorStore(FakeEmbeddings(size=8), "TEST", ShardKey.DIRECTORY, ROOT)
+        views: str = os.path.join(ROOT, "api", "views.py")
+        store.upsert_files([create_doc(views, "index"),
+                            create_doc(os.path.join(ROOT, "web", "app.js"), "render")],
+                           {views: "hash", os.path.join(ROOT, "web", "app.js"): "hash"})
+        store.save()
+
+        store.load_docs(mmap=False)
+        copy: str = os.path.join(ROOT, "api", "copy.py")
+        store.upsert_file(copy, [create_doc(copy, "index")], "hash")
+
+        assert store.shards["api"].db.index.ntotal == 1
+        assert list(store.vec_cache[copy].vector_ids) == list(store.vec_cache[views].vector_ids)
+        assert not store.shards["web"].db
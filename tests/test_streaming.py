@@ -0,0 +1,46 @@
+""" Test the streaming module """
+from typing import Any, Iterator
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.outputs import ChatGenerationChunk
+from senior_swe_ai.streaming import AnswerCancelled, TokenStream
+
+
+class StreamingChatModel(FakeListChatModel):
+    """Fake chat model reporting every streamed character as a new token"""
+
+    def _stream(self, messages, stop=None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for chunk in super()._stream(messages, stop, run_manager, **kwargs):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+
+class TestTokenStream:
+    """Testing the streamed answer handler"""
+
+    def test_collects_tokens(self) -> None:
+        """Test the tokens of a streamed answer are joined and the first one timed"""
+        stream = TokenStream()
+        assert stream.status().startswith("waiting")
+
+        chunks: list[str] = [chunk.content for chunk in StreamingChatModel(
+            responses=["hello"]).stream("question", config={"callbacks": [stream]})]
+
+        assert stream.text == "".join(chunks) == "hello"
+        assert stream.first_token is not None
+        assert stream.status().startswith("first token")
+
+    def test_cancel(self) -> None:
+        """Test a cancelled answer stops at the next token"""
+        stream = TokenStream()
+        chunks = StreamingChatModel(responses=["hello"]).stream(
+            "question", config={"callbacks": [stream]})
+
+        next(chunks)
+        stream.cancel()
+
+        with pytest.raises(AnswerCancelled):
+            next(chunks)
+        assert stream.text == "h"
@@ -0,0 +1,45 @@
+""" Test the symbol_table module """
+from senior_swe_ai.symbol_table import SymbolTable, matches_qualifier
+
+SYMBOLS: list[tuple[str, str]] = [
+    ("parse_code_files", "1"), ("parse_code_file", "2"), ("parse_code_files", "3"),
+    ("loadDocs", "4"), ("main", "5"),
+]
+
+
+class TestSymbolTable:
+    """Testing the method name lookups"""
+
+    def test_lookup_and_prefix(self) -> None:
+        """Test exact names get all their chunks and prefixes are completed"""
+        table: SymbolTable = SymbolTable.build(SYMBOLS)
+
+        assert table.lookup("parse_code_files") == ["1", "3"]
+        assert not table.lookup("parse")
+        assert table.prefix("parse_code") == ["parse_code_file", "parse_code_files"]
+
+    def test_find_mentions(self) -> None:
+        """Test identifiers, calls and code spans are found, plain words are not"""
+        table: SymbolTable = SymbolTable.build(SYMBOLS)
+
+        assert table.find_mentions("what does parse_code_files do?") == ["parse_code_files"]
+        assert table.find_mentions("who calls `store.loadDocs`.") == ["store.loadDocs"]
+        assert table.find_mentions("where is `main` called, and main()") == ["main"]
+        assert not table.find_mentions("what is the main module")
+        assert table.find_mentions("does loadDocs use FAISS") == ["loadDocs"]
+        assert table.find_mentions("what calls loadDoc") == ["loadDocs"]
+        assert not table.find_mentions("is it on GitHub")
+        assert table.find_mentions("explain parse_code_") == ["parse_code_file"]
+
+    def test_matches_qualifier(self) -> None:
+        """Test a qualified mention only matches the files named after its qualifier"""
+        assert matches_qualifier("", "/repo/cli.py")
+        assert matches_qualifier("vec_store", "/repo/senior_swe_ai/vec_store.py")
+        assert matches_qualifier("app.VectorStore", "/repo/src/vector_store.py")
+        assert not matches_qualifier("Foo", "/repo/bar.py")
+
+    def test_save_and_load(self, tmp_path) -> None:
+        """Test a saved table is read back"""
+        SymbolTable.build(SYMBOLS).save(str(tmp_path / "symbols.json"))
+
+        assert SymbolTable.load(str(tmp_path / "symbols.json")).lookup("main") == ["5"]
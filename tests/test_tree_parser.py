@@ -0,0 +1,64 @@
+""" Test the tree_parser package """
+from senior_swe_ai.consts import Language
+from senior_swe_ai.tree_parser.base import BaseTreeParser, TreeParserMethodNode
+
+
+class TestTreeParser:
+    """Testing the query based method extraction"""
+
+    def test_parse_python(self) -> None:
+        """Test functions, decorated methods and docstrings are extracted"""
+        code = b'''
+def outer():
+    """Outer doc"""
+    def inner():
+        """Inner doc"""
+
+class Klass:
+    @staticmethod
+    def method():
+        return 1
+'''
+        nodes: list[TreeParserMethodNode] = BaseTreeParser.get_treesitter(
+            Language.PYTHON).parse(code)
+
+        assert [(node.name, node.doc_comment) for node in nodes] == [
+            ("outer", '"""Outer doc"""'),
+            ("method", None),
+        ]
+        assert "def inner" in nodes[0].method_source_code
+
+    def test_parse_rust_doc_comment_lines(self) -> None:
+        """Test consecutive doc comment lines are joined"""
+        code = b'''
+/// first
+/// second
+fn documented() {}
+
+fn plain() {}
+'''
+        nodes: list[TreeParserMethodNode] = BaseTreeParser.get_treesitter(
+            Language.RUST).parse(code)
+
+        assert [(node.name, node.doc_comment) for node in nodes] == [
+            ("documented", "/// first\n/// second"),
+            ("plain", None),
+        ]
+
+    def test_parse_c_pointer_return(self) -> None:
+        """Test the name of a function returning a pointer is found"""
+        code = b'/* doc */\nchar *name(void) { return 0; }\n'
+        nodes: list[TreeParserMethodNode] = BaseTreeParser.get_treesitter(
+            Language.C).parse(code)
+
+        assert [(node.name, node.doc_comment) for node in nodes] == [
+            ("name", "/* doc */")]
+
+    def test_parse_kotlin_kdoc(self) -> None:
+        """Test KDoc block comments and line comments are attached to the functions"""
+        code = b'/** KDoc */\nfun documented() {}\n// note\nfun noted() {}\nfun plain() {}\n'
+        nodes: list[TreeParserMethodNode] = BaseTreeParser.get_treesitter(
+            Language.KOTLIN).parse(code)
+
+        assert [(node.name, node.doc_comment) for node in nodes] == [
+            ("documented", "/** KDoc */"), ("noted", "// note"), ("plain", None)]
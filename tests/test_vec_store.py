@@ -0,0 +1,254 @@
+""" Test the vec_store module """
+import json
+import os
+import pickle
+import pytest
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import FakeEmbeddings
+from pytest_mock import MockerFixture
+from senior_swe_ai import vec_store as vec_store_module
+from senior_swe_ai.consts import IndexType
+from senior_swe_ai.symbol_table import SymbolTable
+from senior_swe_ai.vec_store import PICKLE_HEADER, VectorStore
+
+
+@pytest.fixture
+def cache_path(tmp_path, mocker: MockerFixture) -> str:
+    """Point the cache directory to a temporary directory"""
+    mocker.patch('senior_swe_ai.vec_store.get_cache_path', return_value=str(tmp_path))
+    mocker.patch('senior_swe_ai.cache.get_cache_path', return_value=str(tmp_path))
+    return str(tmp_path)
+
+
+def create_docs(count: int) -> list[Document]:
+    """Create documents of a single file"""
+    return [
+        Document(page_content=f"def method_{i}(): pass",
+                 metadata={"filename": "code.py", "file_path": "/repo/code.py",
+                           "method_name": f"method_{i}", "commit_hash": "hash"})
+        for i in range(count)
+    ]
+
+
+class TestVectorStore:
+    """Testing the vector store persistence"""
+
+    def test_save_and_load_mmap(self, cache_path: str) -> None:
+        """Test the index is saved natively and loaded memory mapped"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.idx_docs(create_docs(3))
+
+        with open(f"{cache_path}/TEST.faiss", "rb") as f:
+            assert f.read(1) != PICKLE_HEADER
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert loaded.db.index.ntotal == 3
+        assert len(loaded.db.similarity_search("method", k=2)) == 2
+        assert loaded.lexical_search("method_1", k=1)[0].page_content == "def method_1(): pass"
+        assert loaded.symbol_search("what does method_2 do")[0].page_content == \
+            "def method_2(): pass"
+        assert len(loaded.symbol_search("what does `code.method_2` do")) == 1
+        # no file is named after the class, the method is found by its name alone
+        assert len(loaded.symbol_search("what does `Other.method_2` do")) == 1
+        assert list(loaded.vec_cache["/repo/code.py"].vector_ids) == [0, 1, 2]
+
+    def test_load_reads_on_demand(self, cache_path: str, mocker: MockerFixture) -> None:
+        """Test loading for search reads no document and no file record until used"""
+        VectorStore(FakeEmbeddings(size=8), "TEST").idx_docs(create_docs(3))
+        unpickle = mocker.spy(pickle, "loads")
+        read_vec_cache = mocker.spy(vec_store_module, "load_vec_cache")
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert unpickle.call_count == 0
+        assert read_vec_cache.call_count == 0
+        assert len(loaded.db.similarity_search("method", k=1)) == 1
+        assert unpickle.call_count == 1
+        assert "/repo/code.py" in loaded.vec_cache
+        assert read_vec_cache.call_count == 1
+
+    def test_migrate_pickled_docstore(self, cache_path: str) -> None:
+        """Test a docstore pickled with its id map is rewritten as a SQLite docstore"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.idx_docs(create_docs(2))
+        with open(f"{cache_path}/TEST.pkl", "wb") as f:
+            pickle.dump((vec_store.db.docstore, vec_store.db.index_to_docstore_id), f)
+        os.remove(f"{cache_path}/TEST.docstore")
+
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert loaded.db.docstore.search("1").page_content == "def method_1(): pass"
+        assert os.path.exists(f"{cache_path}/TEST.docstore")
+        assert not os.path.exists(f"{cache_path}/TEST.pkl")
+
+    def test_load_writable(self, cache_path: str) -> None:
+        """Test an index loaded without mmap can be updated and saved again"""
+        VectorStore(FakeEmbeddings(size=8), "TEST").idx_docs(create_docs(2))
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.load_docs(mmap=False)
+
+        vec_store.idx_docs(create_docs(3)[2:])
+        vec_store.load_docs()
+
+        assert vec_store.db.index.ntotal == 3
+
+    def test_migrate_legacy_index(self, cache_path: str) -> None:
+        """Test an index saved as pickled bytes is rewritten in the native format"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.idx_docs(create_docs(2))
+        with open(f"{cache_path}/TEST.faiss", "wb") as f:
+            f.write(vec_store.db.serialize_to_bytes())
+
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert loaded.db.index.ntotal == 2
+        with open(f"{cache_path}/TEST.faiss", "rb") as f:
+            assert f.read(1) != PICKLE_HEADER
+
+    def test_migrate_json_vec_cache(self, cache_path: str) -> None:
+        """Test uuid vector ids listed in json are replaced by integers in the binary cache"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.idx_docs(create_docs(2))
+        uuids: dict[str, str] = {"0": "0b1c-first", "1": "7d2e-second"}
+        vec_store.db.docstore = InMemoryDocstore(
+            {uuids[doc_id]: vec_store.db.docstore.search(doc_id) for doc_id in uuids})
+        vec_store.db.index_to_docstore_id = {0: "0b1c-first", 1: "7d2e-second"}
+        vec_store.save()
+        os.remove(f"{cache_path}/TEST.vcache")
+        with open(f"{cache_path}/TEST.json", "w", encoding="utf-8") as f:
+            json.dump({"/repo/code.py": {"filename": "/repo/code.py", "commit_hash": "hash",
+                                         "vector_ids": ["7d2e-second", "0b1c-first"]}}, f)
+
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs(mmap=False)
+
+        assert list(loaded.vec_cache["/repo/code.py"].vector_ids) == [1, 0]
+        assert loaded.db.docstore.search("1").page_content == "def method_1(): pass"
+        assert not os.path.exists(f"{cache_path}/TEST.json")
+        assert loaded.add_embeddings(create_docs(1), [[0.0] * 8]) == ["2"]
+
+    def test_search_index_type(self, cache_path: str) -> None:
+        """Test the configured index type is built for search, the flat one for updates"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST", index_type=IndexType.HNSW)
+        vec_store.idx_docs(create_docs(3))
+
+        vec_store.load_docs()
+        assert type(vec_store.db.index).__name__ == "IndexHNSWFlat"
+        assert len(vec_store.db.max_marginal_relevance_search("method", k=2)) == 2
+        vec_store.load_docs(mmap=False)
+        assert type(vec_store.db.index).__name__ == "IndexFlatL2"
+
+    def test_checkpoint_drops_search_index(self, cache_path: str) -> None:
+        """Test a checkpoint removes the search index which no longer matches"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST", index_type=IndexType.SQ)
+        vec_store.idx_docs(create_docs(3))
+        assert os.path.exists(f"{cache_path}/TEST.sq.faiss")
+
+        vec_store.save(incomplete_file="/repo/code.py")
+
+        assert not os.path.exists(f"{cache_path}/TEST.sq.faiss")
+
+    def test_generation(self, cache_path: str) -> None:
+        """Test every change increments the persisted generation of the index"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        vec_store.idx_docs(create_docs(2))
+        vec_store.remove_files(["/repo/code.py"])
+        vec_store.save()
+
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert loaded.generation == 2
+
+    def test_shared_vectors(self, cache_path: str) -> None:
+        """Test duplicate chunks share a vector, which outlives the removal of one file"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        copy: Document = create_docs(1)[0]
+        copy.metadata = {**copy.metadata, "file_path": "/repo/copy.py"}
+        vec_store.idx_docs(create_docs(2) + [copy])
+
+        assert vec_store.db.index.ntotal == 2
+        shared_id: str = str(vec_store.vec_cache["/repo/copy.py"].vector_ids[0])
+        assert int(shared_id) in vec_store.vec_cache["/repo/code.py"].vector_ids
+
+        vec_store.remove_files(["/repo/code.py"])
+
+        assert vec_store.db.index.ntotal == 1
+        shared: Document = vec_store.db.docstore.search(shared_id)
+        assert shared.metadata["file_path"] == "/repo/copy.py"
+        assert shared.metadata["locations"] == [
+            {"file_path": "/repo/copy.py", "method_name": "method_0"}]
+
+    def test_symbols_of_duplicates(self, cache_path: str) -> None:
+        """Test a method whose chunk was folded into another one is found by name"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        copy: Document = create_docs(1)[0]
+        copy.metadata = {**copy.metadata, "file_path": "/repo/copy.py", "method_name": "copied"}
+        vec_store.idx_docs(create_docs(2) + [copy])
+
+        loaded = VectorStore(FakeEmbeddings(size=8), "TEST")
+        loaded.load_docs()
+
+        assert loaded.db.index.ntotal == 2
+        assert [doc.page_content for doc in loaded.symbol_search("what does `copy.copied` do")] \
+            == ["def method_0(): pass"]
+
+    def test_symbol_qualifier(self, cache_path: str) -> None:
+        """Test a qualifier keeps the chunks of the file named after it, when there is one"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        other: Document = Document(
+            page_content="def method_0(): return 0",
+            metadata={"filename": "other.py", "file_path": "/repo/other.py",
+                      "method_name": "method_0", "commit_hash": "hash"})
+        vec_store.idx_docs(create_docs(1) + [other])
+        vec_store.symbols = SymbolTable.build(
+            [("method_0", "0"), ("method_0", "1"), ("method_0", "9")])
+
+        assert [doc.page_content for doc in vec_store.symbol_search(
+            "is `other.method_0` used")] == ["def method_0(): return 0"]
+        # no file is named after the class, and the id missing from the docstore is skipped
+        assert len(vec_store.symbol_search("is `Parser.method_0` used")) == 2
+
+    def test_upsert_file(self, cache_path: str) -> None:
+        """Test the vectors of a changed file are replaced and the others kept"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        other: Document = Document(
+            page_content="def other(): pass",
+            metadata={"filename": "other.py", "file_path": "/repo/other.py",
+                      "method_name": "other", "commit_hash": "hash"})
+        vec_store.idx_docs(create_docs(2) + [other])
+
+        vec_store.upsert_file("/repo/code.py", create_docs(4)[3:], "new")
+        vec_store.upsert_file("/repo/empty.py", [], "empty")
+
+        assert vec_store.db.index.ntotal == 2
+        assert list(vec_store.vec_cache["/repo/code.py"].vector_ids) == [3]
+        assert vec_store.vec_cache["/repo/code.py"].commit_hash == "new"
+        assert vec_store.db.docstore.search("3").page_content == "def method_3(): pass"
+        assert not vec_store.vec_cache["/repo/empty.py"].vector_ids
+        vec_store.remove_file("/repo/other.py")
+        assert vec_store.db.index.ntotal == 1
+
+    def test_compact(self, cache_path: str) -> None:
+        """Test compaction renumbers the remaining vectors once most were removed"""
+        vec_store = VectorStore(FakeEmbeddings(size=8), "TEST")
+        copy: Document = create_docs(1)[0]
+        copy.metadata = {**copy.metadata, "file_path": "/repo/copy.py"}
+        vec_store.idx_docs(create_docs(5) + [copy])
+        vec_store.upsert_file("/repo/code.py", create_docs(5)[4:], "hash")
+
+        assert vec_store.compact()
+
+        assert vec_store.next_id == 2
+        assert sorted(vec_store.db.index_to_docstore_id.values()) == ["0", "1"]
+        assert list(vec_store.vec_cache["/repo/copy.py"].vector_ids) == [0]
+        assert vec_store.db.docstore.search("0").page_content == "def method_0(): pass"
+        assert not vec_store.compact()
+        vec_store.save()
+        vec_store.load_docs()
+        assert vec_store.lexical_search("method_4", k=1)[0].page_content == \
+            "def method_4(): pass"